@@ -0,0 +1,137 @@
+"""
+Benchmark Fakes
+---------------
+Lightweight stand-ins of discord objects and of GamepadBot, so cogs can be driven without connecting to discord.
+They implement only what cogs use, and record responses instead of sending them.
+@author Lapis0875
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from discord import SlashCommandGroup
+
+from utils.database import Database
+from utils.metrics import MetricsRegistry
+from utils.startup import StartupPipeline
+
+__all__ = (
+    'FakeMember',
+    'FakeGuild',
+    'FakeMessage',
+    'FakeInteraction',
+    'FakeBot',
+)
+
+
+class FakeMember:
+    __slots__ = ('id', 'display_name')
+
+    def __init__(self, member_id: int, display_name: Optional[str] = None):
+        self.id: int = member_id
+        self.display_name: str = display_name or f'member {member_id}'
+
+
+class FakeGuild:
+    """
+    Guild whose every member is cached. Members are created on lookup, so large guilds cost nothing.
+    """
+
+    def __init__(self, guild_id: int):
+        self.id: int = guild_id
+        self.icon = None
+
+    def get_member(self, member_id: int) -> FakeMember:
+        return FakeMember(member_id)
+
+
+class FakeMessage:
+    __slots__ = ('id',)
+
+    def __init__(self, message_id: int):
+        self.id: int = message_id
+
+
+class _FakeResponse:
+    def __init__(self):
+        self.done: bool = False
+        self.sent: list[dict] = []
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+    async def send_message(self, content: Optional[str] = None, **kwargs):
+        self.done = True
+        self.sent.append({'content': content, **kwargs})
+
+    async def edit_message(self, **kwargs):
+        self.done = True
+        self.sent.append(kwargs)
+
+
+class _FakeFollowup:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def send(self, content: Optional[str] = None, **kwargs):
+        self.sent.append({'content': content, **kwargs})
+
+
+class FakeInteraction:
+    """
+    Component interaction on a message.
+    """
+
+    def __init__(self, user: FakeMember, guild: FakeGuild, message: FakeMessage):
+        self.user: FakeMember = user
+        self.guild: FakeGuild = guild
+        self.guild_id: int = guild.id
+        self.message: FakeMessage = message
+        self.response: _FakeResponse = _FakeResponse()
+        self.followup: _FakeFollowup = _FakeFollowup()
+        self.edits: list[dict] = []
+
+    async def edit_original_message(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+class FakeBot:
+    """
+    Provides what cogs use from GamepadBot. Startup pipeline is never run, so cogs do not start background jobs.
+    """
+
+    def __init__(self, db: Database, logger: Optional[logging.Logger] = None):
+        """
+        :param db: opened database.
+        :param logger: logger of cogs. Defaults to a logger showing warnings only.
+        """
+        if logger is None:
+            logger = logging.getLogger('benchmark')
+            logger.setLevel(logging.WARNING)
+        self.logger: logging.Logger = logger
+        self.db: Database = db
+        self.metrics: MetricsRegistry = MetricsRegistry(prefix='gamepad_')
+        self.startup: StartupPipeline = StartupPipeline(logger)
+        self.guilds: dict[int, FakeGuild] = {}
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.get_event_loop()
+
+    def get_guild(self, guild_id: int) -> FakeGuild:
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = FakeGuild(guild_id)
+        return guild
+
+    def create_group(self, name: str, description: str, guild_ids: Optional[list[int]] = None) -> SlashCommandGroup:
+        return SlashCommandGroup(name, description, guild_ids=guild_ids)
+
+    async def ensure_ready(self, interaction) -> bool:
+        return True
+
+    async def wait_until_ready(self):
+        pass
@@ -0,0 +1,80 @@
+"""
+LFG Memory Benchmark
+--------------------
+Measure memory used by lfg records kept in LFGRegistry, to size hosts.
+    python -m benchmarks.lfg_memory [--sizes 10000 100000 1000000] [--participants 4] [--alternatives 1]
+@author Lapis0875
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from bot.lfg import LFG
+from bot.lfg_registry import LFGRegistry
+
+__all__ = (
+    'build_lfgs',
+    'measure',
+)
+
+GUILDS: int = 100
+GAMES: tuple[str, ...] = ('Destiny 2', 'League of Legends', 'Overwatch', 'Valorant', 'Minecraft')
+
+
+def build_lfgs(count: int, participants: int, alternatives: int, seed: int = 0) -> list[LFG]:
+    """
+    Create lfg records looking like ones loaded from db.
+    :param count: count of lfg.
+    :param participants: count of participants in each lfg.
+    :param alternatives: count of alternatives in each lfg.
+    :param seed: seed of random member ids.
+    """
+    rng = random.Random(seed)
+    start = int(time.time())
+    lfgs: list[LFG] = []
+    for i in range(count):
+        guild_id = 10 ** 17 + i % GUILDS
+        owner_id = rng.getrandbits(60)
+        lfg = LFG(i, f'lfg {i}', f'description of lfg {i}', GAMES[i % len(GAMES)], start + i * 60, 'Asia/Seoul', guild_id, owner_id)
+        lfg.participants = dict.fromkeys([owner_id, *(rng.getrandbits(60) for _ in range(participants - 1))])
+        lfg.alternatives = dict.fromkeys(rng.getrandbits(60) for _ in range(alternatives))
+        lfgs.append(lfg)
+    return lfgs
+
+
+def measure(count: int, participants: int, alternatives: int) -> tuple[float, float]:
+    """
+    Measure memory of lfg records and of registry indexing them.
+    :return: (bytes per lfg record, bytes per lfg including registry indexes)
+    """
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    lfgs = build_lfgs(count, participants, alternatives)
+    records = tracemalloc.get_traced_memory()[0] - base
+    registry = LFGRegistry()
+    registry.load(lfgs)
+    total = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del registry, lfgs
+    gc.collect()
+    return records / count, total / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure memory used by lfg records.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--participants', type=int, default=4)
+    parser.add_argument('--alternatives', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'{"lfg":>10} {"record B/lfg":>14} {"total B/lfg":>14} {"total MiB":>10}')
+    for size in args.sizes:
+        record, total = measure(size, args.participants, args.alternatives)
+        print(f'{size:>10} {record:>14.1f} {total:>14.1f} {total * size / 2 ** 20:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+LFG Speed Benchmark
+-------------------
+Measure time of lfg operations at several counts of lfg, using fake discord objects and a temporary database.
+Results are written as json, and compared with a saved baseline to catch regressions.
+    python -m benchmarks.lfg_speed [--sizes 1000 10000 100000 1000000] [--cases ...] [--repeat 3]
+                                   [--output results.json] [--baseline baseline.json] [--threshold 0.1]
+Exits with status 1 if any case is slower than baseline by more than threshold.
+@author Lapis0875
+"""
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import attr
+
+from benchmarks.fakes import FakeBot, FakeInteraction, FakeMember, FakeMessage
+from benchmarks.lfg_memory import build_lfgs, GAMES
+from bot.constants import PAGE_NEXT, ROLE_PARTICIPANT, ROLE_ALTERNATIVE
+from bot.lfg import LFG, GamepadLFG, LFGListQuery, EMBED_CACHE
+from utils.database import Database
+from utils.dt_utils import get_timezone
+
+__all__ = (
+    'World',
+    'CASES',
+    'run',
+    'compare',
+)
+
+RESULT_VERSION: int = 1
+# Operations measured by cases which run on a sample of lfg, regardless of size.
+SAMPLE: int = 1000
+# Pages walked by each query of lfg_list.
+PAGES: int = 5
+# Share of lfg changed before an incremental save.
+CHANGED_RATIO: float = 0.01
+
+
+@attr.s(init=True, repr=False)
+class World:
+    """
+    Cog loaded with lfg, on its own temporary database.
+    """
+    bot = attr.ib(type=FakeBot)
+    cog = attr.ib(type=GamepadLFG)
+    rng = attr.ib(type=random.Random)
+
+    @property
+    def lfgs(self) -> list[LFG]:
+        return list(self.cog.registry)
+
+    def sample(self, count: int) -> list[LFG]:
+        lfgs = self.lfgs
+        return self.rng.sample(lfgs, min(count, len(lfgs)))
+
+    def discard_changes(self):
+        self.cog.registry.take_changes()
+
+
+async def create_world(path: str, size: int, participants: int, alternatives: int) -> World:
+    db = Database(path)
+    await db.open()
+    bot = FakeBot(db)
+    cog = GamepadLFG(bot)
+    # Create tables.
+    await cog.load_lfgs()
+    # Edits are sent on next iteration of event loop, so their rendering is measured too.
+    cog.edit_coalescer.window = 0
+    cog.registry.load(build_lfgs(size, participants, alternatives))
+    return World(bot, cog, random.Random(size))
+
+
+async def drain(world: World):
+    while len(world.cog.edit_coalescer) > 0:
+        await asyncio.sleep(0)
+
+
+# Cases return count of operations and seconds taken by them.
+Case = Callable[[World], Awaitable[tuple[int, float]]]
+
+
+async def bench_serialize(world: World) -> tuple[int, float]:
+    lfgs = world.lfgs
+    started = time.perf_counter()
+    for lfg in lfgs:
+        lfg.serialize()
+    return len(lfgs), time.perf_counter() - started
+
+
+async def bench_deserialize(world: World) -> tuple[int, float]:
+    # Same values as rows read by load_lfgs.
+    rows = [(row[9], *row[:9]) for row in (lfg.serialize() for lfg in world.lfgs)]
+    members = [(list(lfg.participants), list(lfg.alternatives)) for lfg in world.lfgs]
+    started = time.perf_counter()
+    for row, (participant_ids, alternative_ids) in zip(rows, members):
+        LFG.deserialize(*row, participant_ids, alternative_ids)
+    return len(rows), time.perf_counter() - started
+
+
+async def bench_info_embed(world: World) -> tuple[int, float]:
+    lfgs = world.sample(SAMPLE)
+    guilds = [world.bot.get_guild(lfg.guild_id) for lfg in lfgs]
+    EMBED_CACHE.clear()
+    started = time.perf_counter()
+    for lfg, guild in zip(lfgs, guilds):
+        lfg.info_embed(guild)
+    return len(lfgs), time.perf_counter() - started
+
+
+async def bench_create_new_lfg(world: World) -> tuple[int, float]:
+    tz = get_timezone('Asia/Seoul')
+    now = time.time()
+    args = [
+        (f'new lfg {i}', 'description', world.rng.choice(GAMES), datetime.fromtimestamp(now + i * 60, tz),
+         10 ** 17 + i % 100, world.rng.getrandbits(60))
+        for i in range(SAMPLE)
+    ]
+    started = time.perf_counter()
+    created = [world.cog.create_new_lfg(*arg) for arg in args]
+    elapsed = time.perf_counter() - started
+    for lfg in created:
+        world.cog.registry.remove(lfg.id)
+    world.discard_changes()
+    return len(created), elapsed
+
+
+async def bench_join_leave(world: World) -> tuple[int, float]:
+    """
+    Join and leave through button handlers, including coalesced message edits.
+    """
+    lfgs = world.sample(SAMPLE)
+    clicks = []
+    for lfg in lfgs:
+        user = FakeMember(world.rng.getrandbits(60))
+        guild = world.bot.get_guild(lfg.guild_id)
+        message = FakeMessage(lfg.id)
+        clicks.append((lfg, FakeInteraction(user, guild, message), FakeInteraction(user, guild, message)))
+    cog = world.cog
+    started = time.perf_counter()
+    for lfg, join, leave in clicks:
+        await cog.join_lfg(lfg, join)
+        await cog.leave_lfg(lfg, leave)
+    await drain(world)
+    elapsed = time.perf_counter() - started
+    world.discard_changes()
+    return len(clicks) * 2, elapsed
+
+
+async def bench_save_db(world: World) -> tuple[int, float]:
+    """
+    Write every lfg into empty tables, as after creating all of them.
+    """
+    async with world.bot.db.transaction() as conn:
+        await conn.execute('DELETE FROM lfg_member')
+        await conn.execute('DELETE FROM lfg')
+    registry = world.cog.registry
+    for lfg in registry:
+        registry.mark_dirty(lfg.id)
+        for member_id in lfg.participants:
+            registry.mark_joined(lfg.id, member_id, ROLE_PARTICIPANT)
+        for member_id in lfg.alternatives:
+            registry.mark_joined(lfg.id, member_id, ROLE_ALTERNATIVE)
+    started = time.perf_counter()
+    await world.cog.save_db()
+    return len(registry), time.perf_counter() - started
+
+
+async def bench_save_db_incremental(world: World) -> tuple[int, float]:
+    """
+    Write a small share of changed lfg, as the hourly save does. Runs after save_db.
+    """
+    lfgs = world.sample(max(int(len(world.cog.registry) * CHANGED_RATIO), 1))
+    for lfg in lfgs:
+        lfg.touch()
+        lfg.add_participant(world.rng.getrandbits(60))
+    started = time.perf_counter()
+    await world.cog.save_db()
+    return len(lfgs), time.perf_counter() - started
+
+
+async def bench_lfg_list(world: World) -> tuple[int, float]:
+    """
+    Walk pages of /lfg list with each kind of filter. Runs after save_db.
+    """
+    lfg = world.sample(1)[0]
+    queries = (
+        LFGListQuery(lfg.guild_id),
+        LFGListQuery(lfg.guild_id, game=lfg.game),
+        LFGListQuery(lfg.guild_id, owner_id=lfg.owner_id),
+        LFGListQuery(lfg.guild_id, upcoming=True),
+    )
+    cog = world.cog
+    pages = 0
+    started = time.perf_counter()
+    for query in queries:
+        cursor = None
+        for _ in range(PAGES):
+            rows, more = await cog.fetch_lfg_page(query, cursor, PAGE_NEXT)
+            cog.render_lfg_page(query.title(), rows, query.view(rows, cursor is not None, more))
+            pages += 1
+            if not more:
+                break
+            cursor = rows[-1][0]
+    return pages, time.perf_counter() - started
+
+
+async def bench_load_lfgs(world: World) -> tuple[int, float]:
+    """
+    Read every lfg from db, as fetch_db does on start. Runs after save_db.
+    Background jobs and owner cache of fetch_db need a gateway, so they are not measured.
+    """
+    started = time.perf_counter()
+    await world.cog.load_lfgs()
+    return len(world.cog.registry), time.perf_counter() - started
+
+
+# In order of run. Cases after save_db read lfg written by it.
+CASES: dict[str, Case] = {
+    'serialize': bench_serialize,
+    'deserialize': bench_deserialize,
+    'info_embed': bench_info_embed,
+    'create_new_lfg': bench_create_new_lfg,
+    'join_leave': bench_join_leave,
+    'save_db': bench_save_db,
+    'save_db_incremental': bench_save_db_incremental,
+    'lfg_list': bench_lfg_list,
+    'load_lfgs': bench_load_lfgs,
+}
+
+
+async def run(
+        sizes: list[int],
+        cases: list[str],
+        repeat: int,
+        participants: int = 4,
+        alternatives: int = 1
+) -> dict[str, dict]:
+    """
+    Run cases at each size. Best of repeated runs is kept, since slower runs are slowed by other processes.
+    :return: results keyed by `case/size`.
+    """
+    results: dict[str, dict] = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            world = await create_world(str(Path(directory) / 'bench.db'), size, participants, alternatives)
+            try:
+                for name in cases:
+                    best: Optional[tuple[int, float]] = None
+                    for _ in range(repeat):
+                        gc.collect()
+                        ops, seconds = await CASES[name](world)
+                        if best is None or seconds / ops < best[1] / best[0]:
+                            best = ops, seconds
+                    ops, seconds = best
+                    results[f'{name}/{size}'] = {
+                        'case': name, 'size': size, 'ops': ops, 'seconds': seconds, 'per_op': seconds / ops
+                    }
+                    print(f'{name:>20} {size:>10} {ops:>10} {seconds:>10.3f}s {seconds / ops * 1e6:>12.2f}us/op')
+            finally:
+                await world.bot.db.close()
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """
+    Print change of each result from baseline.
+    :param threshold: ratio of slowdown to consider a regression, such as 0.1 for 10%.
+    :return: keys of regressed results.
+    """
+    regressions = []
+    print(f'{"case":>20} {"size":>10} {"baseline":>12} {"current":>12} {"change":>8}')
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f'{result["case"]:>20} {result["size"]:>10} {"-":>12} {result["per_op"] * 1e6:>10.2f}us {"new":>8}')
+            continue
+        change = result['per_op'] / base['per_op'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(key)
+            flag = ' REGRESSION'
+        print(
+            f'{result["case"]:>20} {result["size"]:>10} {base["per_op"] * 1e6:>10.2f}us '
+            f'{result["per_op"] * 1e6:>10.2f}us {change:>+8.1%}{flag}'
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure time of lfg operations.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--participants', type=int, default=4)
+    parser.add_argument('--alternatives', type=int, default=1)
+    parser.add_argument('--output', type=Path, help='path to write results as json.')
+    parser.add_argument('--baseline', type=Path, help='results to compare with.')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown to flag as regression. (0.1 = 10%%)')
+    args = parser.parse_args()
+    # Keep order of run, since later cases depend on earlier ones.
+    cases = [name for name in CASES if name in args.cases]
+
+    print(f'{"case":>20} {"size":>10} {"ops":>10} {"total":>11} {"per op":>14}')
+    results = asyncio.run(run(args.sizes, cases, args.repeat, args.participants, args.alternatives))
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, mode='wt', encoding='utf-8') as f:
+            json.dump({
+                'version': RESULT_VERSION,
+                'created_at': datetime.now().astimezone().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'repeat': args.repeat,
+                'results': results
+            }, f, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, mode='rt', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('version') != RESULT_VERSION:
+            sys.exit(f'Baseline version {baseline.get("version")} is not supported.')
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            sys.exit(f'{len(regressions)} cases regressed more than {args.threshold:.0%}.')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,56 @@ import asyncio
 from functools import partial, wraps
 from typing import Callable
 
-from discord import Cog, slash_command, ApplicationContext, Embed, ui, ButtonStyle, Interaction
+from discord import Cog, slash_command, ApplicationContext, Embed, ui, ButtonStyle, Interaction, Option
 
-from bot.constants import INITIAL_COLOR, ADMIN_ID, TEST_SERVERS
+from bot.constants import INITIAL_COLOR, ADMIN_ID, TEST_SERVERS, PROFILE_DIR, PROFILE_DEFAULT_SEC, PROFILE_MAX_SEC, \
+    SLOW_CALLBACK_SEC, PROFILE_TOP
 from bot.gamepad_bot import GamepadBot
 from typings import CoroutineFunction
+from utils.profiling import Profiler, CpuProfile, MemoryDiff, SlowCallbackReport
+
+# Discord limits description of embed to 4096 characters.
+EMBED_TEXT_LIMIT: int = 4000
+# Panel must outlive the longest cpu profile, so it can be stopped early from the panel.
+VIEW_TIMEOUT_SEC: int = PROFILE_MAX_SEC + 60
+
+
+def code_block(lines: list[str]) -> str:
+    """
+    Join lines into a code block, dropping lines which exceed limit of embed.
+    """
+    text = ''
+    for line in lines:
+        if len(text) + len(line) + 1 > EMBED_TEXT_LIMIT:
+            break
+        text += line + '\n'
+    return f'```\n{text or "(없음)"}```'
+
+
+def cpu_embed(result: CpuProfile) -> Embed:
+    embed = Embed(title='CPU 프로파일 🔥', description=code_block(result.top), color=INITIAL_COLOR)
+    embed.add_field(name='측정 시간', value=f'{result.seconds:.1f}초')
+    embed.add_field(name='호출 수', value=f'{result.calls:,}')
+    embed.add_field(name='파일', value=f'`{result.path}`', inline=False)
+    return embed
+
+
+def memory_embed(result: MemoryDiff) -> Embed:
+    description = code_block(result.top) if result.top else '추적을 시작했습니다. 다시 누르면 이후 늘어난 할당을 비교합니다.'
+    embed = Embed(title='메모리 스냅샷 🧠', description=description, color=INITIAL_COLOR)
+    embed.add_field(name='현재', value=f'{result.current / 1024 / 1024:.1f}MiB')
+    embed.add_field(name='최대', value=f'{result.peak / 1024 / 1024:.1f}MiB')
+    embed.add_field(name='파일', value=f'`{result.path}`', inline=False)
+    return embed
+
+
+def slow_callback_embed(result: SlowCallbackReport) -> Embed:
+    embed = Embed(title='느린 콜백 🐢', description=code_block(result.latest), color=INITIAL_COLOR)
+    embed.add_field(name='기준', value=f'{result.threshold * 1000:.0f}ms')
+    embed.add_field(name='감지 수', value=str(result.count))
+    if result.path is not None:
+        embed.add_field(name='파일', value=f'`{result.path}`', inline=False)
+    return embed
 
 
 class AdminButton(ui.Button):
@@ -44,9 +89,12 @@ def admin_check(coro: CoroutineFunction) -> CoroutineFunction:
 
 
 class AdminView(ui.View):
-    def __init__(self, msg_id, bot: GamepadBot):
+    def __init__(self, msg_id, bot: GamepadBot, profiler: Profiler, profile_seconds: int, slow_callback_sec: float):
         self.index = 0
         self.bot: GamepadBot = bot
+        self.profiler: Profiler = profiler
+        self.profile_seconds: int = profile_seconds
+        self.slow_callback_sec: float = slow_callback_sec
 
         @AdminButton.create(msg_id=msg_id, style=ButtonStyle.danger, suffix='_stop', label='종료', emoji='⛔')
         @admin_check
@@ -65,27 +113,91 @@ class AdminView(ui.View):
 
         self.exit_btn = exit_btn
 
-        super(AdminView, self).__init__(self.stop_btn, self.exit_btn, timeout=120)
+        @AdminButton.create(msg_id=msg_id, style=ButtonStyle.secondary, suffix='_cpu', label='CPU 프로파일', emoji='🔥')
+        @admin_check
+        async def cpu_btn(self: ui.Button, interaction: Interaction):
+            view: AdminView = self.view
+            if view.profiler.stop_cpu():
+                # Result is sent to whom started the profile.
+                return await interaction.response.send_message('CPU 프로파일을 일찍 종료합니다.', ephemeral=True, delete_after=3.0)
+            await interaction.response.defer(ephemeral=True)
+            result = await view.profiler.profile_cpu(view.profile_seconds, owner=view)
+            await interaction.followup.send(embed=cpu_embed(result), ephemeral=True)
+
+        self.cpu_btn = cpu_btn
+
+        @AdminButton.create(msg_id=msg_id, style=ButtonStyle.secondary, suffix='_memory', label='메모리 스냅샷', emoji='🧠')
+        @admin_check
+        async def memory_btn(self: ui.Button, interaction: Interaction):
+            await interaction.response.defer(ephemeral=True)
+            result = await self.view.profiler.snapshot_memory(owner=self.view)
+            await interaction.followup.send(embed=memory_embed(result), ephemeral=True)
+
+        self.memory_btn = memory_btn
+
+        @AdminButton.create(msg_id=msg_id, style=ButtonStyle.secondary, suffix='_slow', label='느린 콜백', emoji='🐢')
+        @admin_check
+        async def slow_btn(self: ui.Button, interaction: Interaction):
+            view: AdminView = self.view
+            if not view.profiler.detecting_slow_callbacks:
+                view.profiler.enable_slow_callbacks(view.bot.loop, view.slow_callback_sec, owner=view)
+                return await interaction.response.send_message(
+                    f'{view.slow_callback_sec * 1000:.0f}ms 이상 걸리는 콜백을 기록합니다. 다시 누르면 종료합니다.',
+                    ephemeral=True
+                )
+            await interaction.response.defer(ephemeral=True)
+            result = await view.profiler.disable_slow_callbacks(view.bot.loop)
+            await interaction.followup.send(embed=slow_callback_embed(result), ephemeral=True)
+
+        self.slow_btn = slow_btn
+
+        @AdminButton.create(msg_id=msg_id, style=ButtonStyle.secondary, suffix='_diag_stop', label='진단 종료', emoji='🧹')
+        @admin_check
+        async def diag_stop_btn(self: ui.Button, interaction: Interaction):
+            await self.view.profiler.close(self.view.bot.loop)
+            await interaction.response.send_message('모든 진단 도구를 종료했습니다.', ephemeral=True, delete_after=3.0)
+
+        self.diag_stop_btn = diag_stop_btn
+
+        super(AdminView, self).__init__(
+            self.stop_btn, self.exit_btn, self.cpu_btn, self.memory_btn, self.slow_btn, self.diag_stop_btn,
+            timeout=VIEW_TIMEOUT_SEC
+        )
+
+    async def on_timeout(self) -> None:
+        # Diagnostics of this panel cannot be stopped once it stops handling buttons.
+        # Tools used from a newer panel are owned by it, so they are left running.
+        await self.profiler.close(self.bot.loop, owner=self)
 
 
 class GamepadHelp(Cog, name='admin'):
     def __init__(self, bot: GamepadBot):
         self.bot = bot
+        self.profiler: Profiler = Profiler(PROFILE_DIR, top=PROFILE_TOP)
 
     def cog_unload(self) -> None:
         """
-        Handle cog unload.
+        Handle cog unload. Diagnostics have overhead, so they are stopped with the panel.
         """
+        self.bot.loop.create_task(self.profiler.close(self.bot.loop), name='admin.profiler')
 
     @slash_command(name='admin', description='관리자 명령어입니다.', guild_ids=TEST_SERVERS)
-    async def admin_slash(self, ctx: ApplicationContext):
+    async def admin_slash(
+            self,
+            ctx: ApplicationContext,
+            profile_seconds: Option(int, description='CPU 프로파일을 측정할 시간(초)입니다.',
+                                    required=False, default=PROFILE_DEFAULT_SEC, min_value=1, max_value=PROFILE_MAX_SEC),
+            slow_callback_ms: Option(int, description='느린 콜백으로 기록할 기준 시간(ms)입니다.',
+                                     required=False, default=int(SLOW_CALLBACK_SEC * 1000), min_value=1)
+    ):
         if ctx.author.id != ADMIN_ID:
             return await ctx.response.send_message('관리자만 사용 가능합니다!', ephemeral=True, delete_after=3.0)
         embed = Embed(
             title='Gamepad 관리 🕹️',
             color=INITIAL_COLOR
         )
-        await ctx.response.send_message(embed=embed, view=AdminView(ctx.guild_id, self.bot))
+        view = AdminView(ctx.guild_id, self.bot, self.profiler, profile_seconds, slow_callback_ms / 1000)
+        await ctx.response.send_message(embed=embed, view=view)
 
 
 def setup(bot: GamepadBot):
@@ -0,0 +1,301 @@
+"""
+Command Sync
+------------
+Register application commands only when they changed since last start.
+@author Lapis0875
+"""
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from discord import HTTPException, Forbidden
+from discord.commands import ApplicationCommand
+from discord.ext.commands import Bot
+
+from typings.files import JSON
+
+__all__ = (
+    'payload_hash',
+    'CommandSync',
+)
+
+GLOBAL: str = 'global'
+ROLE: int = 1
+USER: int = 2
+# Discord allows at most 10 permission overwrites for each command.
+MAX_PERMISSIONS: int = 10
+
+
+def payload_hash(payload) -> str:
+    """
+    Stable hash of json payload. Keys are sorted, so it does not depend on order of dict keys.
+    """
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _key(command: JSON) -> str:
+    # Slash commands omit type, which defaults to 1.
+    return f'{command.get("type", 1)}:{command["name"]}'
+
+
+class CommandSync:
+    """
+    Syncs application commands using a manifest of commands registered in last sync, stored as json.
+    Manifest keeps hash of each command payload and its id, for each scope (global, or a guild).
+    Scopes whose commands are unchanged are not requested at all. For changed scopes, registered commands are fetched,
+    then a single changed command is upserted (or deleted) alone, and more changes overwrite the scope in one request.
+    Scopes are synced in parallel. Permissions of commands are hashed and upserted per guild in the same way.
+    Delete the manifest file to force a full sync.
+    """
+
+    def __init__(self, bot: Bot, path: str):
+        """
+        :param bot: bot whose pending application commands are synced.
+        :param path: path of manifest file.
+        """
+        self.bot: Bot = bot
+        self.path: Path = Path(path)
+        # Count of requests made by last sync.
+        self.requests: int = 0
+        self._owner_ids: Optional[list[int]] = None
+        # Role ids keyed by name, for each guild. Fetched once per sync.
+        self._role_ids: dict[int, dict[str, int]] = {}
+
+    def load_manifest(self, application_id: int) -> JSON:
+        try:
+            with open(self.path, mode='rt', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        if manifest is None or manifest.get('application_id') != application_id:
+            # Commands of another application are not ours.
+            manifest = {'application_id': application_id, 'scopes': {}, 'permissions': {}}
+        return manifest
+
+    def save_manifest(self, manifest: JSON):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(self.path.name + '.tmp')
+        with open(temp, mode='wt', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp, self.path)
+
+    def _scopes(self) -> dict[str, list[ApplicationCommand]]:
+        scopes: dict[str, list[ApplicationCommand]] = {}
+        for command in self.bot.pending_application_commands:
+            if command.guild_ids is None:
+                scopes.setdefault(GLOBAL, []).append(command)
+            else:
+                for guild_id in command.guild_ids:
+                    scopes.setdefault(str(guild_id), []).append(command)
+        return scopes
+
+    async def sync(self):
+        """
+        Register changed commands, and bind every command to its id.
+        """
+        application_id = self.bot.user.id
+        self.requests = 0
+        self._owner_ids = None
+        self._role_ids = {}
+        manifest = self.load_manifest(application_id)
+        scopes = self._scopes()
+        for scope in manifest['scopes']:
+            # Scope which lost every command must be cleared.
+            scopes.setdefault(scope, [])
+
+        entries = await asyncio.gather(*(
+            self._sync_scope(application_id, scope, commands, manifest['scopes'].get(scope))
+            for scope, commands in scopes.items()
+        ))
+        for scope, entry in zip(scopes.keys(), entries):
+            if entry is None:
+                # Failed scopes are synced again on next start.
+                manifest['scopes'].pop(scope, None)
+            elif len(entry['commands']) == 0:
+                manifest['scopes'].pop(scope, None)
+            else:
+                manifest['scopes'][scope] = entry
+
+        guild_ids = {int(scope) for scope in scopes if scope != GLOBAL}
+        for command in scopes.get(GLOBAL, ()):
+            guild_ids.update(p.guild_id for p in getattr(command, 'permissions', ()) if p.guild_id is not None)
+        hashes = await asyncio.gather(*(
+            self._sync_permissions(application_id, guild_id, scopes, manifest['permissions'].get(str(guild_id)))
+            for guild_id in guild_ids
+        ))
+        manifest['permissions'] = {str(guild_id): h for guild_id, h in zip(guild_ids, hashes) if h is not None}
+
+        self.save_manifest(manifest)
+        self.bot.logger.info(f'Synced commands of {len(scopes)} scopes. ({self.requests} requests)')
+
+    def _bind(self, commands: list[ApplicationCommand], ids: dict[str, str]):
+        for command in commands:
+            command_id = ids.get(_key(command.to_dict()))
+            if command_id is not None:
+                command.id = command_id
+                self.bot._application_commands[command_id] = command
+
+    async def _sync_scope(
+            self,
+            application_id: int,
+            scope: str,
+            commands: list[ApplicationCommand],
+            entry: Optional[JSON]
+    ) -> Optional[JSON]:
+        """
+        Sync commands of a scope.
+        :return: new manifest entry of scope, or None if failed.
+        """
+        payloads = {_key(p): p for p in (command.to_dict() for command in commands)}
+        hashes = {key: payload_hash(payload) for key, payload in payloads.items()}
+        scope_hash = payload_hash(sorted(hashes.items()))
+        # Manifest edited by hand, or written by an older version, may miss ids of some commands.
+        if entry is not None and entry['hash'] == scope_hash and hashes.keys() <= entry['commands'].keys():
+            ids = {key: entry['commands'][key]['id'] for key in hashes}
+        else:
+            try:
+                ids = await self._upsert_scope(application_id, scope, payloads, hashes, entry)
+            except Forbidden:
+                self.bot.logger.warning(f'Missing access to register commands in {scope}.')
+                return None
+            except HTTPException as e:
+                self.bot.logger.exception(f'Failed to register commands in {scope}.', exc_info=e)
+                return None
+        self._bind(commands, ids)
+        return {
+            'hash': scope_hash,
+            'commands': {key: {'hash': hashes[key], 'id': ids[key]} for key in hashes if key in ids}
+        }
+
+    async def _upsert_scope(
+            self,
+            application_id: int,
+            scope: str,
+            payloads: dict[str, JSON],
+            hashes: dict[str, str],
+            entry: Optional[JSON]
+    ) -> dict[str, str]:
+        """
+        Register commands of a changed scope.
+        :return: ids of commands, keyed by `type:name`.
+        """
+        http = self.bot.http
+        guild_id = None if scope == GLOBAL else int(scope)
+        if guild_id is None:
+            remote = await http.get_global_commands(application_id)
+        else:
+            remote = await http.get_guild_commands(application_id, guild_id)
+        self.requests += 1
+        ids = {_key(command): command['id'] for command in remote}
+        known = entry['commands'] if entry is not None else {}
+        changed = [key for key in payloads if key not in ids or known.get(key, {}).get('hash') != hashes[key]]
+        removed = [key for key in ids if key not in payloads]
+
+        if len(changed) + len(removed) > 1:
+            if guild_id is None:
+                registered = await http.bulk_upsert_global_commands(application_id, list(payloads.values()))
+            else:
+                registered = await http.bulk_upsert_guild_commands(application_id, guild_id, list(payloads.values()))
+            self.requests += 1
+            return {_key(command): command['id'] for command in registered}
+        for key in changed:
+            if guild_id is None:
+                command = await http.upsert_global_command(application_id, payloads[key])
+            else:
+                command = await http.upsert_guild_command(application_id, guild_id, payloads[key])
+            self.requests += 1
+            ids[key] = command['id']
+        for key in removed:
+            if guild_id is None:
+                await http.delete_global_command(application_id, ids.pop(key))
+            else:
+                await http.delete_guild_command(application_id, guild_id, ids.pop(key))
+            self.requests += 1
+        return ids
+
+    async def _owners(self) -> list[int]:
+        if self._owner_ids is None:
+            app = await self.bot.application_info()
+            self._owner_ids = [m.id for m in app.team.members] if app.team else [app.owner.id]
+        return self._owner_ids
+
+    async def _roles(self, guild_id: int) -> dict[str, int]:
+        """
+        Ids of roles in guild, keyed by name.
+        Commands are synced on connect, before guilds are cached, so roles are fetched if guild is not cached yet.
+        :raise HTTPException: if roles could not be fetched.
+        """
+        roles = self._role_ids.get(guild_id)
+        if roles is None:
+            guild = self.bot.get_guild(guild_id)
+            if guild is not None:
+                pairs = [(role.name, role.id) for role in guild.roles]
+            else:
+                pairs = [(role['name'], int(role['id'])) for role in await self.bot.http.get_roles(guild_id)]
+                self.requests += 1
+            roles = self._role_ids[guild_id] = {}
+            for name, role_id in pairs:
+                # First role wins on duplicated names, as discord.utils.get does.
+                roles.setdefault(name, role_id)
+        return roles
+
+    async def _resolve_permissions(self, guild_id: int, command: ApplicationCommand) -> list[JSON]:
+        """
+        Permission overwrites of command in guild. Role names and `owner` are replaced with ids.
+        :raise HTTPException: if roles of guild could not be fetched.
+        """
+        resolved = []
+        for permission in getattr(command, 'permissions', ()):
+            if permission.guild_id is not None and permission.guild_id != guild_id:
+                continue
+            payload = permission.to_dict()
+            if not isinstance(payload['id'], str):
+                resolved.append(payload)
+            elif payload['type'] == ROLE:
+                role_id = (await self._roles(guild_id)).get(payload['id'])
+                if role_id is None:
+                    self.bot.logger.warning(f'Role {payload["id"]} of command {command.name} is not found in guild {guild_id}.')
+                    continue
+                resolved.append({**payload, 'id': role_id})
+            elif payload['type'] == USER and payload['id'] == 'owner':
+                resolved.extend({**payload, 'id': owner_id} for owner_id in await self._owners())
+        return resolved[:MAX_PERMISSIONS]
+
+    async def _sync_permissions(
+            self,
+            application_id: int,
+            guild_id: int,
+            scopes: dict[str, list[ApplicationCommand]],
+            old_hash: Optional[str]
+    ) -> Optional[str]:
+        """
+        Sync permissions of commands available in guild.
+        :return: hash of permissions, or None if failed or guild has no permissions.
+        """
+        payload = []
+        for command in (*scopes.get(str(guild_id), ()), *scopes.get(GLOBAL, ())):
+            if getattr(command, 'id', None) is None:
+                continue
+            try:
+                permissions = await self._resolve_permissions(guild_id, command)
+            except HTTPException as e:
+                # Unresolved roles would change the hash, so permissions are left as registered.
+                self.bot.logger.warning(f'Failed to fetch roles of guild {guild_id} : {e}')
+                return old_hash
+            if permissions:
+                payload.append({'id': command.id, 'permissions': permissions})
+        new_hash = payload_hash(payload)
+        if new_hash == old_hash or (old_hash is None and len(payload) == 0):
+            return old_hash
+        try:
+            await self.bot.http.bulk_upsert_command_permissions(application_id, guild_id, payload)
+        except HTTPException as e:
+            self.bot.logger.warning(f'Failed to register command permissions in guild {guild_id} : {e}')
+            return None
+        finally:
+            self.requests += 1
+        return new_hash
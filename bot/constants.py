@@ -8,7 +8,46 @@ TEST_SERVERS: Final[list[int]] = [911676954317582368, 855835632470458459, 881164
 # PATH
 DEFAULT_BOT_CONFIG_PATH: Final[str] = "configs/bot.json"
 DB_PATH: Final[str] = 'gamepad.db'
-DUMP_PATH: Final[str] = 'dump.sql'
+BACKUP_DIR: Final[str] = 'backups'
+# In-memory lfg state written on clean shutdown, to skip reading database on next start.
+SNAPSHOT_PATH: Final[str] = 'gamepad.snapshot'
+# Hashes and ids of registered application commands. Delete it to force a full sync of commands.
+COMMAND_MANIFEST_PATH: Final[str] = 'configs/commands.json'
+LOG_PATH: Final[str] = 'logs/gamepad.log'
+# Cpu profiles, tracemalloc snapshots and slow callbacks taken from admin panel.
+PROFILE_DIR: Final[str] = 'profiles'
+
+# METRICS
+# Prometheus metrics are served at http://METRICS_HOST:METRICS_PORT/metrics.
+METRICS_HOST: Final[str] = '127.0.0.1'
+METRICS_PORT: Final[int] = 9150
+
+# PROFILING
+# Default length of cpu profile. Followups must be sent within 15 minutes of interaction, which limits the length.
+PROFILE_DEFAULT_SEC: Final[int] = 30
+PROFILE_MAX_SEC: Final[int] = 600
+# Callbacks of event loop taking longer than this are logged while slow callback detection is on.
+SLOW_CALLBACK_SEC: Final[float] = 0.1
+# Count of lines shown in summaries.
+PROFILE_TOP: Final[int] = 10
+
+# LOGGING
+# Log file is rotated when it exceeds LOG_MAX_BYTES, or LOG_ROTATE_INTERVAL_SEC after last rotation.
+LOG_MAX_BYTES: Final[int] = 10 * 1024 * 1024
+LOG_ROTATE_INTERVAL_SEC: Final[int] = 24 * 60 * 60
+# Count of rotated log files to keep.
+LOG_RETENTION: Final[int] = 30
+# Write log file as json lines, for log collectors.
+LOG_JSON: Final[bool] = False
+
+# DATABASE
+DB_READER_COUNT: Final[int] = 2
+DB_CACHE_SIZE_KB: Final[int] = 16384
+DB_CACHED_STATEMENTS: Final[int] = 256
+# Count of backups to keep.
+BACKUP_RETENTION: Final[int] = 48
+# Pages copied in each backup step. Positive value copies incrementally, letting writers run between steps.
+BACKUP_STEP_PAGES: Final[int] = -1
 
 # KEYWORDS
 CREATE: Final[str] = 'create'
@@ -16,6 +55,14 @@ EDIT: Final[str] = 'edit'
 LIST: Final[str] = 'list'
 DELETE: Final[str] = 'delete'
 VIEW: Final[str] = 'view'
+JOIN: Final[str] = 'join'
+ALTERNATIVE: Final[str] = 'alt'
+LEAVE: Final[str] = 'leave'
+LIST_PAGE: Final[str] = 'lfglist'
+PAGE_NEXT: Final[str] = 'next'
+PAGE_PREV: Final[str] = 'prev'
+SEARCH: Final[str] = 'search'
+SEARCH_PAGE: Final[str] = 'lfgsearch'
 
 # COLOR
 INITIAL_COLOR: Final[Color] = Color(0x2673e8)
@@ -23,8 +70,26 @@ INITIAL_COLOR: Final[Color] = Color(0x2673e8)
 # VALUES
 # LFG_ALERT_PREV_MIN: Final[int] = 10
 LFG_ALERT_PREV_SEC: Final[int] = 600
+LFG_ALERT_MISSED_GRACE_SEC: Final[int] = 60 * 60
+LFG_ALERT_CONCURRENCY: Final[int] = 8
+EMBED_CACHE_SIZE: Final[int] = 1024
+LFG_EDIT_WINDOW_SEC: Final[float] = 1.0
+# LFG planned more than LFG_ARCHIVE_GRACE_SEC ago are moved into lfg_archive table.
+LFG_ARCHIVE_GRACE_SEC: Final[int] = 24 * 60 * 60
+LFG_SWEEP_INTERVAL_MIN: Final[int] = 10
+LFG_LIST_PAGE_SIZE: Final[int] = 20
+# Game filter of /lfg list is stored in custom id of paging buttons, which is limited to 100 characters.
+LFG_LIST_GAME_MAX_LEN: Final[int] = 40
+LFG_SEARCH_TEXT_MAX_LEN: Final[int] = 60
+# Discord shows at most 25 choices of autocomplete.
+AUTOCOMPLETE_LIMIT: Final[int] = 25
 # MIN2SEC: Final[int] = 60
 # HOUR2SEC: Final[int] = 60 * 60
 DAY2SEC: Final[int] = 24 * 60 * 60
 ID_SEP: Final[str] = ','
+MEMBER_RESOLVE_CONCURRENCY: Final[int] = 4
+# Interactions must be answered in 3 seconds, so they wait for startup only shortly.
+STARTUP_WAIT_SEC: Final[float] = 2.0
+ROLE_PARTICIPANT: Final[int] = 0
+ROLE_ALTERNATIVE: Final[int] = 1
 
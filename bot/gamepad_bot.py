@@ -1,17 +1,23 @@
-from sys import stderr
-from typing import Optional
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
 
 from attr import attrs, attrib
-from discord import Forbidden
+from discord import Interaction, InteractionType, ApplicationContext, DiscordException
 from discord.ext.commands import Bot
-from discord.utils import get, find
 # from orjson import loads
 from json import loads
 
-from bot.constants import DEFAULT_BOT_CONFIG_PATH
+from bot.command_sync import CommandSync
+from bot.constants import DEFAULT_BOT_CONFIG_PATH, COMMAND_MANIFEST_PATH, DB_PATH, DB_READER_COUNT, DB_CACHE_SIZE_KB, \
+    DB_CACHED_STATEMENTS, STARTUP_WAIT_SEC, METRICS_HOST, METRICS_PORT
 from typings.files import JSON
 from utils.config import JsonConfig
+from utils.database import Database
 from utils.log import get_logger
+from utils.metrics import MetricsRegistry, MetricsServer
+from utils.startup import StartupPipeline
 
 
 @attrs(init=True, repr=True)
@@ -37,212 +43,169 @@ class BotConfig(JsonConfig):
         )
 
 
+# Seconds which interaction being timed spent waiting for users, in a list to be added from handlers.
+_user_wait: ContextVar[Optional[list[float]]] = ContextVar('user_wait', default=None)
+
+
+def command_name(data: JSON) -> str:
+    """
+    Full name of invoked slash command, including names of its group and subcommand.
+    :param data: data of application command interaction.
+    """
+    names = [data['name']]
+    options = data.get('options', ())
+    # Option type 1 is subcommand, and 2 is subcommand group.
+    while options and options[0].get('type') in (1, 2):
+        names.append(options[0]['name'])
+        options = options[0].get('options', ())
+    return ' '.join(names)
+
+
 class GamepadBot(Bot):
     """
     Gamepad Discord Bot.
+    Startup phases (opening database, loading cogs' states) run in `startup` pipeline, concurrently with connecting.
+    Commands wait for the pipeline to be ready, so they never see a half loaded state.
+    Latency of interactions and other metrics are kept in `metrics`, and served at METRICS_PORT.
     """
-    # async def register_commands(self) -> None:
-    #     commands = []
-    #
-    #     # Global Command Permissions
-    #     global_permissions: list = []
-    #
-    #     registered_commands = await self.http.get_global_commands(self.user.id)
-    #
-    #     if len(registered_commands) > 0:
-    #         for command in filter(
-    #             lambda c: c.guild_ids is None,
-    #             self.pending_application_commands
-    #         ):
-    #             as_dict = command.to_dict()
-    #             matching_registered_cmd: Optional[JSON] = next(filter(
-    #                 lambda x: x["name"] == command.name and x["type"] == command.type,
-    #                 registered_commands
-    #             ), None)
-    #             if matching_registered_cmd:
-    #                 as_dict["id"] = matching_registered_cmd["id"]
-    #             commands.append(as_dict)
-    #
-    #     cmds = await self.http.bulk_upsert_global_commands(self.user.id, commands)
-    #
-    #     for i in cmds:
-    #         cmd = get(
-    #             self.pending_application_commands,
-    #             name=i["name"],
-    #             guild_ids=None,
-    #             type=i["type"],
-    #         )
-    #         cmd.id = i["id"]
-    #         self._application_commands[cmd.id] = cmd
-    #
-    #         # Permissions (Roles will be converted to IDs just before Upsert for Global Commands)
-    #         global_permissions.append({"id": i["id"], "permissions": cmd.permissions})
-    #
-    #     update_guild_commands = {}
-    #     async for guild in self.fetch_guilds(limit=None):
-    #         update_guild_commands[guild.id] = []
-    #     for command in filter(
-    #         lambda c: c.guild_ids is not None,
-    #         self.pending_application_commands
-    #     ):
-    #         as_dict = command.to_dict()
-    #         for guild_id in command.guild_ids:
-    #             to_update = update_guild_commands[guild_id]
-    #             to_update.append(as_dict)
-    #
-    #     for guild_id, guild_data in update_guild_commands.items():
-    #         try:
-    #             cmds = await self.http.bulk_upsert_guild_commands(
-    #                 self.user.id, guild_id, update_guild_commands[guild_id]
-    #             )
-    #
-    #             # Permissions for this Guild
-    #             guild_permissions: list = []
-    #         except Forbidden:
-    #             if not guild_data:
-    #                 continue
-    #             print(f"Failed to add command to guild {guild_id}", file=sys.stderr)
-    #             raise
-    #         else:
-    #             for i in cmds:
-    #                 cmd = find(
-    #                     lambda cmd: cmd.name == i["name"] and cmd.type == i["type"] and int(i["guild_id"]) in cmd.guild_ids,
-    #                     self.pending_application_commands
-    #                 )
-    #                 cmd.id = i["id"]
-    #                 self._application_commands[cmd.id] = cmd
-    #
-    #                 # Permissions
-    #                 permissions = [
-    #                     perm.to_dict()
-    #                     for perm in cmd.permissions
-    #                     if perm.guild_id is None
-    #                     or (
-    #                         perm.guild_id == guild_id and perm.guild_id in cmd.guild_ids
-    #                     )
-    #                 ]
-    #                 guild_permissions.append(
-    #                     {"id": i["id"], "permissions": permissions}
-    #                 )
-    #
-    #             for global_command in global_permissions:
-    #                 permissions = [
-    #                     perm.to_dict()
-    #                     for perm in global_command["permissions"]
-    #                     if perm.guild_id is None
-    #                     or (
-    #                         perm.guild_id == guild_id and perm.guild_id in cmd.guild_ids
-    #                     )
-    #                 ]
-    #                 guild_permissions.append(
-    #                     {"id": global_command["id"], "permissions": permissions}
-    #                 )
-    #
-    #             # Collect & Upsert Permissions for Each Guild
-    #             # Command Permissions for this Guild
-    #             guild_cmd_perms: list = []
-    #
-    #             # Loop through Commands Permissions available for this Guild
-    #             for item in guild_permissions:
-    #                 new_cmd_perm = {"id": item["id"], "permissions": []}
-    #
-    #                 # Replace Role / Owner Names with IDs
-    #                 for permission in item["permissions"]:
-    #                     if isinstance(permission["id"], str):
-    #                         # Replace Role Names
-    #                         if permission["type"] == 1:
-    #                             role = get(
-    #                                 self.get_guild(guild_id).roles,
-    #                                 name=permission["id"],
-    #                             )
-    #
-    #                             # If not missing
-    #                             if role is not None:
-    #                                 new_cmd_perm["permissions"].append(
-    #                                     {
-    #                                         "id": role.id,
-    #                                         "type": 1,
-    #                                         "permission": permission["permission"],
-    #                                     }
-    #                                 )
-    #                             else:
-    #                                 print(
-    #                                     "No Role ID found in Guild ({guild_id}) for Role ({role})".format(
-    #                                         guild_id=guild_id, role=permission["id"]
-    #                                     )
-    #                                 )
-    #                         # Add owner IDs
-    #                         elif (
-    #                             permission["type"] == 2 and permission["id"] == "owner"
-    #                         ):
-    #                             app = await self.application_info()  # type: ignore
-    #                             if app.team:
-    #                                 for m in app.team.members:
-    #                                     new_cmd_perm["permissions"].append(
-    #                                         {
-    #                                             "id": m.id,
-    #                                             "type": 2,
-    #                                             "permission": permission["permission"],
-    #                                         }
-    #                                     )
-    #                             else:
-    #                                 new_cmd_perm["permissions"].append(
-    #                                     {
-    #                                         "id": app.owner.id,
-    #                                         "type": 2,
-    #                                         "permission": permission["permission"],
-    #                                     }
-    #                                 )
-    #                     # Add the rest
-    #                     else:
-    #                         new_cmd_perm["permissions"].append(permission)
-    #
-    #                 # Make sure we don't have over 10 overwrites
-    #                 if len(new_cmd_perm["permissions"]) > 10:
-    #                     print(
-    #                         "Command '{name}' has more than 10 permission overrides in guild ({guild_id}).\nwill only use the first 10 permission overrides.".format(
-    #                             name=self._application_commands[new_cmd_perm["id"]].name,
-    #                             guild_id=guild_id,
-    #                         )
-    #                     )
-    #                     new_cmd_perm["permissions"] = new_cmd_perm["permissions"][:10]
-    #
-    #                 # Append to guild_cmd_perms
-    #                 guild_cmd_perms.append(new_cmd_perm)
-    #
-    #             # Upsert
-    #             try:
-    #                 await self.http.bulk_upsert_command_permissions(
-    #                     self.user.id, guild_id, guild_cmd_perms
-    #                 )
-    #             except Forbidden:
-    #                 print(
-    #                     f"Failed to add command permissions to guild {guild_id}",
-    #                     file=stderr,
-    #                 )
-    #                 raise
+    async def register_commands(self) -> None:
+        """
+        Register application commands which changed since last start, instead of overwriting every scope.
+        See `CommandSync` for details.
+        """
+        async with self.startup.track('commands'):
+            await self.command_sync.sync()
 
     async def sync_commands(self) -> None:
-        self.add_application_command()
-        print('Not Implemented!')
-        raise NotImplementedError
+        await self.command_sync.sync()
 
     def __init__(self):
-        self.config: BotConfig = BotConfig.from_file()
         self.logger = get_logger('gamepad')
+        self.startup: StartupPipeline = StartupPipeline(self.logger)
+        started = time.perf_counter()
+        self.config: BotConfig = BotConfig.from_file()
+        self.startup.record('config', time.perf_counter() - started)
+        self.db: Database = Database(
+            DB_PATH,
+            readers=DB_READER_COUNT,
+            cache_size_kb=DB_CACHE_SIZE_KB,
+            cached_statements=DB_CACHED_STATEMENTS
+        )
+        self.command_sync: CommandSync = CommandSync(self, COMMAND_MANIFEST_PATH)
+        self.metrics: MetricsRegistry = MetricsRegistry(prefix='gamepad_')
+        self.metrics_server: MetricsServer = MetricsServer(self.metrics, METRICS_HOST, METRICS_PORT)
+        self.interaction_latency = self.metrics.histogram(
+            'interaction_seconds', 'Time taken to handle interactions.', ('type', 'name')
+        )
+        self.command_errors = self.metrics.counter(
+            'command_errors_total', 'Count of slash commands which raised an error.', ('name',)
+        )
         super(GamepadBot, self).__init__(command_prefix='<@923958493189398528>', help_command=None)
+        # Cogs add their phases after these ones when loaded.
+        self.startup.add('db', self.db.open)
+        self.startup.add('gateway', self.wait_until_ready, required=False)
+        self.startup.add('metrics', self.metrics_server.start, required=False)
+        self.metrics.gauge('guilds', 'Count of guilds.').set_function(lambda: len(self.guilds))
+        self.metrics.gauge('views', 'Count of views attached to messages.').set_function(
+            lambda: len(self._connection._view_store._synced_message_views)
+        )
+        self.metrics.gauge('gateway_latency_seconds', 'Latency of gateway heartbeat.').set_function(
+            lambda: self.latency
+        )
 
     def run(self, *args, **kwargs):
         """
         Run bot.
         * intent : To wrap original Bot.run() method to not receive any args and return restart flag.
         """
-        self.load_extension('bot.lfg')
         # self.load_extension('bot.sns')
-        self.load_extension('bot.help')
-        self.load_extension('bot.admin')
+        for extension in ('bot.lfg', 'bot.help', 'bot.admin'):
+            started = time.perf_counter()
+            self.load_extension(extension)
+            self.startup.record(f'load {extension}', time.perf_counter() - started)
         super(GamepadBot, self).run(self.config.token)
 
+    async def start(self, *args, **kwargs):
+        """
+        Run startup phases while connecting to discord.
+        """
+        self.startup.start()
+        await super(GamepadBot, self).start(*args, **kwargs)
+
+    async def close(self):
+        """
+        Let cogs finish their works using `cog_close` coroutine, then close connections.
+        """
+        self.startup.cancel()
+        for cog in tuple(self.cogs.values()):
+            cog_close = getattr(cog, 'cog_close', None)
+            if cog_close is not None:
+                try:
+                    await cog_close()
+                except Exception as e:
+                    self.logger.exception(f'Failed to close cog {cog.qualified_name}', exc_info=e)
+        await super(GamepadBot, self).close()
+        await self.db.close()
+        await self.metrics_server.stop()
+
+    async def ensure_ready(self, interaction: Interaction) -> bool:
+        """
+        Wait shortly for startup to be ready. If it takes longer, reply that bot is warming up.
+        :param interaction: interaction to handle.
+        :return: whether interaction can be handled now.
+        """
+        if await self.startup.wait_ready(STARTUP_WAIT_SEC):
+            return True
+        if interaction.type is InteractionType.auto_complete:
+            await interaction.response.send_autocomplete_result(choices=[])
+        else:
+            await interaction.response.send_message('봇을 준비하고 있습니다. 잠시 후 다시 시도해주세요.', ephemeral=True)
+        return False
+
+    @contextmanager
+    def time_interaction(self, kind: str, name: str) -> Iterator[None]:
+        """
+        Observe seconds taken by the block into `interaction_latency`.
+        Time spent in wait_for() is excluded, since it depends on how fast users reply.
+        :param kind: type of interaction.
+        :param name: name of command or button.
+        """
+        waited = [0.0]
+        token = _user_wait.set(waited)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _user_wait.reset(token)
+            self.interaction_latency.observe(time.perf_counter() - started - waited[0], kind, name)
+
+    async def wait_for(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super(GamepadBot, self).wait_for(*args, **kwargs)
+        finally:
+            waited = _user_wait.get()
+            if waited is not None:
+                waited[0] += time.perf_counter() - started
+
+    async def process_application_commands(self, interaction: Interaction) -> None:
+        if interaction.type is InteractionType.application_command:
+            self.startup.command_received()
+            kind = 'command'
+        elif interaction.type is InteractionType.auto_complete:
+            kind = 'autocomplete'
+        else:
+            return
+        # Time waiting for startup is not part of handling.
+        if not await self.ensure_ready(interaction):
+            return
+        with self.time_interaction(kind, command_name(interaction.data)):
+            await super(GamepadBot, self).process_application_commands(interaction)
+
+    async def on_application_command_error(self, context: ApplicationContext, exception: DiscordException) -> None:
+        self.command_errors.inc(context.command.qualified_name if context.command is not None else 'unknown')
+        await super(GamepadBot, self).on_application_command_error(context, exception)
+
     async def on_ready(self):
         self.logger.info('봇이 실행되었습니다 :D')
         print('전체 슬래시 커맨드 :')
@@ -1,187 +1,364 @@
 import asyncio
+import os
+import pickle
 import sqlite3
-from datetime import datetime, timedelta
-from functools import partial
-from typing import Callable, Optional
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Coroutine, Final, Iterable, Optional
 
-import aiofiles
 import aiosqlite
 import attr
-from discord import ui, commands, ButtonStyle, Interaction, Embed
-from discord import Cog, Option, Guild, Member
+from discord import ui, commands, ButtonStyle, Interaction, InteractionType, Embed
+from discord import Cog, Option, OptionChoice, AutocompleteContext, Guild, Member
 from discord.ext import tasks
 
-from typings import CoroutineFunction
-from utils.asyncio_helper import async_schedule_task
-from .constants import ADMIN_ID, DB_PATH, CREATE, EDIT, LIST, DELETE, INITIAL_COLOR, VIEW, TEST_SERVERS, \
-    LFG_ALERT_PREV_SEC, DUMP_PATH
+from utils.backup import backup_database, rotate_backups
+from utils.edit_coalescer import EditCoalescer
+from utils.lru import LRUCache
+from utils.notifier import DMNotifier, DeliveryReport
+from utils.scheduler import DeadlineScheduler
+from .constants import ADMIN_ID, CREATE, EDIT, LIST, DELETE, INITIAL_COLOR, VIEW, TEST_SERVERS, \
+    LFG_ALERT_PREV_SEC, LFG_ALERT_MISSED_GRACE_SEC, LFG_ALERT_CONCURRENCY, EMBED_CACHE_SIZE, LFG_EDIT_WINDOW_SEC, \
+    LFG_ARCHIVE_GRACE_SEC, LFG_SWEEP_INTERVAL_MIN, BACKUP_DIR, BACKUP_RETENTION, BACKUP_STEP_PAGES, \
+    MEMBER_RESOLVE_CONCURRENCY, ROLE_PARTICIPANT, ROLE_ALTERNATIVE, JOIN, ALTERNATIVE, LEAVE, LIST_PAGE, PAGE_NEXT, \
+    PAGE_PREV, LFG_LIST_PAGE_SIZE, LFG_LIST_GAME_MAX_LEN, SEARCH, SEARCH_PAGE, LFG_SEARCH_TEXT_MAX_LEN, \
+    AUTOCOMPLETE_LIMIT, SNAPSHOT_PATH
 from .gamepad_bot import GamepadBot
-from utils.dt_utils import text2dt, dt2text, readable_time_text, get_current_dt, timedelta2sec
+from .lfg_registry import LFGRegistry
+from .lfg_schema import migrate
+from .lfg_snapshot import write_snapshot, read_snapshot
+from .member_resolver import MemberResolver
+from utils.dt_utils import text2dt, epoch2dt, dt2epoch, readable_time_text
 
 
 # from .slash_patch import lazy_group_creation
 
+# Rendered info embeds, keyed by (lfg id, lfg version).
+EMBED_CACHE: Final[LRUCache[Embed]] = LRUCache(EMBED_CACHE_SIZE)
+# Alerts are dispatched in a second normally, but missed ones are sent up to LFG_ALERT_MISSED_GRACE_SEC late.
+ALERT_LAG_BUCKETS: Final[tuple[float, ...]] = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 3600.0)
+
 
-@attr.s(init=True, repr=True, cmp=True)
 class LFG:
     """
     LFG model object.
+    Only ids of discord objects are stored, and they are resolved when rendering,
+    so a lfg never keeps guild or member objects alive. Slotted to keep millions of lfg in memory.
     """
-    # Bot instance that created this lfg.
-    bot = attr.ib(type=GamepadBot, init=True, repr=False, cmp=False)
-
-    # LFG Info
-    id = attr.ib(type=int, init=True, repr=True, cmp=True)
-    name = attr.ib(type=str, init=True, repr=True, cmp=False)
-    description = attr.ib(type=str, init=True, repr=False, cmp=False)
-    game = attr.ib(type=str, init=True, repr=True, cmp=False)
-    dt = attr.ib(type=datetime, init=True, repr=False, cmp=False)
-
-    # Discord-Related
-    guild = attr.ib(type=Guild, init=True, repr=False, cmp=False)
-    owner = attr.ib(type=Member, init=True, repr=False, cmp=False)
-
-    # Member List
-    participants = attr.ib(type=list, init=False, default=attr.Factory(list))
-    alternatives = attr.ib(type=list, init=False, default=attr.Factory(list))
+    __slots__ = (
+        'id', 'name', 'description', 'game', 'timestamp', 'tz', 'guild_id', 'owner_id',
+        'participants', 'alternatives', 'max_size', 'alerted', 'registry', 'version',
+        '_participants_text', '_alternatives_text'
+    )
 
-    # Scheduled object
-    _task = attr.ib(type=asyncio.Task, init=False, repr=False, cmp=False, default=None)
-
-    def add_participant(self, member: Member):
+    def __init__(
+            self,
+            id: int,
+            name: str,
+            description: str,
+            game: str,
+            timestamp: int,
+            tz: str,
+            guild_id: int,
+            owner_id: int
+    ):
         """
-        Add member to lfg.
-        :param member:
+        :param id: id of lfg.
+        :param name: name of lfg.
+        :param description: description of lfg.
+        :param game: game title of lfg.
+        :param timestamp: planned time of lfg, in unix seconds.
+        :param tz: name of timezone which planned time is shown in.
+        :param guild_id: id of guild.
+        :param owner_id: id of member who created this lfg.
         """
-        self.participants.append(member)
-
-    def remove_participant(self, member: Member):
-        self.participants.remove(member)
+        # LFG Info
+        self.id: int = id
+        self.name: str = name
+        self.description: str = description
+        self.game: str = game
+        self.timestamp: int = timestamp
+        # Timezone names are shared by most lfg, so keep a single string of each.
+        self.tz: str = sys.intern(tz)
+
+        # Discord-Related
+        self.guild_id: int = guild_id
+        self.owner_id: int = owner_id
+
+        # Ids of members in joined order. Values are unused, dict is an ordered set.
+        self.participants: dict[int, None] = {}
+        self.alternatives: dict[int, None] = {}
+        # Max count of participants. None if unlimited.
+        self.max_size: Optional[int] = None
+
+        # Whether participants are alerted.
+        self.alerted: bool = False
+
+        # Registry which tracks changes of this lfg.
+        self.registry: Optional[LFGRegistry] = None
+
+        # Increased on every change, to invalidate rendered embeds.
+        self.version: int = 0
+        # Joined mentions of members. Appended on join, and rebuilt lazily after leave.
+        self._participants_text: Optional[str] = None
+        self._alternatives_text: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f'LFG(id={self.id}, name={self.name!r}, game={self.game!r})'
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, LFG) and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    @property
+    def dt(self) -> datetime:
+        """
+        Planned time of lfg, in its timezone.
+        """
+        return epoch2dt(self.timestamp, self.tz)
 
-    def remove_participant_by_id(self, member_id: int):
-        member = next(filter(lambda m: m.id == member_id, self.participants), None)
-        self.participants.remove(member)
+    def touch(self):
+        """
+        Mark this lfg as changed, so it is written in next db save and rendered again.
+        """
+        self.version += 1
+        if self.registry is not None:
+            self.registry.mark_dirty(self.id)
 
-    def has_participant(self, member: Member):
-        return member in self.participants
+    def _joined(self, member_id: int, role: int):
+        self.version += 1
+        if self.registry is not None:
+            self.registry.mark_joined(self.id, member_id, role)
 
-    def has_participant_by_id(self, member_id: int):
-        return any(filter(lambda m: m.id == member_id, self.participants))
+    def _left(self, member_id: int):
+        self.version += 1
+        if self.registry is not None:
+            self.registry.mark_left(self.id, member_id)
 
-    def add_alternative(self, member: Member):
+    @staticmethod
+    def _append_mention(text: Optional[str], count: int, member_id: int) -> Optional[str]:
+        if count == 1:
+            return f'<@{member_id}>'
+        if text is None:
+            return None
+        return f'{text}, <@{member_id}>'
+
+    def participants_text(self) -> str:
+        if self._participants_text is None:
+            self._participants_text = ', '.join(map(lambda i: f'<@{i}>', self.participants))
+        return self._participants_text
+
+    def alternatives_text(self) -> str:
+        if self._alternatives_text is None:
+            self._alternatives_text = ', '.join(map(lambda i: f'<@{i}>', self.alternatives))
+        return self._alternatives_text
+
+    def is_full(self) -> bool:
+        return self.max_size is not None and len(self.participants) >= self.max_size
+
+    def add_participant(self, member_id: int) -> int:
+        """
+        Add member to lfg. If lfg is full, member is added to alternatives, to be promoted when someone leaves.
+        :param member_id:
+        :return: ROLE_PARTICIPANT, or ROLE_ALTERNATIVE if lfg is full.
+        """
+        if self.is_full():
+            self.add_alternative(member_id)
+            return ROLE_ALTERNATIVE
+        self.participants[member_id] = None
+        self._participants_text = self._append_mention(self._participants_text, len(self.participants), member_id)
+        self._joined(member_id, ROLE_PARTICIPANT)
+        return ROLE_PARTICIPANT
+
+    def remove_participant(self, member_id: int) -> Optional[int]:
+        """
+        Remove member from participants, and promote first alternative into the freed place.
+        :param member_id:
+        :return: id of promoted member, or None if nobody is promoted.
+        """
+        del self.participants[member_id]
+        self._participants_text = None
+        self._left(member_id)
+        return self._promote()
+
+    def _promote(self) -> Optional[int]:
+        if self.max_size is None or self.is_full() or len(self.alternatives) == 0:
+            return None
+        member_id = next(iter(self.alternatives))
+        del self.alternatives[member_id]
+        self._alternatives_text = None
+        self.add_participant(member_id)
+        return member_id
+
+    def has_participant(self, member_id: int) -> bool:
+        return member_id in self.participants
+
+    def add_alternative(self, member_id: int):
         """
         Add member to lfg.
-        :param member:
+        :param member_id:
         """
-        self.alternatives.append(member)
+        self.alternatives[member_id] = None
+        self._alternatives_text = self._append_mention(self._alternatives_text, len(self.alternatives), member_id)
+        self._joined(member_id, ROLE_ALTERNATIVE)
 
-    def remove_alternative(self, member: Member):
-        self.alternatives.remove(member)
+    def remove_alternative(self, member_id: int):
+        del self.alternatives[member_id]
+        self._alternatives_text = None
+        self._left(member_id)
 
-    def remove_alternative_by_id(self, member_id: int):
-        member = next(filter(lambda m: m.id == member_id, self.alternatives), None)
-        self.alternatives.remove(member)
+    def has_alternative(self, member_id: int) -> bool:
+        return member_id in self.alternatives
 
-    def has_alternative(self, member: Member):
-        return member in self.alternatives
-
-    def has_alternative_by_id(self, member_id: int):
-        return any(filter(lambda m: m.id == member_id, self.alternatives))
-
-    async def update(self, name: str, description: str, game: str, dt: datetime):
+    def update(self, name: str, description: str, game: str, dt: datetime):
+        old_name, old_game = self.name, self.game
         self.name = name
         self.description = description
         self.game = game
-        self.dt = dt
-        if self._task:
-            self._task.cancel('lfg 업데이트로 인한 예약 취소 및 다시 예약하기.')
-        await self.schedule()
+        timestamp, tz = dt2epoch(dt)
+        rescheduled = timestamp != self.timestamp
+        if rescheduled:
+            # Alert again on new time.
+            self.alerted = False
+        self.timestamp = timestamp
+        self.tz = sys.intern(tz)
+        self.touch()
+        if self.registry is None:
+            return
+        if rescheduled:
+            self.registry.mark_rescheduled(self)
+        if old_name != name or old_game != game:
+            self.registry.mark_renamed(self, old_name, old_game)
 
-    async def alert_members(self):
+    def alert_at(self) -> float:
+        """
+        Timestamp to alert participants, which is LFG_ALERT_PREV_SEC seconds before start.
+        """
+        return self.timestamp - LFG_ALERT_PREV_SEC
+
+    async def alert_members(self, notifier: DMNotifier, guild: Optional[Guild]) -> DeliveryReport:
         """
         Send dm to participants.
-        :return:
+        :param notifier: DMNotifier to send dm.
+        :param guild: guild of this lfg, to render alert. None if bot cannot see the guild.
+        :return: DeliveryReport of participants.
         """
-        for m in self.participants:
-            await m.send(embed=self.alert_embed())
+        return await notifier.send(self.participants, self.alert_embed(guild))
 
-    async def schedule(self):
+    @staticmethod
+    def group_members(member_rows: Iterable[tuple[int, int, int]]) -> dict[int, tuple[list[int], list[int]]]:
         """
-        Schedule this lfg.
+        Group rows of lfg_member table by lfg.
+        :param member_rows: (lfg id, member id, role) rows, ordered by joined time.
+        :return: (participant ids, alternative ids) keyed by lfg id.
         """
-        kst_now = get_current_dt()
-        td_left: timedelta = self.dt - kst_now
-        sec_left: int = timedelta2sec(td_left)
-        if sec_left < LFG_ALERT_PREV_SEC:
-            return await self.alert_members()
-        else:
-            self._task = async_schedule_task(sec_left, self.alert_members)
+        members: dict[int, tuple[list[int], list[int]]] = {}
+        for lfg_id, member_id, role in member_rows:
+            participant_ids, alternative_ids = members.setdefault(lfg_id, ([], []))
+            (participant_ids if role == ROLE_PARTICIPANT else alternative_ids).append(member_id)
+        return members
 
     @classmethod
-    async def deserialize(
+    def deserialize(
             cls,
-            bot: GamepadBot,
             id: int,
             name: str,
             description: str,
             game: str,
-            datetime_raw: str,
+            timestamp: int,
+            tz: str,
             guild_id: int,
             owner_id: int,
-            participants_raw: str,
-            alternatives_raw: str
+            alerted: int,
+            max_size: Optional[int],
+            participant_ids: Iterable[int] = (),
+            alternative_ids: Iterable[int] = ()
     ) -> 'LFG':
         """
         Deserialize from db.
-        :param bot: bot instance.
         :param id: id of lfg
         :param name: name of lfg
         :param description: description of lfg
         :param game: game title of lfg
-        :param datetime_raw: raw text expression of datetime. (serialized using dt2text)
+        :param timestamp: planned time of lfg, in unix seconds.
+        :param tz: name of timezone which planned time is shown in.
         :param guild_id: id of guild
         :param owner_id: id of member who created this lfg.
-        :param participants_raw: raw text of participants' member ids separated using ',' char.
-        :param alternatives_raw: raw text of alternatives' ids separated using ',' char.
+        :param alerted: 1 if participants are alerted, else 0.
+        :param max_size: max count of participants, or None if unlimited.
+        :param participant_ids: ids of participants, in joined order.
+        :param alternative_ids: ids of alternatives, in joined order.
         :return: LFG instance.
         """
-        dt = text2dt(datetime_raw)
-        guild = bot.get_guild(guild_id) or (await bot.fetch_guild(guild_id))
-        owner = guild.get_member(owner_id) or (await guild.fetch_member(owner_id))
-        lfg = cls(bot, id, name, description, game, dt, guild, owner)
-        if participants_raw != '':  # Not empty.
-            for member_id in map(int, participants_raw.split(',')):
-                member = guild.get_member(member_id) or (await guild.fetch_member(member_id))
-                lfg.add_participant(member)
-        if alternatives_raw != '':  # Not empty.
-            for member_id in map(int, alternatives_raw.split(',')):
-                member = guild.get_member(member_id) or (await guild.fetch_member(member_id))
-                lfg.add_alternative(member)
-
+        lfg = cls(id, name, description, game, timestamp, tz, guild_id, owner_id)
+        lfg.alerted = bool(alerted)
+        lfg.max_size = max_size
+        lfg.participants = dict.fromkeys(participant_ids)
+        lfg.alternatives = dict.fromkeys(alternative_ids)
         return lfg
 
-    def serialize(self) -> tuple[str, str, str, str, int, int, str, str, int]:
+    def serialize(self) -> tuple[str, str, str, int, str, int, int, int, Optional[int], int]:
         """
-        Serialize to write in db.
-        :return: tuple of raw values (id: int, name: str, description: str, datetime: datetime -> str, participants: list -> str)
+        Serialize to write in db. Members are stored in lfg_member table separately.
+        :return: tuple of raw values (name: str, description: str, game: str, datetime: int, tz: str, guild: int, owner: int, alerted: bool -> int, max_size: Optional[int], id: int)
         """
         return (
             self.name,
             self.description,
             self.game,
-            dt2text(self.dt),
-            self.guild.id,
-            self.owner.id,
-            ','.join(map(lambda m: str(m.id), self.participants)),
-            ','.join(map(lambda m: str(m.id), self.alternatives)),
-            self.id # For WHERE id=? clause.
+            self.timestamp,
+            self.tz,
+            self.guild_id,
+            self.owner_id,
+            int(self.alerted),
+            self.max_size,
+            self.id
         )
 
+    def snapshot_row(self) -> tuple:
+        """
+        Raw values to store in snapshot. Unlike serialize(), members are included.
+        """
+        return (
+            self.id, self.name, self.description, self.game, self.timestamp, self.tz, self.guild_id, self.owner_id,
+            self.alerted, self.max_size, tuple(self.participants), tuple(self.alternatives)
+        )
+
+    @classmethod
+    def from_snapshot_row(cls, row: tuple) -> 'LFG':
+        *args, alerted, max_size, participant_ids, alternative_ids = row
+        lfg = cls(*args)
+        lfg.alerted = alerted
+        lfg.max_size = max_size
+        lfg.participants = dict.fromkeys(participant_ids)
+        lfg.alternatives = dict.fromkeys(alternative_ids)
+        return lfg
+
     def view(self) -> 'LFGView':
-        return LFGView(self)
+        return LFGView(self.id)
 
-    def info_embed(self) -> Embed:
-        return Embed(
+    def info_embed(self, guild: Optional[Guild]) -> Embed:
+        """
+        Embed showing this lfg. Rendered embed is cached until this lfg or name of its owner changes,
+        so it must not be modified.
+        Members are shown as mentions, which discord renders with their current name.
+        :param guild: guild of this lfg, to resolve its owner.
+        """
+        owner = guild.get_member(self.owner_id) if guild is not None else None
+        # Owner is missing until member cache is filled, and embed rendered without owner must not be kept after it.
+        key = (self.id, self.version, owner.display_name if owner is not None else None)
+        embed = EMBED_CACHE.get(key)
+        if embed is None:
+            embed = self._render_info_embed(owner)
+            EMBED_CACHE.put(key, embed)
+        return embed
+
+    def _render_info_embed(self, owner: Optional[Member]) -> Embed:
+        size = f'{len(self.participants)}/{self.max_size}' if self.max_size is not None else str(len(self.participants))
+        embed = Embed(
             title=f'LFG : {self.name}',
             description=self.description,
             color=INITIAL_COLOR
@@ -198,118 +375,247 @@ class LFG:
             value=self.game,
             inline=False
         ).add_field(
-            name=f'참여자 ({len(self.participants)})',
-            value=', '.join(map(lambda m: m.display_name, self.participants)) if len(self.participants) > 0 else 'ㅤ',
+            name=f'참여자 ({size})',
+            value=self.participants_text() if len(self.participants) > 0 else 'ㅤ',
             inline=False
         ).add_field(
             name=f'고민중 ({len(self.alternatives)})',
-            value=', '.join(map(lambda m: m.display_name, self.alternatives)) if len(self.alternatives) > 0 else 'ㅤ',
+            value=self.alternatives_text() if len(self.alternatives) > 0 else 'ㅤ',
             inline=True
-        ).set_author(
-            name=self.owner.display_name,
-            # icon_url=self.owner.display_avatar.url
         )
+        if owner is not None:
+            embed.set_author(
+                name=owner.display_name,
+                # icon_url=owner.display_avatar.url
+            )
+        return embed
 
-    def alert_embed(self) -> Embed:
-        self.bot.logger.info(
-            '\n'.format(map(lambda m: f'- ({type(m)}) {m.display_name}#{m.discriminator}', self.participants)))
-        return Embed(
+    def alert_embed(self, guild: Optional[Guild]) -> Embed:
+        """
+        Embed sent to participants before lfg starts.
+        :param guild: guild of this lfg, to resolve its owner and icon.
+        """
+        embed = Embed(
             title=f'LFG : {self.name}',
             description='lfg 예정 시간이 얼마 남지 않았습니다.',
             color=INITIAL_COLOR
         ).add_field(
             name='참여자',
-            value=', '.join(map(lambda m: m.display_name, self.participants)) if len(self.participants) > 0 else 'ㅤ',
+            value=self.participants_text() if len(self.participants) > 0 else 'ㅤ',
             inline=False
-        ).set_author(
-            name=self.owner.display_name,
-            # icon_url=self.owner.display_avatar.url    # NameError 'Asset' Not defined? It seems like pycord-side problem :(
-        ).set_thumbnail(
-            url=self.guild.icon.url
         )
+        if guild is None:
+            return embed
+        owner = guild.get_member(self.owner_id)
+        if owner is not None:
+            embed.set_author(
+                name=owner.display_name,
+                # icon_url=owner.display_avatar.url    # NameError 'Asset' Not defined? It seems like pycord-side problem :(
+            )
+        return embed.set_thumbnail(
+            url=guild.icon.url if guild.icon is not None else Embed.Empty
+        )
+
+
+class LFGView(ui.View):
+    """
+    Buttons of lfg message. Custom id of each button is `{lfg id}_{action}`.
+    This view only renders buttons. Clicks are handled by GamepadLFG.on_lfg_button using custom id,
+    so the view is stopped right away to be dropped from view store, and buttons keep working after restart.
+    """
+    def __init__(self, lfg_id: int):
+        super(LFGView, self).__init__(
+            ui.Button(label='+', style=ButtonStyle.success, custom_id=f'{lfg_id}_{JOIN}'),
+            ui.Button(label='?', style=ButtonStyle.primary, custom_id=f'{lfg_id}_{ALTERNATIVE}'),
+            ui.Button(label='-', style=ButtonStyle.danger, custom_id=f'{lfg_id}_{LEAVE}'),
+            timeout=None
+        )
+        self.stop()
 
 
-class LFGButton(ui.Button):
-    def __init__(self, lfg, callback: CoroutineFunction, label: str, style: ButtonStyle, custom_id: str):
-        super(LFGButton, self).__init__(label=label, style=style, custom_id=custom_id)
-        self.callback = LFGButton.wrap_callback(self, callback)
-        self.lfg = lfg
+@attr.s(init=True, repr=True, frozen=True)
+class LFGListQuery:
+    """
+    Filters of /lfg list.
+    Paging buttons keep filters and cursor in their custom id, as `lfglist_{direction}_{cursor}_{owner}_{upcoming}_{game}`,
+    so pages are served without any state in bot.
+    """
+    guild_id = attr.ib(type=int)
+    owner_id = attr.ib(type=Optional[int], default=None)
+    game = attr.ib(type=Optional[str], default=None)
+    upcoming = attr.ib(type=bool, default=False)
 
-    @staticmethod
-    def wrap_callback(self, coro: CoroutineFunction):
-        callback = partial(coro, self)
-        return callback
+    def custom_id(self, direction: str, cursor: int) -> str:
+        return f'{LIST_PAGE}_{direction}_{cursor}_{self.owner_id or 0}_{int(self.upcoming)}_{self.game or ""}'
 
     @classmethod
-    def assign_lfg(cls, lfg: LFG, label: str, style: ButtonStyle, suffix: str) -> Callable[[CoroutineFunction], 'LFGButton']:
-        def wrapper(coro: CoroutineFunction) -> LFGButton:
-            if not asyncio.iscoroutinefunction(coro):
-                raise TypeError('Callback function of LFGButton must be a coroutine function.')
-            return cls(lfg, coro, label, style, str(lfg.id) + suffix)
+    def parse(cls, guild_id: int, custom_id: str) -> Optional[tuple['LFGListQuery', str, int]]:
+        """
+        Parse custom id of paging button.
+        :param guild_id: id of guild where button is clicked.
+        :param custom_id: custom id of button.
+        :return: tuple of (query, direction, cursor), or None if it is not a paging button.
+        """
+        parts = custom_id.split('_', 5)
+        if len(parts) != 6 or parts[0] != LIST_PAGE:
+            return None
+        _, direction, cursor, owner_id, upcoming, game = parts
+        if direction not in (PAGE_NEXT, PAGE_PREV) or not cursor.isdigit() or not owner_id.isdigit():
+            return None
+        return cls(guild_id, int(owner_id) or None, game or None, upcoming == '1'), direction, int(cursor)
+
+    def where(self) -> tuple[str, list]:
+        """
+        WHERE clause of this query, with its parameters.
+        """
+        clauses = ['guild = ?']
+        params: list = [self.guild_id]
+        if self.owner_id is not None:
+            clauses.append('owner = ?')
+            params.append(self.owner_id)
+        if self.game is not None:
+            clauses.append('game = ?')
+            params.append(self.game)
+        if self.upcoming:
+            clauses.append('datetime >= ?')
+            params.append(int(time.time()))
+        return ' AND '.join(clauses), params
+
+    def title(self) -> str:
+        filters = []
+        if self.owner_id is not None:
+            filters.append(f'<@{self.owner_id}> 님의 lfg')
+        if self.game is not None:
+            filters.append(f'게임 : {self.game}')
+        if self.upcoming:
+            filters.append('예정된 lfg')
+        return '**LFG 명단**' + (f' ({", ".join(filters)})' if filters else '')
+
+    def view(self, rows: list[tuple], has_prev: bool, has_next: bool) -> 'PagingView':
+        if len(rows) == 0:
+            return PagingView(self.custom_id(PAGE_PREV, 0), self.custom_id(PAGE_NEXT, 0), False, False)
+        return PagingView(self.custom_id(PAGE_PREV, rows[0][0]), self.custom_id(PAGE_NEXT, rows[-1][0]), has_prev, has_next)
+
+
+@attr.s(init=True, repr=True, frozen=True)
+class LFGSearchQuery:
+    """
+    Query of /lfg search. Paging buttons keep it in their custom id, as `lfgsearch_{page}_{upcoming}_{text}`.
+    """
+    guild_id = attr.ib(type=int)
+    text = attr.ib(type=str)
+    upcoming = attr.ib(type=bool, default=False)
 
-        return wrapper
+    def custom_id(self, page: int) -> str:
+        return f'{SEARCH_PAGE}_{page}_{int(self.upcoming)}_{self.text}'
 
+    @classmethod
+    def parse(cls, guild_id: int, custom_id: str) -> Optional[tuple['LFGSearchQuery', int]]:
+        """
+        Parse custom id of paging button.
+        :param guild_id: id of guild where button is clicked.
+        :param custom_id: custom id of button.
+        :return: tuple of (query, page), or None if it is not a paging button of search.
+        """
+        parts = custom_id.split('_', 3)
+        if len(parts) != 4 or parts[0] != SEARCH_PAGE or not parts[1].isdigit():
+            return None
+        _, page, upcoming, text = parts
+        return cls(guild_id, text, upcoming == '1'), int(page)
 
-class LFGView(ui.View):
-    async def update_lfg_embed(self, interaction: Interaction):
+    def match(self) -> str:
         """
-        Update embed in interaction response to apply changes in lfg.
-        :param interaction: interaction payload.
+        FTS5 query. Each word of text is matched as a prefix in name, description or game, and lfg must match every word.
         """
-        await interaction.response.edit_message(embed=self.lfg.info_embed())
-
-    def __init__(self, lfg: LFG):
-        self.lfg = lfg
-
-        @LFGButton.assign_lfg(lfg, '+', ButtonStyle.success, '_join')
-        async def join_btn(btn: LFGButton, interaction: Interaction):
-            if not lfg.has_participant_by_id(interaction.user.id):
-                if lfg.has_alternative_by_id(interaction.user.id):
-                    lfg.remove_alternative_by_id(interaction.user.id)
-                lfg.add_participant(interaction.user)
-            else:
-                return await interaction.response.send_message(content='이미 참여하셨습니다!', ephemeral=True, delete_after=3.0)
-            await btn.view.update_lfg_embed(interaction)
-
-        self.join_btn = join_btn
-
-        @LFGButton.assign_lfg(lfg, '?', ButtonStyle.primary, '_alt')
-        async def alt_btn(btn: LFGButton, interaction: Interaction):
-            if not lfg.has_alternative_by_id(interaction.user.id):
-                if lfg.has_participant_by_id(interaction.user.id):
-                    lfg.remove_participant_by_id(interaction.user.id)
-                lfg.add_alternative(interaction.user)
-            else:
-                return await interaction.response.send_message(content='이미 참여하셨습니다!', ephemeral=True, delete_after=3.0)
-            await btn.view.update_lfg_embed(interaction)
-
-        self.alt_btn = alt_btn
-
-        @LFGButton.assign_lfg(lfg, '-', ButtonStyle.danger, '_leave')
-        async def leave_btn(btn: LFGButton, interaction: Interaction):
-            if lfg.has_participant_by_id(interaction.user.id):
-                lfg.remove_participant(interaction.user)
-            elif lfg.has_alternative_by_id(interaction.user.id):
-                lfg.remove_alternative(interaction.user)
-            else:
-                return await interaction.response.send_message(content='lfg에 참여하지 않으셨습니다!', ephemeral=True, delete_after=3.0)
-            await btn.view.update_lfg_embed(interaction)
-
-        self.leave_btn = leave_btn
-        super(LFGView, self).__init__(self.join_btn, self.alt_btn, self.leave_btn,
-                                      timeout=0)  # set timeout 0 to respond anytime.
+        terms = ' '.join(f'"{word}"*' for word in self.text.replace('"', '""').split())
+        return f'guild : "{self.guild_id}" AND {{name description game}} : ({terms})'
+
+    def title(self) -> str:
+        return f'**LFG 검색 결과** ({self.text}{", 예정된 lfg" if self.upcoming else ""})'
+
+    def view(self, page: int, has_next: bool) -> 'PagingView':
+        return PagingView(self.custom_id(max(page - 1, 0)), self.custom_id(page + 1), page > 0, has_next)
+
+
+class PagingView(ui.View):
+    """
+    Paging buttons of lfg list and search results.
+    Clicks are handled by listeners of GamepadLFG using custom id, like LFGView.
+    """
+    def __init__(self, prev_id: str, next_id: str, has_prev: bool, has_next: bool):
+        super(PagingView, self).__init__(
+            ui.Button(label='◀', style=ButtonStyle.secondary, custom_id=prev_id, disabled=not has_prev),
+            ui.Button(label='▶', style=ButtonStyle.secondary, custom_id=next_id, disabled=not has_next),
+            timeout=None
+        )
+        self.stop()
+
+
+def complete_lfg(ctx: AutocompleteContext) -> list[OptionChoice]:
+    """
+    Autocomplete of lfg id options.
+    """
+    cog: Optional[GamepadLFG] = ctx.bot.get_cog('lfg')
+    if cog is None or ctx.interaction.guild_id is None:
+        return []
+    return cog.complete_lfg(ctx.interaction.guild_id, str(ctx.value or ''))
+
+
+def complete_game(ctx: AutocompleteContext) -> list[str]:
+    """
+    Autocomplete of game options.
+    """
+    cog: Optional[GamepadLFG] = ctx.bot.get_cog('lfg')
+    if cog is None or ctx.interaction.guild_id is None:
+        return []
+    return cog.complete_game(ctx.interaction.guild_id, str(ctx.value or ''))
 
 
 class GamepadLFG(Cog, name='lfg'):
     def __init__(self, bot: GamepadBot):
         self.bot = bot
-        self.lfg_cache: list[LFG] = []
-        self.bot.loop.create_task(self.fetch_db(), name='lfg.fetch')
+        self.registry: LFGRegistry = LFGRegistry()
+        metrics = bot.metrics
+        self.db_latency = metrics.histogram('db_seconds', 'Time taken by database operations of lfg.', ('operation',))
+        self.alert_latency = metrics.histogram('alert_seconds', 'Time taken to alert participants of a lfg.')
+        self.alert_messages = metrics.counter('alert_messages_total', 'Count of alert messages by result.', ('result',))
+        self.alert_lag = metrics.histogram(
+            'alert_lag_seconds', 'Delay between scheduled time of alerts and their dispatch.', buckets=ALERT_LAG_BUCKETS
+        )
+        self.scheduler: DeadlineScheduler = DeadlineScheduler(
+            self.alert_lfg, name='lfg.alert', on_lag=self.alert_lag.observe
+        )
+        metrics.gauge('lfg', 'Count of lfg in memory.').set_function(lambda: len(self.registry))
+        metrics.gauge('scheduled_alerts', 'Count of scheduled alerts.').set_function(lambda: len(self.scheduler))
+        metrics.gauge('embed_cache', 'Count of cached lfg embeds.').set_function(lambda: len(EMBED_CACHE))
+        self.notifier: DMNotifier = DMNotifier(bot, concurrency=LFG_ALERT_CONCURRENCY)
+        # Merges edits of lfg messages on burst of clicks.
+        self.edit_coalescer: EditCoalescer = EditCoalescer(LFG_EDIT_WINDOW_SEC, logger=bot.logger)
+        self.button_actions: dict[str, Callable[[LFG, Interaction], Coroutine]] = {
+            JOIN: self.join_lfg,
+            ALTERNATIVE: self.alternate_lfg,
+            LEAVE: self.leave_lfg
+        }
+        # Count of lfg moved into archive by sweep_expired.
+        self.archived_count: int = 0
+        # Whether lfg are loaded. Snapshot of registry is written only after they are.
+        self.loaded: bool = False
+        # Whether cog is unloaded. Startup phases of unloaded cog may still run, so they check it.
+        self.unloaded: bool = False
+        if bot.startup.ready.is_set() or bot.startup.phase_started('lfg.load'):
+            # Loaded again after lfg were loaded, by startup or by unloaded cog.
+            self.bot.loop.create_task(self.fetch_db(), name='lfg.fetch')
+        else:
+            # Phases of unloaded cog are replaced, if extension is reloaded before they start.
+            bot.startup.add('lfg.load', self.load_lfgs, after=('db',))
+            bot.startup.add('lfg.jobs', self.start_jobs, after=('lfg.load',))
+            bot.startup.add('lfg.owners', self.warm_owner_cache, after=('lfg.load', 'gateway'), required=False)
         self.lfg_group = bot.create_group('lfg', 'LFG 명령어', guild_ids=TEST_SERVERS)
 
         self.lfg_group.command(name=CREATE, description='LFG를 생성합니다.')(self.lfg_create)
         self.lfg_group.command(name=EDIT, description='LFG를 편집합니다.')(self.lfg_edit)
         self.lfg_group.command(name=LIST, description='생성된 LFG의 목록을 확인합니다.')(self.lfg_list)
+        self.lfg_group.command(name=SEARCH, description='LFG를 검색합니다.')(self.lfg_search)
         self.lfg_group.command(name=DELETE, description='LFG를 삭제합니다.')(self.lfg_delete)
         self.lfg_group.command(name=VIEW, description='LFG 정보를 표시합니다.')(self.lfg_view)
         self.lfg_group.command(name='commit', description='LFG 데이터를 저장합니다.')(self.lfg_manual_save)
@@ -318,17 +624,41 @@ class GamepadLFG(Cog, name='lfg'):
         """
         Handle cog unload.
         """
+        self.unloaded = True
+        self.scheduler.stop()
+        self.sweep_expired.cancel()
+        self.backup_db.cancel()
         self.bot.loop.create_task(self.save_db(), name='lfg.commit')
 
+    async def cog_close(self):
+        """
+        Handle bot close. Save changes before database is closed.
+        """
+        self.scheduler.stop()
+        self.sweep_expired.cancel()
+        self.backup_db.cancel()
+        await self.save_db()
+        await self.save_snapshot()
+
     # DB Operations
     @tasks.loop(hours=1)
     async def backup_db(self):
-        self.bot.logger.info('Start database dump.')
-        async with aiosqlite.connect(DB_PATH) as conn:
-            async with aiofiles.open(DUMP_PATH, mode='w') as f:
-                async for line in conn.iterdump():
-                    await f.write(line + '\n')
-        self.bot.logger.info('Database dump completed.')
+        """
+        Back up database into BACKUP_DIR, keeping latest BACKUP_RETENTION backups.
+        Backup runs in a worker thread, so event loop is never blocked.
+        """
+        # Write changes in memory first, so they are included in backup.
+        await self.save_db()
+        started = time.perf_counter()
+        try:
+            with self.db_latency.time('backup'):
+                path = await asyncio.to_thread(backup_database, self.bot.db.path, BACKUP_DIR, pages=BACKUP_STEP_PAGES)
+            removed = await asyncio.to_thread(rotate_backups, BACKUP_DIR, keep=BACKUP_RETENTION)
+        except (OSError, sqlite3.Error) as e:
+            return self.bot.logger.exception('Failed to back up database.', exc_info=e)
+        self.bot.logger.info(
+            f'Backed up database into {path} in {time.perf_counter() - started:.2f}s. ({len(removed)} old backups removed)'
+        )
 
     # DB Operations
     @tasks.loop(hours=1)
@@ -336,64 +666,487 @@ class GamepadLFG(Cog, name='lfg'):
         await self.save_db()
 
     async def fetch_db(self):
-        async with aiosqlite.connect(DB_PATH) as con:
-            # For first startup.
-            await con.execute('CREATE TABLE IF NOT EXISTS lfg '
-                              '(id INTEGER PRIMARY KEY, '
-                              'name TEXT NOT NULL, '
-                              'description TEXT, '
-                              'game TEXT, '
-                              'datetime TEXT, '
-                              'guild INTEGER, '
-                              'owner INTEGER, '
-                              'participants TEXT, '
-                              'alternatives TEXT)')
+        await self.load_lfgs()
+        await self.start_jobs()
+        await self.warm_owner_cache()
+
+    async def load_lfgs(self):
+        """
+        Migrate tables, and load every lfg into registry.
+        """
+        async with self.bot.db.transaction() as con:
+            # Create or upgrade tables.
+            await migrate(con)
+        if await self.load_snapshot():
+            self.loaded = True
+            return
+        with self.db_latency.time('load'):
+            lfgs, last_id = await self._read_lfgs()
+        self.registry.load(lfgs)
+        if last_id is not None:
+            # Ids of deleted or archived lfg are not reused, since their messages may still have buttons.
+            self.registry.reserve_ids(last_id)
+        # Rebuild alert schedule. Alerts missed while bot was offline are sent right away.
+        self.scheduler.clear()
+        for lfg in lfgs:
+            self.schedule_alert(lfg)
+        self.loaded = True
+        self.bot.logger.info(f'Loaded {len(lfgs)} lfg.')
+
+    async def _read_lfgs(self) -> tuple[list[LFG], Optional[int]]:
+        """
+        Read every lfg from db.
+        :return: lfg, and largest id ever handed out, from archive and from id stored by save_db().
+        """
+        async with self.bot.db.reader() as con:
             # get all lfg
-            lfg_cache: list[LFG] = []
-            async with con.execute('SELECT * FROM lfg') as c:
-                async for col in c:
-                    lfg_cache.append(await LFG.deserialize(self.bot, *col))
-            self.lfg_cache = lfg_cache
+            async with con.execute('SELECT id, name, description, game, datetime, tz, guild, owner, alerted, max_size FROM lfg') as c:
+                rows = await c.fetchall()
+            async with con.execute('SELECT lfg_id, user_id, role FROM lfg_member ORDER BY lfg_id, joined_at') as c:
+                members = LFG.group_members(await c.fetchall())
+            async with con.execute(
+                    "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM lfg_archive "
+                    "UNION ALL SELECT CAST(value AS INTEGER) FROM lfg_meta WHERE key = 'last_id')"
+            ) as c:
+                (last_id,) = await c.fetchone()
+        # Lfg only keeps ids, so they are loaded without resolving any discord object.
+        return [LFG.deserialize(*row, *members.get(row[0], ())) for row in rows], last_id
+
+    async def load_snapshot(self) -> bool:
+        """
+        Load lfg, indexes and alert schedule from snapshot written on last shutdown, if it matches last write of db.
+        Token of snapshot is removed from db first, so it is never loaded again once lfg are changed.
+        :return: whether lfg are loaded.
+        """
+        async with self.bot.db.transaction() as con:
+            async with con.execute("SELECT value FROM lfg_meta WHERE key = 'snapshot'") as c:
+                row = await c.fetchone()
+            await con.execute("DELETE FROM lfg_meta WHERE key = 'snapshot'")
+        if row is None:
+            return False
+        started = time.perf_counter()
+        try:
+            with self.db_latency.time('snapshot_load'):
+                rows, registry_state, schedule = await asyncio.to_thread(
+                    read_snapshot, SNAPSHOT_PATH, bytes.fromhex(row[0])
+                )
+        except (OSError, ValueError, pickle.UnpicklingError) as e:
+            self.bot.logger.warning(f'Failed to load snapshot, loading lfg from database instead. ({e})')
+            return False
+        self.registry.restore(map(LFG.from_snapshot_row, rows), registry_state)
+        # Skip alerts which became too late while bot was offline, as schedule_alert does.
+        now = time.time()
+        self.scheduler.restore(
+            (deadline, lfg_id) for deadline, lfg_id in schedule
+            if lfg_id in self.registry and self.registry.get(lfg_id).timestamp + LFG_ALERT_MISSED_GRACE_SEC >= now
+        )
+        self.bot.logger.info(f'Loaded {len(rows)} lfg from snapshot in {time.perf_counter() - started:.3f}s.')
+        return True
+
+    async def save_snapshot(self):
+        """
+        Write snapshot of lfg, and store its token in db. Must be called right after save_db(), when bot is closing.
+        """
+        if not self.loaded or self.registry.has_changes():
+            return
+        started = time.perf_counter()
+        token = os.urandom(16)
+        state = (
+            [lfg.snapshot_row() for lfg in self.registry],
+            self.registry.snapshot_state(),
+            self.scheduler.entries()
+        )
+        try:
+            # Written in this thread, since lfg must not change while they are pickled.
+            with self.db_latency.time('snapshot_write'):
+                size = write_snapshot(SNAPSHOT_PATH, token, state)
+        except OSError as e:
+            return self.bot.logger.exception('Failed to write snapshot.', exc_info=e)
+        # Token is stored last, so snapshot is used only if everything before succeeded.
+        async with self.bot.db.transaction() as con:
+            await con.execute("INSERT OR REPLACE INTO lfg_meta (key, value) VALUES ('snapshot', ?)", (token.hex(),))
+        self.bot.logger.info(
+            f'Wrote snapshot of {len(state[0])} lfg in {time.perf_counter() - started:.3f}s. ({size} bytes)'
+        )
+
+    async def start_jobs(self):
+        """
+        Start alert scheduler and background jobs.
+        """
+        if self.unloaded:
+            return
+        self.scheduler.start()
+        if not self.sweep_expired.is_running():
+            self.sweep_expired.start()
+        if not self.backup_db.is_running():
+            self.backup_db.start()
+
+    async def warm_owner_cache(self):
+        """
+        Request owners of every lfg at once, so their names are found in member cache when rendering embeds.
+        Only gateway requests fill member cache, so members are not fetched over REST.
+        """
+        await self.bot.wait_until_ready()
+        if self.unloaded:
+            return
+        owners: dict[int, set[int]] = {}
+        for lfg in self.registry:
+            owners.setdefault(lfg.guild_id, set()).add(lfg.owner_id)
+        resolver = MemberResolver(self.bot, concurrency=MEMBER_RESOLVE_CONCURRENCY, rest=False)
+        await resolver.resolve(owners)
+        self.bot.logger.info(
+            f'Resolved owners of lfg. ({len(resolver.missing_guilds)} guilds and '
+            f'{len(resolver.missing_members)} members not found)'
+        )
 
     async def save_db(self):
+        """
+        Write changed lfg into db. Unchanged lfg are not written.
+        """
         self.bot.logger.info('Saving current lfg.')
-        if len(self.lfg_cache) == 0:
-            self.bot.logger.info('No lfg on memory. Cancel save.')
+        if not self.registry.has_changes():
+            self.bot.logger.info('No changes in lfg. Cancel save.')
+            return
+        dirty, joined, left, deleted = self.registry.take_changes()
+        # Serialize now, since lfg can be changed while db thread is writing.
+        rows = [lfg.serialize() for lfg in dirty]
+        deleted_rows = [(lfg_id,) for lfg_id in deleted]
+        last_id = self.registry.last_id
+        try:
+            with self.db_latency.time('save'):
+                async with self.bot.db.transaction() as conn:
+                    await self._write_changes(conn, rows, joined, left)
+                    await conn.executemany('DELETE FROM lfg_member WHERE lfg_id = ?', deleted_rows)
+                    await conn.executemany('DELETE FROM lfg WHERE id = ?', deleted_rows)
+                    # Deleted rows are gone, so largest id is kept apart to never reuse it.
+                    await conn.execute(
+                        "INSERT OR REPLACE INTO lfg_meta (key, value) VALUES ('last_id', ?)", (str(last_id),)
+                    )
+        except BaseException:
+            self.registry.restore_changes(dirty, joined, left, deleted)
+            raise
+        self.bot.logger.info(
+            f'Successfully saved current lfg data. '
+            f'({len(rows)} saved, {len(joined)} joined, {len(left)} left, {len(deleted)} deleted)'
+        )
+
+    @staticmethod
+    async def _write_changes(
+            conn: aiosqlite.Connection,
+            rows: list[tuple],
+            joined: list[tuple[int, int, int, int]],
+            left: list[tuple[int, int]]
+    ):
+        """
+        Write serialized lfg and their member changes. Must be called in a transaction.
+        :param conn: connection to write.
+        :param rows: serialized lfg.
+        :param joined: joined members, in form of LFGRegistry.take_changes().
+        :param left: left members, in form of LFGRegistry.take_changes().
+        """
+        await conn.executemany(
+            'INSERT INTO lfg '
+            '(name, description, game, datetime, tz, guild, owner, alerted, max_size, id) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET '
+            'name=excluded.name, '
+            'description=excluded.description, '
+            'game=excluded.game, '
+            'datetime=excluded.datetime, '
+            'tz=excluded.tz, '
+            'guild=excluded.guild, '
+            'owner=excluded.owner, '
+            'alerted=excluded.alerted, '
+            'max_size=excluded.max_size',
+            rows
+        )
+        await conn.executemany(
+            'INSERT INTO lfg_member (lfg_id, user_id, role, joined_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(lfg_id, user_id) DO UPDATE SET role=excluded.role, joined_at=excluded.joined_at',
+            joined
+        )
+        await conn.executemany('DELETE FROM lfg_member WHERE lfg_id = ? AND user_id = ?', left)
+
+    @tasks.loop(minutes=LFG_SWEEP_INTERVAL_MIN)
+    async def sweep_expired(self):
+        """
+        Move lfg planned more than LFG_ARCHIVE_GRACE_SEC ago into archive tables, and drop them from memory.
+        """
+        expired, joined, left = self.registry.pop_expired(int(time.time()) - LFG_ARCHIVE_GRACE_SEC)
+        if len(expired) == 0:
+            return
+        for lfg in expired:
+            self.scheduler.cancel(lfg.id)
+        # Write latest state of expired lfg first, then copy them into archive.
+        rows = [lfg.serialize() for lfg in expired]
+        archived = [(int(time.time()), lfg.id) for lfg in expired]
+        ids = [(lfg.id,) for lfg in expired]
+        try:
+            with self.db_latency.time('sweep'):
+                async with self.bot.db.transaction() as conn:
+                    await self._write_changes(conn, rows, joined, left)
+                    await conn.executemany(
+                        'INSERT OR REPLACE INTO lfg_archive '
+                        '(id, name, description, game, datetime, tz, guild, owner, alerted, max_size, archived_at) '
+                        'SELECT id, name, description, game, datetime, tz, guild, owner, alerted, max_size, ? '
+                        'FROM lfg WHERE id = ?',
+                        archived
+                    )
+                    await conn.executemany(
+                        'INSERT OR REPLACE INTO lfg_archive_member (lfg_id, user_id, role, joined_at) '
+                        'SELECT lfg_id, user_id, role, joined_at FROM lfg_member WHERE lfg_id = ?',
+                        ids
+                    )
+                    await conn.executemany('DELETE FROM lfg_member WHERE lfg_id = ?', ids)
+                    await conn.executemany('DELETE FROM lfg WHERE id = ?', ids)
+        except Exception as e:
+            self.registry.restore_expired(expired, joined, left)
+            self.bot.logger.exception('Failed to archive expired lfg.', exc_info=e)
+            return
+        self.archived_count += len(expired)
+        self.bot.logger.info(f'Archived {len(expired)} expired lfg. ({self.archived_count} since start)')
+
+    # LFG Buttons
+    @Cog.listener('on_interaction')
+    async def on_lfg_button(self, interaction: Interaction):
+        """
+        Handle clicks on buttons of every lfg message, by parsing their custom id.
+        :param interaction: interaction payload.
+        """
+        if interaction.type is not InteractionType.component:
+            return
+        lfg_id, _, action = interaction.data.get('custom_id', '').partition('_')
+        callback = self.button_actions.get(action)
+        if callback is None or not lfg_id.isdigit():
+            return  # Not a lfg button.
+        if not await self.bot.ensure_ready(interaction):
+            return
+        with self.bot.time_interaction('button', action):
+            lfg: Optional[LFG] = self.registry.get(int(lfg_id))
+            if lfg is None:
+                return await interaction.response.send_message(content='삭제된 lfg입니다.', ephemeral=True, delete_after=3.0)
+            await callback(lfg, interaction)
+
+    @Cog.listener('on_interaction')
+    async def on_list_button(self, interaction: Interaction):
+        """
+        Handle clicks on paging buttons of /lfg list.
+        :param interaction: interaction payload.
+        """
+        if interaction.type is not InteractionType.component or interaction.guild_id is None:
+            return
+        parsed = LFGListQuery.parse(interaction.guild_id, interaction.data.get('custom_id', ''))
+        if parsed is None:
+            return  # Not a paging button.
+        if not await self.bot.ensure_ready(interaction):
+            return
+        with self.bot.time_interaction('button', LIST):
+            query, direction, cursor = parsed
+            rows, more = await self.fetch_lfg_page(query, cursor, direction)
+            # Page is reached from the other side, so the other side has more rows.
+            has_prev, has_next = (True, more) if direction == PAGE_NEXT else (more, True)
+            await interaction.response.edit_message(
+                **self.render_lfg_page(query.title(), rows, query.view(rows, has_prev, has_next))
+            )
+
+    @Cog.listener('on_interaction')
+    async def on_search_button(self, interaction: Interaction):
+        """
+        Handle clicks on paging buttons of /lfg search.
+        :param interaction: interaction payload.
+        """
+        if interaction.type is not InteractionType.component or interaction.guild_id is None:
+            return
+        parsed = LFGSearchQuery.parse(interaction.guild_id, interaction.data.get('custom_id', ''))
+        if parsed is None:
+            return  # Not a paging button.
+        if not await self.bot.ensure_ready(interaction):
             return
-        async with aiosqlite.connect(DB_PATH) as conn:
-            async with conn.cursor() as cur:
-                for lfg in self.lfg_cache:
-                    try:
-                        await cur.execute(
-                            'INSERT INTO lfg VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                            lfg.serialize()
-                        )
-                    except sqlite3.IntegrityError:
-                        await cur.execute(
-                            'UPDATE lfg SET '
-                            'name=?, '
-                            'description=?, '
-                            'game=?, '
-                            'datetime=?, '
-                            'guild=?, '
-                            'owner=?, '
-                            'participants=?, '
-                            'alternatives=? '
-                            'WHERE id = ?',
-                            lfg.serialize()
-                        )
-                # await cur.executemany(
-                #     'INSERT INTO lfg VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                #     map(lambda lfg: lfg.serialize(), self.lfg_cache)
-                # )
-            await conn.commit()
-        self.bot.logger.info('Successfully saved current lfg data.')
+        with self.bot.time_interaction('button', SEARCH):
+            query, page = parsed
+            rows, more = await self.search_lfg_page(query, page)
+            await interaction.response.edit_message(**self.render_lfg_page(query.title(), rows, query.view(page, more)))
+
+    async def fetch_lfg_page(self, query: LFGListQuery, cursor: Optional[int], direction: str) -> tuple[list[tuple], bool]:
+        """
+        Query a page of lfg, newest first. Pages are sought by id, so cost depends on page size only.
+        :param query: filters of list.
+        :param cursor: id of lfg next to the page, or None for the first page.
+        :param direction: PAGE_NEXT to read older lfg than cursor, or PAGE_PREV to read newer ones.
+        :return: (id, name, game, datetime, tz) rows in descending id order, and whether more rows exist in direction.
+        """
+        await self.flush_for_read()
+        where, params = query.where()
+        if cursor is not None:
+            where += ' AND id < ?' if direction == PAGE_NEXT else ' AND id > ?'
+            params.append(cursor)
+        order = 'DESC' if direction == PAGE_NEXT else 'ASC'
+        params.append(LFG_LIST_PAGE_SIZE + 1)
+        async with self.bot.db.reader() as conn:
+            async with conn.execute(
+                    f'SELECT id, name, game, datetime, tz FROM lfg WHERE {where} ORDER BY id {order} LIMIT ?', params
+            ) as c:
+                rows = await c.fetchall()
+        more = len(rows) > LFG_LIST_PAGE_SIZE
+        rows = rows[:LFG_LIST_PAGE_SIZE]
+        if direction == PAGE_PREV:
+            rows.reverse()
+        return rows, more
+
+    async def flush_for_read(self):
+        """
+        Write pending changes of lfg before querying them, so pages show every lfg as it is now.
+        Changes of members are not shown in pages, so they alone are left for next periodic write.
+        """
+        if self.registry.has_lfg_changes():
+            await self.save_db()
+
+    async def search_lfg_page(self, query: LFGSearchQuery, page: int) -> tuple[list[tuple], bool]:
+        """
+        Search lfg using full-text index, best matches first.
+        Name is weighted over game, and game over description.
+        :param query: query of search.
+        :param page: index of page, from 0.
+        :return: (id, name, game, datetime, tz) rows, and whether next page exists.
+        """
+        await self.flush_for_read()
+        sql = ('SELECT lfg.id, lfg.name, lfg.game, lfg.datetime, lfg.tz FROM lfg_fts JOIN lfg ON lfg.id = lfg_fts.rowid '
+               'WHERE lfg_fts MATCH ?')
+        params: list = [query.match()]
+        if query.upcoming:
+            sql += ' AND lfg.datetime >= ?'
+            params.append(int(time.time()))
+        sql += ' ORDER BY bm25(lfg_fts, 10.0, 1.0, 5.0, 0.0), lfg.id DESC LIMIT ? OFFSET ?'
+        params += [LFG_LIST_PAGE_SIZE + 1, page * LFG_LIST_PAGE_SIZE]
+        async with self.bot.db.reader() as conn:
+            try:
+                async with conn.execute(sql, params) as c:
+                    rows = await c.fetchall()
+            except sqlite3.OperationalError:
+                # Text without any searchable word.
+                return [], False
+        return rows[:LFG_LIST_PAGE_SIZE], len(rows) > LFG_LIST_PAGE_SIZE
+
+    @staticmethod
+    def render_lfg_page(title: str, rows: list[tuple], view: PagingView) -> dict:
+        """
+        Render a page of lfg list or search results.
+        :param title: title of page.
+        :param rows: (id, name, game, datetime, tz) rows.
+        :param view: paging buttons.
+        :return: keyword arguments to send or edit message.
+        """
+        if len(rows) == 0:
+            return {'content': f'{title}\n표시할 lfg가 없습니다.', 'view': view}
+        lines = [title]
+        for lfg_id, name, game, timestamp, tz in rows:
+            lines.append(f'{lfg_id} : {name} ({game}, {readable_time_text(epoch2dt(timestamp, tz))})')
+        return {'content': '\n'.join(lines), 'view': view}
+
+    async def update_lfg_message(self, lfg: LFG, interaction: Interaction):
+        """
+        Update embed in interaction response to apply changes in lfg.
+        Clicks within LFG_EDIT_WINDOW_SEC are merged into one message edit.
+        :param lfg: changed lfg.
+        :param interaction: interaction payload.
+        """
+        await self.edit_coalescer.submit(interaction, lambda: {'embed': lfg.info_embed(interaction.guild)})
+
+    async def join_lfg(self, lfg: LFG, interaction: Interaction):
+        if lfg.has_participant(interaction.user.id):
+            return await interaction.response.send_message(content='이미 참여하셨습니다!', ephemeral=True, delete_after=3.0)
+        if lfg.has_alternative(interaction.user.id):
+            if lfg.is_full():
+                return await interaction.response.send_message(
+                    content='정원이 가득 찼습니다. 자리가 나면 자동으로 참여됩니다.', ephemeral=True, delete_after=3.0
+                )
+            lfg.remove_alternative(interaction.user.id)
+        role = lfg.add_participant(interaction.user.id)
+        await self.update_lfg_message(lfg, interaction)
+        if role == ROLE_ALTERNATIVE:
+            await interaction.followup.send(
+                content='정원이 가득 차 고민중 명단에 추가되었습니다. 자리가 나면 자동으로 참여됩니다.', ephemeral=True
+            )
+
+    async def alternate_lfg(self, lfg: LFG, interaction: Interaction):
+        if not lfg.has_alternative(interaction.user.id):
+            if lfg.has_participant(interaction.user.id):
+                lfg.remove_participant(interaction.user.id)
+            lfg.add_alternative(interaction.user.id)
+        else:
+            return await interaction.response.send_message(content='이미 참여하셨습니다!', ephemeral=True, delete_after=3.0)
+        await self.update_lfg_message(lfg, interaction)
+
+    async def leave_lfg(self, lfg: LFG, interaction: Interaction):
+        if lfg.has_participant(interaction.user.id):
+            lfg.remove_participant(interaction.user.id)
+        elif lfg.has_alternative(interaction.user.id):
+            lfg.remove_alternative(interaction.user.id)
+        else:
+            return await interaction.response.send_message(content='lfg에 참여하지 않으셨습니다!', ephemeral=True, delete_after=3.0)
+        await self.update_lfg_message(lfg, interaction)
+
+    # Autocomplete
+    def complete_lfg(self, guild_id: int, text: str) -> list[OptionChoice]:
+        """
+        Suggest lfg of guild whose id or name starts with text, or latest lfg if text is empty.
+        :param guild_id: id of guild.
+        :param text: text typed by user.
+        :return: choices shown as `id : name`.
+        """
+        if text.strip() == '':
+            lfgs = reversed(self.registry.recent(guild_id, AUTOCOMPLETE_LIMIT))
+        else:
+            lfgs = map(self.registry.get, self.registry.completion.lfg_ids(guild_id, text, AUTOCOMPLETE_LIMIT))
+        # Discord limits name of choice to 100 characters.
+        return [OptionChoice(f'{lfg.id} : {lfg.name}'[:100], lfg.id) for lfg in lfgs if lfg is not None]
+
+    def complete_game(self, guild_id: int, text: str) -> list[str]:
+        """
+        Suggest games used in guild, most used first, so the same game is written in the same way.
+        :param guild_id: id of guild.
+        :param text: text typed by user.
+        """
+        return [game[:100] for game in self.registry.completion.games(guild_id, text, AUTOCOMPLETE_LIMIT)]
 
     # LFG Operation
-    def create_new_lfg(self, name: str, description: str, game: str, dt: datetime, guild: Guild, owner: Member):
-        id: int = self.lfg_cache[-1].id + 1 if len(self.lfg_cache) > 0 else 0
-        lfg = LFG(self.bot, id, name, description, game, dt, guild, owner)
-        self.lfg_cache.append(lfg)
+    def schedule_alert(self, lfg: LFG):
+        """
+        Schedule alert of lfg, replacing previous one.
+        Alert is skipped if participants are already alerted, or lfg started more than LFG_ALERT_MISSED_GRACE_SEC ago.
+        :param lfg: lfg to schedule.
+        """
+        self.scheduler.cancel(lfg.id)
+        if lfg.alerted or lfg.timestamp + LFG_ALERT_MISSED_GRACE_SEC < time.time():
+            return
+        self.scheduler.schedule(lfg.id, lfg.alert_at())
+
+    async def alert_lfg(self, lfg_id: int):
+        """
+        Scheduler callback. Alert participants of lfg.
+        :param lfg_id: id of lfg.
+        """
+        lfg: Optional[LFG] = self.registry.get(lfg_id)
+        if lfg is None or lfg.alerted:
+            return
+        lfg.alerted = True
+        lfg.touch()
+        try:
+            with self.alert_latency.time():
+                report = await lfg.alert_members(self.notifier, self.bot.get_guild(lfg.guild_id))
+        except Exception as e:
+            self.bot.logger.exception(f'Failed to alert lfg {lfg_id}', exc_info=e)
+            return
+        self.alert_messages.inc('sent', amount=report.sent)
+        self.alert_messages.inc('forbidden', amount=report.forbidden)
+        self.alert_messages.inc('failed', amount=report.failed)
+        self.bot.logger.info(
+            f'Alerted lfg {lfg_id}. ({report.sent} sent, {report.forbidden} forbidden, {report.failed} failed)'
+        )
+
+    def create_new_lfg(self, name: str, description: str, game: str, dt: datetime, guild_id: int, owner_id: int):
+        lfg = LFG(self.registry.next_id(), name, description, game, *dt2epoch(dt), guild_id, owner_id)
+        self.registry.add(lfg)
         return lfg
 
     # @slash_command(name='create', lazy_group='lfg')
@@ -402,8 +1155,10 @@ class GamepadLFG(Cog, name='lfg'):
             ctx: commands.ApplicationContext,
             name: Option(str, description='LFG의 이름입니다.'),
             description: Option(str, description='LFG의 설명입니다.'),
-            game: Option(str, description='파티를 구하는 게임 이름입니다.'),
-            dt: Option(str, description='LFG의 예정 시각입니다. YYYY-MM-DD:HH-MM 형식으로 입력해주세요.')
+            game: Option(str, description='파티를 구하는 게임 이름입니다.', autocomplete=complete_game),
+            dt: Option(str, description='LFG의 예정 시각입니다. YYYY-MM-DD:HH-MM 형식으로 입력해주세요.'),
+            max_size: Option(int, description='최대 참여 인원입니다. 초과한 인원은 고민중 명단에서 대기합니다.',
+                             required=False, default=None, min_value=1)
     ):
         """
         LFG Create slash command.
@@ -412,27 +1167,29 @@ class GamepadLFG(Cog, name='lfg'):
         :param description: description of lfg.
         :param game: game title of lfg.
         :param dt: planned datetime of lfg.
+        :param max_size: max count of participants.
         """
         try:
             dt = text2dt(dt)
         except Exception:
             return await ctx.respond('시간 형식이 잘못되었습니다.')
-        lfg = self.create_new_lfg(name, description, game, dt, ctx.guild or None, ctx.author)
-        lfg.add_participant(ctx.author)
-        await lfg.schedule()
-        await ctx.respond(embed=lfg.info_embed(), view=lfg.view())
+        lfg = self.create_new_lfg(name, description, game, dt, ctx.guild_id, ctx.author.id)
+        lfg.max_size = max_size
+        lfg.add_participant(ctx.author.id)
+        self.schedule_alert(lfg)
+        await ctx.respond(embed=lfg.info_embed(ctx.guild), view=lfg.view())
 
     async def lfg_edit(
             self,
             ctx: commands.ApplicationContext,
-            id: Option(int, 'LFG의 id입니다.')
+            id: Option(int, 'LFG의 id입니다.', autocomplete=complete_lfg)
     ):
         """
         LFG Edit slash command.
         :param ctx:
         :param id:
         """
-        lfg = next(filter(lambda l: l.id == id, self.lfg_cache), None)
+        lfg = self.registry.get(id)
         if lfg is None:
             return await ctx.respond(f'id가 {id}인 lfg를 발견하지 못했습니다. :(')
         await ctx.defer(ephemeral=True)
@@ -454,34 +1211,56 @@ class GamepadLFG(Cog, name='lfg'):
             await answer.delete()
 
         args[-1] = text2dt(args[-1])
-        await lfg.update(*args)
-        await ctx.respond(embed=lfg.info_embed(), view=lfg.view())
+        lfg.update(*args)
+        self.schedule_alert(lfg)
+        await ctx.respond(embed=lfg.info_embed(ctx.guild), view=lfg.view())
 
     async def lfg_list(
             self,
-            ctx: commands.ApplicationContext
+            ctx: commands.ApplicationContext,
+            owner: Option(Member, description='이 멤버가 생성한 lfg만 표시합니다.', required=False, default=None),
+            game: Option(str, description='이 게임의 lfg만 표시합니다.', required=False, default=None,
+                         autocomplete=complete_game),
+            upcoming: Option(bool, description='예정 시각이 지나지 않은 lfg만 표시합니다.', required=False, default=False)
     ):
         """
-        LFG list slash command.
-        :param ctx:
-        :return:
+        LFG list slash command. Shows lfg of guild newest first, with paging buttons.
+        :param ctx: ApplicationContext object.
+        :param owner: member who created lfg.
+        :param game: game title of lfg.
+        :param upcoming: whether to show upcoming lfg only.
+        """
+        if game is not None and len(game) > LFG_LIST_GAME_MAX_LEN:
+            return await ctx.respond(f'게임 이름은 {LFG_LIST_GAME_MAX_LEN}자 이하로 입력해주세요.', ephemeral=True)
+        await ctx.defer(ephemeral=False)
+        query = LFGListQuery(ctx.guild_id, owner.id if owner is not None else None, game, upcoming)
+        rows, more = await self.fetch_lfg_page(query, None, PAGE_NEXT)
+        await ctx.followup.send(**self.render_lfg_page(query.title(), rows, query.view(rows, False, more)))
+
+    async def lfg_search(
+            self,
+            ctx: commands.ApplicationContext,
+            text: Option(str, description='lfg의 이름, 설명, 게임에서 찾을 단어입니다.'),
+            upcoming: Option(bool, description='예정 시각이 지나지 않은 lfg만 표시합니다.', required=False, default=False)
+    ):
+        """
+        LFG search slash command. Shows lfg of guild matching every word, best matches first.
+        :param ctx: ApplicationContext object.
+        :param text: words to search.
+        :param upcoming: whether to show upcoming lfg only.
         """
+        text = ' '.join(text.split())
+        if len(text) == 0 or len(text) > LFG_SEARCH_TEXT_MAX_LEN:
+            return await ctx.respond(f'검색어는 1자 이상 {LFG_SEARCH_TEXT_MAX_LEN}자 이하로 입력해주세요.', ephemeral=True)
         await ctx.defer(ephemeral=False)
-        text: str = '**LFG 명단 (최근 lfg 20개)**\n'
-        for lfg in tuple(filter(lambda l: l.guild.id == ctx.guild_id, self.lfg_cache))[-20:]:
-            text += f'{lfg.id} : {lfg.name}\n'
-        await ctx.followup.send(text, ephemeral=False)
-        own_lfg_text: str = f'**{ctx.author.display_name} 님의 lfg(최대 20개)**\n'
-        for lfg in tuple(
-                filter(lambda l: l.owner.id == ctx.author.id and l.guild.id == ctx.guild_id, self.lfg_cache))[
-                   -20:]:
-            own_lfg_text += f'{lfg.id} : {lfg.name}\n'
-        await ctx.followup.send(own_lfg_text, ephemeral=False)
+        query = LFGSearchQuery(ctx.guild_id, text, upcoming)
+        rows, more = await self.search_lfg_page(query, 0)
+        await ctx.followup.send(**self.render_lfg_page(query.title(), rows, query.view(0, more)))
 
     async def lfg_delete(
             self,
             ctx: commands.ApplicationContext,
-            id: Option(int, description='LFG의 id입니다.')
+            id: Option(int, description='LFG의 id입니다.', autocomplete=complete_lfg)
     ):
         """
         LFG Delete slash command.
@@ -489,17 +1268,17 @@ class GamepadLFG(Cog, name='lfg'):
         :param id:
         :return:
         """
-        lfg: Optional[LFG] = next(filter(lambda l: l.id == id, self.lfg_cache), None)
+        lfg: Optional[LFG] = self.registry.remove(id)
         if lfg is None:
             return await ctx.respond(f'id가 {id}인 lfg를 발견하지 못했습니다. :(', ephemeral=True)
+        self.scheduler.cancel(lfg.id)
 
-        self.lfg_cache.remove(lfg)
         await ctx.respond(f'`{lfg.id} : {lfg.name}` lfg를 삭제했습니다.', ephemeral=True)
 
     async def lfg_view(
             self,
             ctx: commands.ApplicationContext,
-            id: Option(int, description='lfg의 id입니다.')
+            id: Option(int, description='lfg의 id입니다.', autocomplete=complete_lfg)
     ):
         """
         LFG View slash command.
@@ -507,10 +1286,10 @@ class GamepadLFG(Cog, name='lfg'):
         :param id: id of lfg.
         :return:
         """
-        lfg: Optional[LFG] = next(filter(lambda l: l.id == id, self.lfg_cache), None)
+        lfg: Optional[LFG] = self.registry.get(id)
         if lfg is None:
             return await ctx.respond(f'id가 {id}인 lfg를 발견하지 못했습니다. :(', ephemeral=True)
-        await ctx.respond(embed=lfg.info_embed(), view=lfg.view())
+        await ctx.respond(embed=lfg.info_embed(ctx.guild), view=lfg.view())
 
     async def lfg_manual_save(self, ctx: commands.ApplicationContext):
         """
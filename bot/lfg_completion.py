@@ -0,0 +1,205 @@
+"""
+LFG Completion
+--------------
+In-memory prefix index of lfg ids, names and games, for autocomplete of slash command options.
+@author Lapis0875
+"""
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nlargest
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .lfg import LFG
+
+__all__ = (
+    'normalize',
+    'LFGCompletionIndex',
+)
+
+
+def normalize(text: str) -> str:
+    """
+    Key of text in index. Case and repeated spaces are ignored.
+    """
+    return ' '.join(text.casefold().split())
+
+
+def _prefixed(entries: list[tuple[str, object]], prefix: str) -> Iterator[tuple[str, object]]:
+    """
+    Iterate entries whose key starts with prefix, in key order.
+    """
+    for i in range(bisect_left(entries, (prefix,)), len(entries)):
+        entry = entries[i]
+        if not entry[0].startswith(prefix):
+            return
+        yield entry
+
+
+def _remove(entries: list[tuple[str, object]], entry: tuple[str, object]):
+    i = bisect_left(entries, entry)
+    if i < len(entries) and entries[i] == entry:
+        del entries[i]
+
+
+class _GuildCompletion:
+    __slots__ = ('lfgs', 'games', 'game_counts', 'spellings')
+
+    def __init__(self):
+        # (id or normalized name, lfg id), sorted.
+        self.lfgs: list[tuple[str, int]] = []
+        # (normalized game from each word, normalized game), sorted.
+        self.games: list[tuple[str, str]] = []
+        # normalized game -> count of lfg.
+        self.game_counts: dict[str, int] = {}
+        # normalized game -> count of each spelling.
+        self.spellings: dict[str, Counter] = {}
+
+
+class LFGCompletionIndex:
+    """
+    Per-guild sorted lists of keys, searched by binary search. Updated incrementally when lfg are added, edited or removed.
+    Lfg are found by prefix of their id or name. Games are found by prefix of any word, and ranked by count of lfg.
+    Different spellings of a game (such as case) share one entry, which suggests its most used spelling.
+    """
+
+    def __init__(self):
+        self._guilds: dict[int, _GuildCompletion] = {}
+
+    def clear(self):
+        self._guilds.clear()
+
+    def build(self, lfgs: Iterable['LFG']):
+        """
+        Replace index with given lfg. Keys are sorted once, rather than inserted one by one.
+        :param lfgs: lfg objects to index.
+        """
+        self._guilds.clear()
+        for lfg in lfgs:
+            guild = self._guilds.get(lfg.guild_id)
+            if guild is None:
+                guild = self._guilds[lfg.guild_id] = _GuildCompletion()
+            guild.lfgs.append((str(lfg.id), lfg.id))
+            guild.lfgs.append((normalize(lfg.name), lfg.id))
+            key = normalize(lfg.game)
+            if key:
+                guild.game_counts[key] = guild.game_counts.get(key, 0) + 1
+                guild.spellings.setdefault(key, Counter())[lfg.game.strip()] += 1
+        for guild in self._guilds.values():
+            guild.lfgs.sort()
+            guild.games = sorted((word_key, key) for key in guild.game_counts for word_key in self._word_keys(key))
+
+    def state(self) -> dict[int, tuple]:
+        """
+        Sorted lists and counts of each guild, to store in snapshot.
+        """
+        return {
+            guild_id: (guild.lfgs, guild.games, guild.game_counts, guild.spellings)
+            for guild_id, guild in self._guilds.items()
+        }
+
+    def restore(self, state: dict[int, tuple]):
+        """
+        Replace index with state(). Lists are already sorted, so nothing is sorted again.
+        """
+        self._guilds.clear()
+        for guild_id, (lfgs, games, game_counts, spellings) in state.items():
+            guild = self._guilds[guild_id] = _GuildCompletion()
+            guild.lfgs, guild.games, guild.game_counts, guild.spellings = lfgs, games, game_counts, spellings
+
+    def add(self, lfg: 'LFG'):
+        guild = self._guilds.get(lfg.guild_id)
+        if guild is None:
+            guild = self._guilds[lfg.guild_id] = _GuildCompletion()
+        insort(guild.lfgs, (str(lfg.id), lfg.id))
+        insort(guild.lfgs, (normalize(lfg.name), lfg.id))
+        self._add_game(guild, lfg.game)
+
+    def remove(self, lfg: 'LFG'):
+        self._remove(lfg.guild_id, lfg.id, lfg.name, lfg.game)
+
+    def rename(self, lfg: 'LFG', old_name: str, old_game: str):
+        """
+        Update keys of edited lfg.
+        :param lfg: edited lfg.
+        :param old_name: name of lfg before edit.
+        :param old_game: game of lfg before edit.
+        """
+        self._remove(lfg.guild_id, lfg.id, old_name, old_game)
+        self.add(lfg)
+
+    def _remove(self, guild_id: int, lfg_id: int, name: str, game: str):
+        guild = self._guilds.get(guild_id)
+        if guild is None:
+            return
+        _remove(guild.lfgs, (str(lfg_id), lfg_id))
+        _remove(guild.lfgs, (normalize(name), lfg_id))
+        self._remove_game(guild, game)
+        if len(guild.lfgs) == 0:
+            del self._guilds[guild_id]
+
+    @staticmethod
+    def _word_keys(key: str) -> list[str]:
+        words = key.split(' ')
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def _add_game(self, guild: _GuildCompletion, game: str):
+        key = normalize(game)
+        if not key:
+            return
+        count = guild.game_counts.get(key, 0)
+        if count == 0:
+            guild.spellings[key] = Counter()
+            for word_key in self._word_keys(key):
+                insort(guild.games, (word_key, key))
+        guild.game_counts[key] = count + 1
+        guild.spellings[key][game.strip()] += 1
+
+    def _remove_game(self, guild: _GuildCompletion, game: str):
+        key = normalize(game)
+        count = guild.game_counts.get(key, 0)
+        if count == 0:
+            return
+        if count > 1:
+            guild.game_counts[key] = count - 1
+            spellings = guild.spellings[key]
+            spellings[game.strip()] -= 1
+            if spellings[game.strip()] <= 0:
+                del spellings[game.strip()]
+            return
+        del guild.game_counts[key]
+        del guild.spellings[key]
+        for word_key in self._word_keys(key):
+            _remove(guild.games, (word_key, key))
+
+    def lfg_ids(self, guild_id: int, text: str, limit: int = 25) -> list[int]:
+        """
+        Ids of lfg whose id or name starts with text.
+        :param guild_id: id of guild.
+        :param text: text typed by user.
+        :param limit: max count of ids.
+        """
+        guild = self._guilds.get(guild_id)
+        if guild is None:
+            return []
+        ids: dict[int, None] = {}
+        for _, lfg_id in _prefixed(guild.lfgs, normalize(text)):
+            ids[lfg_id] = None
+            if len(ids) >= limit:
+                break
+        return list(ids)
+
+    def games(self, guild_id: int, text: str, limit: int = 25) -> list[str]:
+        """
+        Games which have a word starting with text, most used first.
+        :param guild_id: id of guild.
+        :param text: text typed by user.
+        :param limit: max count of games.
+        :return: most used spelling of each game.
+        """
+        guild = self._guilds.get(guild_id)
+        if guild is None:
+            return []
+        keys = {key for _, key in _prefixed(guild.games, normalize(text))}
+        best = nlargest(limit, keys, key=guild.game_counts.__getitem__)
+        return [guild.spellings[key].most_common(1)[0][0] for key in best]
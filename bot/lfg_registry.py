@@ -0,0 +1,368 @@
+"""
+LFG Registry
+------------
+In-memory store of lfg objects, with change tracking for db persistence.
+@author Lapis0875
+"""
+import heapq
+import time
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+
+from .lfg_completion import LFGCompletionIndex
+
+if TYPE_CHECKING:
+    from .lfg import LFG
+
+__all__ = (
+    'LFGRegistry',
+)
+
+
+class LFGRegistry:
+    """
+    In-memory store of lfg, indexed by id, by guild and by (guild, owner).
+    Secondary indexes are dicts keyed by lfg id, so they keep insertion order and remove entries in O(1).
+    Created or mutated lfg are marked as dirty and removed lfg as deleted, so only changes are written to db.
+    Joined or left members are tracked apart from lfg itself, so a membership change is written as a single row.
+    Planned times are kept in a min-heap to find expired lfg without scanning every lfg.
+    Heap entries are not updated when lfg is edited or removed, but checked against lfg when they are popped.
+    Ids, names and games are also kept in `completion`, a prefix index for autocomplete.
+    """
+
+    def __init__(self):
+        self._lfgs: dict[int, 'LFG'] = {}
+        self._by_guild: dict[int, dict[int, 'LFG']] = {}
+        self._by_owner: dict[tuple[int, int], dict[int, 'LFG']] = {}
+        self._next_id: int = 0
+        self._dirty: set[int] = set()
+        self._deleted: set[int] = set()
+        # lfg id -> member id -> (role, joined_at), or None if member left.
+        self._member_changes: dict[int, dict[int, Optional[tuple[int, int]]]] = {}
+        self._last_joined_at: int = 0
+        # (timestamp, lfg id) of every lfg, possibly stale.
+        self._expiry: list[tuple[int, int]] = []
+        self.completion: LFGCompletionIndex = LFGCompletionIndex()
+
+    def __len__(self) -> int:
+        return len(self._lfgs)
+
+    def __contains__(self, lfg_id: int) -> bool:
+        return lfg_id in self._lfgs
+
+    def __iter__(self) -> Iterator['LFG']:
+        return iter(self._lfgs.values())
+
+    def next_id(self) -> int:
+        """
+        Reserve a new lfg id.
+        :return: id which is not used by any lfg.
+        """
+        lfg_id = self._next_id
+        self._next_id += 1
+        return lfg_id
+
+    @property
+    def last_id(self) -> int:
+        """
+        Largest id handed out so far, or -1 if none.
+        """
+        return self._next_id - 1
+
+    def reserve_ids(self, last_id: int):
+        """
+        Ensure next ids are greater than given id.
+        :param last_id: largest id already in use.
+        """
+        if last_id >= self._next_id:
+            self._next_id = last_id + 1
+
+    def get(self, lfg_id: int) -> Optional['LFG']:
+        """
+        Find lfg using its id.
+        :param lfg_id: id of lfg.
+        :return: LFG instance, or None if not exist.
+        """
+        return self._lfgs.get(lfg_id)
+
+    def add(self, lfg: 'LFG'):
+        """
+        Add new lfg into registry.
+        :param lfg: LFG instance to add.
+        """
+        self._index(lfg)
+        self.completion.add(lfg)
+        self.mark_dirty(lfg.id)
+
+    def _index(self, lfg: 'LFG', expiry: bool = True):
+        lfg.registry = self
+        self._lfgs[lfg.id] = lfg
+        self._by_guild.setdefault(lfg.guild_id, {})[lfg.id] = lfg
+        self._by_owner.setdefault((lfg.guild_id, lfg.owner_id), {})[lfg.id] = lfg
+        if expiry:
+            heapq.heappush(self._expiry, (lfg.timestamp, lfg.id))
+        if lfg.id >= self._next_id:
+            self._next_id = lfg.id + 1
+
+    def _unindex(self, lfg: 'LFG'):
+        lfg.registry = None
+        del self._lfgs[lfg.id]
+        self._dirty.discard(lfg.id)
+        self._discard(self._by_guild, lfg.guild_id, lfg.id)
+        self._discard(self._by_owner, (lfg.guild_id, lfg.owner_id), lfg.id)
+        self.completion.remove(lfg)
+        if len(self._expiry) > 64 and len(self._expiry) > 2 * len(self._lfgs):
+            # Drop entries of removed lfg.
+            self._expiry = [(lfg.timestamp, lfg.id) for lfg in self._lfgs.values()]
+            heapq.heapify(self._expiry)
+
+    def _clear(self):
+        self._lfgs.clear()
+        self._by_guild.clear()
+        self._by_owner.clear()
+        self._dirty.clear()
+        self._deleted.clear()
+        self._member_changes.clear()
+        self._expiry.clear()
+
+    def load(self, lfgs: Iterable['LFG']):
+        """
+        Replace every lfg in registry with lfg loaded from db. Loaded lfg are not marked as dirty.
+        :param lfgs: lfg objects to store.
+        """
+        self._clear()
+        for lfg in lfgs:
+            self._index(lfg)
+        self.completion.build(self._lfgs.values())
+
+    def snapshot_state(self) -> tuple:
+        """
+        Indexes which are costly to rebuild, to store in snapshot with lfg. Lfg must be saved before.
+        :return: tuple of (next id, expiry heap, state of completion index).
+        """
+        if self.has_changes():
+            raise RuntimeError('Registry has unsaved changes.')
+        return self._next_id, self._expiry, self.completion.state()
+
+    def restore(self, lfgs: Iterable['LFG'], state: tuple):
+        """
+        Replace every lfg in registry with lfg loaded from snapshot, reusing indexes stored with them.
+        :param lfgs: lfg objects to store.
+        :param state: state returned by snapshot_state().
+        """
+        next_id, expiry, completion = state
+        self._clear()
+        for lfg in lfgs:
+            self._index(lfg, expiry=False)
+        self._expiry = expiry
+        self.reserve_ids(next_id - 1)
+        self.completion.restore(completion)
+
+    def remove(self, lfg_id: int) -> Optional['LFG']:
+        """
+        Remove lfg from registry.
+        :param lfg_id: id of lfg.
+        :return: Removed LFG instance, or None if not exist.
+        """
+        lfg = self._lfgs.get(lfg_id)
+        if lfg is None:
+            return None
+        self._unindex(lfg)
+        self._member_changes.pop(lfg_id, None)
+        self._deleted.add(lfg_id)
+        return lfg
+
+    def pop_expired(self, before: int) -> tuple[list['LFG'], list[tuple[int, int, int, int]], list[tuple[int, int]]]:
+        """
+        Remove every lfg planned before given time, with their pending member changes.
+        Removed lfg are not recorded as deleted, since caller moves them out of db by itself.
+        Caller must call restore_expired() if it fails to do so.
+        :param before: unix timestamp in seconds.
+        :return: tuple of (expired lfg objects, their joined members, their left members), in form of take_changes().
+        """
+        expired: list['LFG'] = []
+        joined: list[tuple[int, int, int, int]] = []
+        left: list[tuple[int, int]] = []
+        heap = self._expiry
+        while heap and heap[0][0] < before:
+            _, lfg_id = heapq.heappop(heap)
+            lfg = self._lfgs.get(lfg_id)
+            if lfg is None:
+                continue
+            if lfg.timestamp >= before:
+                # Postponed after entry was pushed.
+                heapq.heappush(heap, (lfg.timestamp, lfg_id))
+                continue
+            self._unindex(lfg)
+            for member_id, change in self._member_changes.pop(lfg_id, {}).items():
+                if change is None:
+                    left.append((lfg_id, member_id))
+                else:
+                    joined.append((lfg_id, member_id, *change))
+            expired.append(lfg)
+        return expired, joined, left
+
+    def restore_expired(
+            self,
+            expired: Iterable['LFG'],
+            joined: Iterable[tuple[int, int, int, int]],
+            left: Iterable[tuple[int, int]]
+    ):
+        """
+        Put back lfg popped by pop_expired(), which are failed to move out of db.
+        :param expired: expired lfg objects.
+        :param joined: their joined members.
+        :param left: their left members.
+        """
+        expired = list(expired)
+        for lfg in expired:
+            self._index(lfg)
+            self.completion.add(lfg)
+        self.restore_changes(expired, joined, left, ())
+
+    def mark_dirty(self, lfg_id: int):
+        """
+        Mark lfg as changed, to be written in next save.
+        :param lfg_id: id of lfg.
+        """
+        if lfg_id in self._lfgs:
+            self._dirty.add(lfg_id)
+
+    def mark_rescheduled(self, lfg: 'LFG'):
+        """
+        Record that planned time of lfg changed, so it expires on new time.
+        :param lfg: rescheduled lfg.
+        """
+        if lfg.id in self._lfgs:
+            heapq.heappush(self._expiry, (lfg.timestamp, lfg.id))
+
+    def mark_renamed(self, lfg: 'LFG', old_name: str, old_game: str):
+        """
+        Record that name or game of lfg changed, to update completion.
+        :param lfg: edited lfg.
+        :param old_name: name of lfg before edit.
+        :param old_game: game of lfg before edit.
+        """
+        if lfg.id in self._lfgs:
+            self.completion.rename(lfg, old_name, old_game)
+
+    def mark_joined(self, lfg_id: int, member_id: int, role: int):
+        """
+        Record that member joined lfg, or moved to another role.
+        :param lfg_id: id of lfg.
+        :param member_id: id of member.
+        :param role: ROLE_PARTICIPANT or ROLE_ALTERNATIVE.
+        """
+        if lfg_id not in self._lfgs:
+            return
+        # Microseconds, kept strictly increasing to preserve join order.
+        joined_at = max(time.time_ns() // 1000, self._last_joined_at + 1)
+        self._last_joined_at = joined_at
+        self._member_changes.setdefault(lfg_id, {})[member_id] = (role, joined_at)
+
+    def mark_left(self, lfg_id: int, member_id: int):
+        """
+        Record that member left lfg.
+        :param lfg_id: id of lfg.
+        :param member_id: id of member.
+        """
+        if lfg_id in self._lfgs:
+            self._member_changes.setdefault(lfg_id, {})[member_id] = None
+
+    def has_changes(self) -> bool:
+        return len(self._dirty) > 0 or len(self._deleted) > 0 or len(self._member_changes) > 0
+
+    def has_lfg_changes(self) -> bool:
+        """
+        Whether any lfg was created, edited or deleted since last write. Changes of members are not counted.
+        """
+        return len(self._dirty) > 0 or len(self._deleted) > 0
+
+    def take_changes(self) -> tuple[list['LFG'], list[tuple[int, int, int, int]], list[tuple[int, int]], list[int]]:
+        """
+        Pop every pending change. Caller must call restore_changes() if it fails to write them.
+        :return: tuple of (dirty lfg objects, joined members as (lfg id, member id, role, joined_at),
+                 left members as (lfg id, member id), ids of deleted lfg)
+        """
+        dirty = [self._lfgs[lfg_id] for lfg_id in self._dirty if lfg_id in self._lfgs]
+        joined: list[tuple[int, int, int, int]] = []
+        left: list[tuple[int, int]] = []
+        for lfg_id, changes in self._member_changes.items():
+            for member_id, change in changes.items():
+                if change is None:
+                    left.append((lfg_id, member_id))
+                else:
+                    joined.append((lfg_id, member_id, *change))
+        deleted = list(self._deleted)
+        self._dirty.clear()
+        self._member_changes.clear()
+        self._deleted.clear()
+        return dirty, joined, left, deleted
+
+    def restore_changes(
+            self,
+            dirty: Iterable['LFG'],
+            joined: Iterable[tuple[int, int, int, int]],
+            left: Iterable[tuple[int, int]],
+            deleted: Iterable[int]
+    ):
+        """
+        Put back changes popped by take_changes(), which are failed to write.
+        Changes made after take_changes() are newer, so they are kept.
+        :param dirty: dirty lfg objects.
+        :param joined: joined members.
+        :param left: left members.
+        :param deleted: ids of deleted lfg.
+        """
+        for lfg in dirty:
+            self.mark_dirty(lfg.id)
+        for lfg_id, member_id, role, joined_at in joined:
+            if lfg_id in self._lfgs:
+                self._member_changes.setdefault(lfg_id, {}).setdefault(member_id, (role, joined_at))
+        for lfg_id, member_id in left:
+            if lfg_id in self._lfgs:
+                self._member_changes.setdefault(lfg_id, {}).setdefault(member_id, None)
+        for lfg_id in deleted:
+            if lfg_id not in self._lfgs:
+                self._deleted.add(lfg_id)
+
+    @staticmethod
+    def _discard(index: dict, key, lfg_id: int):
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.pop(lfg_id, None)
+        if len(bucket) == 0:
+            del index[key]
+
+    @staticmethod
+    def _tail(bucket: Optional[dict[int, 'LFG']], limit: int) -> list['LFG']:
+        if not bucket:
+            return []
+        recent = list(islice(reversed(bucket.values()), limit))
+        recent.reverse()
+        return recent
+
+    def of_guild(self, guild_id: int) -> Iterable['LFG']:
+        """
+        Every lfg created in guild, in creation order.
+        :param guild_id: id of guild.
+        """
+        return self._by_guild.get(guild_id, {}).values()
+
+    def recent(self, guild_id: int, limit: int = 20) -> list['LFG']:
+        """
+        Latest lfg created in guild, in creation order.
+        :param guild_id: id of guild.
+        :param limit: max count of lfg.
+        """
+        return self._tail(self._by_guild.get(guild_id), limit)
+
+    def recent_by_owner(self, guild_id: int, owner_id: int, limit: int = 20) -> list['LFG']:
+        """
+        Latest lfg created by member in guild, in creation order.
+        :param guild_id: id of guild.
+        :param owner_id: id of member who created lfg.
+        :param limit: max count of lfg.
+        """
+        return self._tail(self._by_owner.get((guild_id, owner_id)), limit)
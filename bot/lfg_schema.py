@@ -0,0 +1,277 @@
+"""
+LFG Schema
+----------
+Schema migrations of lfg database. Current version is stored in `PRAGMA user_version`.
+Bot migrates database on startup. To migrate an existing database file once, run:
+    python -m bot.lfg_schema [path]
+@author Lapis0875
+"""
+import asyncio
+import sys
+from typing import Callable, Coroutine
+
+import aiosqlite
+
+from utils.dt_utils import texts2epochs
+from .constants import DB_PATH, ID_SEP, ROLE_PARTICIPANT, ROLE_ALTERNATIVE
+
+__all__ = (
+    'MIGRATIONS',
+    'SCHEMA_VERSION',
+    'migrate'
+)
+
+Migration = Callable[[aiosqlite.Connection], Coroutine]
+
+
+async def _create_lfg_table(conn: aiosqlite.Connection):
+    """
+    Version 1 : Initial lfg table, with members stored as text.
+    """
+    await conn.execute('CREATE TABLE IF NOT EXISTS lfg '
+                       '(id INTEGER PRIMARY KEY, '
+                       'name TEXT NOT NULL, '
+                       'description TEXT, '
+                       'game TEXT, '
+                       'datetime TEXT, '
+                       'guild INTEGER, '
+                       'owner INTEGER, '
+                       'participants TEXT, '
+                       'alternatives TEXT)')
+
+
+async def _normalize_members(conn: aiosqlite.Connection):
+    """
+    Version 2 : Move members into lfg_member table, and index lfg columns used in queries.
+    Legacy members get their list position as joined_at, to keep their order.
+    """
+    await conn.execute('CREATE TABLE lfg_member '
+                       '(lfg_id INTEGER NOT NULL, '
+                       'user_id INTEGER NOT NULL, '
+                       'role INTEGER NOT NULL, '
+                       'joined_at INTEGER NOT NULL, '
+                       'PRIMARY KEY (lfg_id, user_id))')
+    members: list[tuple[int, int, int, int]] = []
+    async with conn.execute('SELECT id, participants, alternatives FROM lfg') as c:
+        async for lfg_id, participants_raw, alternatives_raw in c:
+            joined_at = 0
+            for role, raw in ((ROLE_PARTICIPANT, participants_raw), (ROLE_ALTERNATIVE, alternatives_raw)):
+                if not raw:
+                    continue
+                for user_id in map(int, raw.split(ID_SEP)):
+                    members.append((lfg_id, user_id, role, joined_at))
+                    joined_at += 1
+    await conn.executemany(
+        'INSERT OR IGNORE INTO lfg_member (lfg_id, user_id, role, joined_at) VALUES (?, ?, ?, ?)',
+        members
+    )
+
+    # Rebuild lfg table without member columns.
+    await conn.execute('CREATE TABLE lfg_new '
+                       '(id INTEGER PRIMARY KEY, '
+                       'name TEXT NOT NULL, '
+                       'description TEXT, '
+                       'game TEXT, '
+                       'datetime TEXT, '
+                       'guild INTEGER, '
+                       'owner INTEGER)')
+    await conn.execute('INSERT INTO lfg_new SELECT id, name, description, game, datetime, guild, owner FROM lfg')
+    await conn.execute('DROP TABLE lfg')
+    await conn.execute('ALTER TABLE lfg_new RENAME TO lfg')
+
+    await conn.execute('CREATE INDEX lfg_guild ON lfg (guild)')
+    await conn.execute('CREATE INDEX lfg_owner ON lfg (owner)')
+    await conn.execute('CREATE INDEX lfg_datetime ON lfg (datetime)')
+    await conn.execute('CREATE INDEX lfg_member_user ON lfg_member (user_id)')
+    await conn.execute('CREATE INDEX lfg_member_order ON lfg_member (lfg_id, joined_at)')
+
+
+async def _add_alerted(conn: aiosqlite.Connection):
+    """
+    Version 3 : Record whether participants are alerted, to send alerts missed while bot was offline.
+    """
+    await conn.execute('ALTER TABLE lfg ADD COLUMN alerted INTEGER NOT NULL DEFAULT 0')
+
+
+async def _add_max_size(conn: aiosqlite.Connection):
+    """
+    Version 4 : Max count of participants. NULL if unlimited.
+    """
+    await conn.execute('ALTER TABLE lfg ADD COLUMN max_size INTEGER')
+
+
+async def _create_archive_tables(conn: aiosqlite.Connection):
+    """
+    Version 5 : Archive of finished lfg and their members, moved out of lfg and lfg_member tables.
+    """
+    await conn.execute('CREATE TABLE lfg_archive '
+                       '(id INTEGER PRIMARY KEY, '
+                       'name TEXT NOT NULL, '
+                       'description TEXT, '
+                       'game TEXT, '
+                       'datetime TEXT, '
+                       'guild INTEGER, '
+                       'owner INTEGER, '
+                       'alerted INTEGER NOT NULL DEFAULT 0, '
+                       'max_size INTEGER, '
+                       'archived_at INTEGER NOT NULL)')
+    await conn.execute('CREATE TABLE lfg_archive_member '
+                       '(lfg_id INTEGER NOT NULL, '
+                       'user_id INTEGER NOT NULL, '
+                       'role INTEGER NOT NULL, '
+                       'joined_at INTEGER NOT NULL, '
+                       'PRIMARY KEY (lfg_id, user_id))')
+    await conn.execute('CREATE INDEX lfg_archive_guild ON lfg_archive (guild)')
+    await conn.execute('CREATE INDEX lfg_archive_owner ON lfg_archive (owner)')
+    await conn.execute('CREATE INDEX lfg_archive_member_user ON lfg_archive_member (user_id)')
+
+
+async def _index_list_filters(conn: aiosqlite.Connection):
+    """
+    Version 6 : Indexes for filters of /lfg list. Keyset pagination on id uses rowid stored in each index.
+    """
+    await conn.execute('CREATE INDEX lfg_guild_owner ON lfg (guild, owner)')
+    await conn.execute('CREATE INDEX lfg_guild_game ON lfg (guild, game)')
+
+
+async def _create_search_triggers(conn: aiosqlite.Connection):
+    """
+    Triggers which keep lfg_fts in sync with lfg table. They are dropped with lfg table, so created again when it is rebuilt.
+    """
+    await conn.execute('CREATE TRIGGER lfg_fts_insert AFTER INSERT ON lfg BEGIN '
+                       'INSERT INTO lfg_fts (rowid, name, description, game, guild) '
+                       'VALUES (new.id, new.name, new.description, new.game, new.guild); '
+                       'END')
+    await conn.execute('CREATE TRIGGER lfg_fts_delete AFTER DELETE ON lfg BEGIN '
+                       "INSERT INTO lfg_fts (lfg_fts, rowid, name, description, game, guild) "
+                       "VALUES ('delete', old.id, old.name, old.description, old.game, old.guild); "
+                       'END')
+    # Upsert of lfg sets every column, so skip updates which do not change indexed text.
+    await conn.execute('CREATE TRIGGER lfg_fts_update AFTER UPDATE OF name, description, game, guild ON lfg '
+                       'WHEN old.name IS NOT new.name OR old.description IS NOT new.description '
+                       'OR old.game IS NOT new.game OR old.guild IS NOT new.guild BEGIN '
+                       "INSERT INTO lfg_fts (lfg_fts, rowid, name, description, game, guild) "
+                       "VALUES ('delete', old.id, old.name, old.description, old.game, old.guild); "
+                       'INSERT INTO lfg_fts (rowid, name, description, game, guild) '
+                       'VALUES (new.id, new.name, new.description, new.game, new.guild); '
+                       'END')
+
+
+async def _create_search_index(conn: aiosqlite.Connection):
+    """
+    Version 7 : Full-text index of lfg for /lfg search, kept in sync with lfg table by triggers.
+    Guild is indexed as well, so searches are filtered to a guild inside the index.
+    """
+    await conn.execute("CREATE VIRTUAL TABLE lfg_fts USING fts5"
+                       "(name, description, game, guild, "
+                       "content='lfg', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2')")
+    await _create_search_triggers(conn)
+    await conn.execute("INSERT INTO lfg_fts (lfg_fts) VALUES ('rebuild')")
+
+
+async def _create_meta_table(conn: aiosqlite.Connection):
+    """
+    Version 8 : Key-value table of bot state, such as token of snapshot written on shutdown.
+    """
+    await conn.execute('CREATE TABLE lfg_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+
+async def _rebuild_with_epoch(conn: aiosqlite.Connection, table: str, columns: list[str]):
+    """
+    Rebuild table with given columns, converting dt2text expression in datetime column into unix timestamp and tz column.
+    :param conn: connection to database.
+    :param table: name of table.
+    :param columns: column definitions of new table. Columns except tz must exist in old table.
+    """
+    names = [column.split(' ', 1)[0] for column in columns]
+    old_names = [name for name in names if name != 'tz']
+    async with conn.execute(f'SELECT {", ".join(old_names)} FROM {table}') as c:
+        rows = [dict(zip(old_names, row)) for row in await c.fetchall()]
+    for row, (timestamp, tz) in zip(rows, texts2epochs(row['datetime'] for row in rows)):
+        row['datetime'], row['tz'] = timestamp, tz
+    await conn.execute(f'CREATE TABLE {table}_new ({", ".join(columns)})')
+    await conn.executemany(
+        f'INSERT INTO {table}_new ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})',
+        [tuple(row[name] for name in names) for row in rows]
+    )
+    await conn.execute(f'DROP TABLE {table}')
+    await conn.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+
+
+_LFG_COLUMNS: list[str] = [
+    'id INTEGER PRIMARY KEY',
+    'name TEXT NOT NULL',
+    'description TEXT',
+    'game TEXT',
+    'datetime INTEGER NOT NULL',
+    'tz TEXT NOT NULL',
+    'guild INTEGER',
+    'owner INTEGER',
+    'alerted INTEGER NOT NULL DEFAULT 0',
+    'max_size INTEGER',
+]
+
+
+async def _store_epoch_datetime(conn: aiosqlite.Connection):
+    """
+    Version 9 : Store planned time as unix timestamp in datetime column, and its timezone in tz column,
+    so they are loaded without parsing, and compared or sorted in queries.
+    Ids are kept, so lfg_fts stays valid and only its triggers are created again.
+    """
+    await _rebuild_with_epoch(conn, 'lfg', _LFG_COLUMNS)
+    await conn.execute('CREATE INDEX lfg_guild ON lfg (guild)')
+    await conn.execute('CREATE INDEX lfg_owner ON lfg (owner)')
+    await conn.execute('CREATE INDEX lfg_datetime ON lfg (datetime)')
+    await conn.execute('CREATE INDEX lfg_guild_owner ON lfg (guild, owner)')
+    await conn.execute('CREATE INDEX lfg_guild_game ON lfg (guild, game)')
+    await conn.execute('CREATE INDEX lfg_guild_datetime ON lfg (guild, datetime)')
+    await _create_search_triggers(conn)
+
+    await _rebuild_with_epoch(conn, 'lfg_archive', [*_LFG_COLUMNS, 'archived_at INTEGER NOT NULL'])
+    await conn.execute('CREATE INDEX lfg_archive_guild ON lfg_archive (guild)')
+    await conn.execute('CREATE INDEX lfg_archive_owner ON lfg_archive (owner)')
+
+
+# MIGRATIONS[i] migrates database from version i to version i + 1.
+MIGRATIONS: list[Migration] = [
+    _create_lfg_table,
+    _normalize_members,
+    _add_alerted,
+    _add_max_size,
+    _create_archive_tables,
+    _index_list_filters,
+    _create_search_index,
+    _create_meta_table,
+    _store_epoch_datetime,
+]
+SCHEMA_VERSION: int = len(MIGRATIONS)
+
+
+async def migrate(conn: aiosqlite.Connection) -> int:
+    """
+    Migrate database into latest schema. Each migration runs in its own transaction.
+    :param conn: connection to database. Must not be in a transaction.
+    :return: schema version before migration.
+    """
+    async with conn.execute('PRAGMA user_version') as c:
+        (version,) = await c.fetchone()
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        await conn.execute('BEGIN')
+        try:
+            await MIGRATIONS[target - 1](conn)
+            await conn.execute(f'PRAGMA user_version = {target}')
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
+    return version
+
+
+async def _main(path: str):
+    async with aiosqlite.connect(path) as conn:
+        version = await migrate(conn)
+    print(f'Migrated {path} from version {version} to {SCHEMA_VERSION}.')
+
+
+if __name__ == '__main__':
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else DB_PATH))
@@ -0,0 +1,72 @@
+"""
+LFG Snapshot
+------------
+Binary snapshot of in-memory lfg state, written on clean shutdown and loaded on next start instead of reading db.
+A snapshot is valid only with the token stored in db when it was written, so it is never used
+if db was written after it (bot crashed after loading it, or a backup was restored).
+@author Lapis0875
+"""
+import os
+import pickle
+import struct
+import zlib
+from pathlib import Path
+
+__all__ = (
+    'SNAPSHOT_VERSION',
+    'write_snapshot',
+    'read_snapshot',
+)
+
+MAGIC: bytes = b'GPLS'
+# Increase when layout of snapshot state changes. Snapshots of other versions are ignored.
+SNAPSHOT_VERSION: int = 1
+# magic, version, crc32 of payload, token, length of payload.
+HEADER: struct.Struct = struct.Struct('<4sHI16sQ')
+
+
+def write_snapshot(path: str, token: bytes, state: tuple) -> int:
+    """
+    Write snapshot file. File is replaced at once, so a partially written snapshot is never read.
+    :param path: path of snapshot file.
+    :param token: 16 bytes which must match on read.
+    :param state: picklable state to store.
+    :return: size of snapshot in bytes.
+    """
+    payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    header = HEADER.pack(MAGIC, SNAPSHOT_VERSION, zlib.crc32(payload), token, len(payload))
+    path = Path(path)
+    temp = path.with_name(path.name + '.tmp')
+    with open(temp, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    return len(header) + len(payload)
+
+
+def read_snapshot(path: str, token: bytes) -> tuple:
+    """
+    Read snapshot file with a single read, and check it.
+    :param path: path of snapshot file.
+    :param token: token stored in db on shutdown.
+    :return: state stored in snapshot.
+    :raise OSError: if snapshot cannot be read.
+    :raise ValueError: if snapshot is corrupted, outdated, or written with another token.
+    """
+    with open(path, 'rb') as f:
+        data = memoryview(f.read())
+    if len(data) < HEADER.size:
+        raise ValueError('Snapshot is truncated.')
+    magic, version, checksum, snapshot_token, length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a snapshot file.')
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f'Snapshot version {version} is not supported.')
+    if snapshot_token != token:
+        raise ValueError('Snapshot does not match last write of database.')
+    payload = data[HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise ValueError('Checksum of snapshot does not match.')
+    return pickle.loads(payload)
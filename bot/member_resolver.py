@@ -0,0 +1,111 @@
+"""
+Member Resolver
+---------------
+Resolve many guild members at once, for loading stored lfg.
+@author Lapis0875
+"""
+import asyncio
+from typing import Iterable, Optional
+
+from discord import Guild, Member, HTTPException, NotFound, Forbidden, ClientException
+from discord.ext.commands import Bot
+
+__all__ = (
+    'MemberResolver',
+)
+
+
+class MemberResolver:
+    """
+    Resolves (guild id, member id) pairs in bulk, and caches the results.
+    Cached members are used first. Remaining members are requested over gateway in chunks of `chunk_size` ids,
+    and members which gateway did not return are fetched over REST, unless `rest` is False.
+    Members fetched over REST are not cached in guild, so disable it when only warming member cache.
+    Every request shares `concurrency` slots.
+    Guilds and members which cannot be found are recorded in `missing_guilds` and `missing_members`, rather than raising.
+    """
+
+    def __init__(self, bot: Bot, *, concurrency: int = 4, chunk_size: int = 100, rest: bool = True):
+        self.bot: Bot = bot
+        self.chunk_size: int = chunk_size
+        self.rest: bool = rest
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self.guilds: dict[int, Guild] = {}
+        self.members: dict[tuple[int, int], Member] = {}
+        self.missing_guilds: set[int] = set()
+        self.missing_members: set[tuple[int, int]] = set()
+
+    def get_guild(self, guild_id: int) -> Optional[Guild]:
+        return self.guilds.get(guild_id)
+
+    def get_member(self, guild_id: int, member_id: int) -> Optional[Member]:
+        return self.members.get((guild_id, member_id))
+
+    async def resolve(self, wanted: dict[int, set[int]]):
+        """
+        Resolve every member in given guilds.
+        :param wanted: member ids to resolve, grouped by guild id.
+        """
+        await asyncio.gather(*(
+            self._resolve_guild(guild_id, member_ids)
+            for guild_id, member_ids in wanted.items()
+        ))
+
+    async def _resolve_guild(self, guild_id: int, member_ids: Iterable[int]):
+        guild = self.bot.get_guild(guild_id)
+        from_gateway = guild is not None
+        if guild is None:
+            if not self.rest:
+                self.missing_guilds.add(guild_id)
+                return
+            try:
+                async with self._semaphore:
+                    guild = await self.bot.fetch_guild(guild_id)
+            except (NotFound, Forbidden):
+                self.missing_guilds.add(guild_id)
+                return
+        self.guilds[guild_id] = guild
+
+        pending: list[int] = []
+        for member_id in member_ids:
+            if (guild_id, member_id) in self.members:
+                continue
+            member = guild.get_member(member_id)
+            if member is not None:
+                self.members[(guild_id, member_id)] = member
+            else:
+                pending.append(member_id)
+
+        if from_gateway:
+            chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+            results = await asyncio.gather(*(self._query_chunk(guild, chunk) for chunk in chunks))
+            pending = [member_id for remains in results for member_id in remains]
+
+        if not self.rest:
+            self.missing_members.update((guild_id, member_id) for member_id in pending)
+            return
+        await asyncio.gather(*(self._fetch_member(guild, member_id) for member_id in pending))
+
+    async def _query_chunk(self, guild: Guild, member_ids: list[int]) -> list[int]:
+        """
+        Request members over gateway.
+        :return: ids of members which are not returned.
+        """
+        try:
+            async with self._semaphore:
+                found = await guild.query_members(user_ids=member_ids, limit=len(member_ids), cache=True)
+        except (asyncio.TimeoutError, ClientException, RuntimeError):
+            return member_ids
+        for member in found:
+            self.members[(guild.id, member.id)] = member
+        return [member_id for member_id in member_ids if (guild.id, member_id) not in self.members]
+
+    async def _fetch_member(self, guild: Guild, member_id: int):
+        try:
+            async with self._semaphore:
+                member = await guild.fetch_member(member_id)
+        except HTTPException:
+            # NotFound if member left guild.
+            self.missing_members.add((guild.id, member_id))
+        else:
+            self.members[(guild.id, member_id)] = member
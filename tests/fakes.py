@@ -0,0 +1,43 @@
+"""
+Test Fakes
+----------
+Stand-in of GamepadBot for tests, providing only what cogs use while loading and saving lfg.
+Startup pipeline is never run, so cogs do not start background jobs.
+@author Lapis0875
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from discord import SlashCommandGroup
+
+from utils.database import Database
+from utils.metrics import MetricsRegistry
+from utils.startup import StartupPipeline
+
+__all__ = (
+    'FakeBot',
+)
+
+
+class FakeBot:
+    def __init__(self, db: Database):
+        """
+        :param db: opened database.
+        """
+        self.logger: logging.Logger = logging.getLogger('test')
+        self.logger.setLevel(logging.WARNING)
+        self.db: Database = db
+        self.metrics: MetricsRegistry = MetricsRegistry(prefix='gamepad_')
+        self.startup: StartupPipeline = StartupPipeline(self.logger)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.get_event_loop()
+
+    def get_guild(self, guild_id: int) -> None:
+        # No guild is cached.
+        return None
+
+    def create_group(self, name: str, description: str, guild_ids: Optional[list[int]] = None) -> SlashCommandGroup:
+        return SlashCommandGroup(name, description, guild_ids=guild_ids)
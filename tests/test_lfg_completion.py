@@ -0,0 +1,82 @@
+"""
+LFG Completion Tests
+--------------------
+Completion index is updated incrementally, and must match an index built from scratch.
+    python -m unittest tests.test_lfg_completion
+@author Lapis0875
+"""
+import unittest
+
+from bot.lfg import LFG
+from bot.lfg_completion import LFGCompletionIndex, normalize
+
+GUILD_ID: int = 10 ** 17
+OTHER_GUILD_ID: int = 10 ** 17 + 1
+
+
+def make_lfg(lfg_id: int, name: str, game: str, guild_id: int = GUILD_ID) -> LFG:
+    return LFG(lfg_id, name, 'description', game, 1_700_000_000, 'Asia/Seoul', guild_id, 1)
+
+
+class LFGCompletionIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = LFGCompletionIndex()
+        self.lfgs = [
+            make_lfg(1, 'Raid night', 'Destiny 2'),
+            make_lfg(12, 'raid  practice', 'destiny 2'),
+            make_lfg(20, 'Ranked', 'Valorant'),
+            make_lfg(3, 'Raid', 'Destiny 2', guild_id=OTHER_GUILD_ID),
+        ]
+
+    def assert_same_as_built(self, lfgs: list[LFG]):
+        built = LFGCompletionIndex()
+        built.build(lfgs)
+        self.assertEqual(self.index.state(), built.state())
+
+    def test_normalize_ignores_case_and_spaces(self):
+        self.assertEqual(normalize('  Raid   NIGHT '), 'raid night')
+
+    def test_lfg_are_found_by_prefix_of_id_or_name(self):
+        self.index.build(self.lfgs)
+        self.assertEqual(self.index.lfg_ids(GUILD_ID, 'RAID'), [1, 12])
+        self.assertEqual(self.index.lfg_ids(GUILD_ID, '1'), [1, 12])
+        self.assertEqual(self.index.lfg_ids(GUILD_ID, 'ran'), [20])
+        self.assertEqual(self.index.lfg_ids(GUILD_ID, 'raid', limit=1), [1])
+        self.assertEqual(self.index.lfg_ids(OTHER_GUILD_ID, 'raid'), [3])
+
+    def test_games_are_found_by_any_word_and_ranked_by_count(self):
+        self.index.build(self.lfgs)
+        self.assertEqual(self.index.games(GUILD_ID, '2'), ['Destiny 2'])
+        self.assertEqual(self.index.games(GUILD_ID, ''), ['Destiny 2', 'Valorant'])
+
+    def test_add_matches_built_index(self):
+        for lfg in self.lfgs:
+            self.index.add(lfg)
+        self.assert_same_as_built(self.lfgs)
+
+    def test_rename_matches_built_index(self):
+        self.index.build(self.lfgs)
+        lfg = self.lfgs[0]
+        old_name, old_game = lfg.name, lfg.game
+        lfg.name, lfg.game = 'Dungeon', 'Valorant'
+        self.index.rename(lfg, old_name, old_game)
+
+        self.assert_same_as_built(self.lfgs)
+        self.assertEqual(self.index.lfg_ids(GUILD_ID, 'raid'), [12])
+        self.assertEqual(self.index.games(GUILD_ID, 'destiny'), ['destiny 2'])
+
+    def test_remove_matches_built_index(self):
+        self.index.build(self.lfgs)
+        for lfg in self.lfgs[1:3]:
+            self.index.remove(lfg)
+        self.assert_same_as_built([self.lfgs[0], self.lfgs[3]])
+
+    def test_removing_last_lfg_of_guild_drops_guild(self):
+        self.index.build(self.lfgs)
+        self.index.remove(self.lfgs[3])
+        self.assertNotIn(OTHER_GUILD_ID, self.index.state())
+        self.assertEqual(self.index.lfg_ids(OTHER_GUILD_ID, ''), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+LFG Id Tests
+------------
+Ids of lfg must never be handed out twice, since buttons of old lfg messages refer to lfg by id.
+    python -m unittest tests.test_lfg_ids
+@author Lapis0875
+"""
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from bot.lfg import GamepadLFG
+from tests.fakes import FakeBot
+from utils.database import Database
+from utils.dt_utils import get_timezone
+
+GUILD_ID: int = 10 ** 17
+OWNER_ID: int = 10 ** 17 + 1
+
+
+class LFGIdTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(str(Path(self.directory.name) / 'test.db'))
+        await self.db.open()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def start(self) -> GamepadLFG:
+        """
+        Load lfg from db, as bot does after a restart without snapshot.
+        """
+        cog = GamepadLFG(FakeBot(self.db))
+        await cog.load_lfgs()
+        return cog
+
+    @staticmethod
+    def create(cog: GamepadLFG) -> int:
+        dt = datetime.now(get_timezone('Asia/Seoul'))
+        return cog.create_new_lfg('name', 'description', 'game', dt, GUILD_ID, OWNER_ID).id
+
+    async def test_deleted_id_is_not_reused_after_restart(self):
+        cog = await self.start()
+        self.create(cog)
+        newest = self.create(cog)
+        await cog.save_db()
+        cog.registry.remove(newest)
+        await cog.save_db()
+
+        cog = await self.start()
+        self.assertGreater(self.create(cog), newest)
+
+    async def test_archived_id_is_not_reused_after_restart(self):
+        cog = await self.start()
+        newest = self.create(cog)
+        await cog.save_db()
+        async with self.db.transaction() as conn:
+            await conn.execute("DELETE FROM lfg_meta WHERE key = 'last_id'")
+            await conn.execute(
+                'INSERT INTO lfg_archive (id, name, description, game, datetime, tz, guild, owner, alerted, max_size, '
+                'archived_at) SELECT id, name, description, game, datetime, tz, guild, owner, alerted, max_size, 0 '
+                'FROM lfg'
+            )
+            await conn.execute('DELETE FROM lfg')
+
+        cog = await self.start()
+        self.assertGreater(self.create(cog), newest)
+
+
+if __name__ == '__main__':
+    unittest.main()
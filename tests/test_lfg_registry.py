@@ -0,0 +1,175 @@
+"""
+LFG Registry Tests
+------------------
+Indexes of registry must stay consistent with lfg in it, as lfg are added, edited and removed.
+    python -m unittest tests.test_lfg_registry
+@author Lapis0875
+"""
+import unittest
+
+from bot.lfg import LFG
+from bot.lfg_registry import LFGRegistry
+from utils.dt_utils import epoch2dt
+
+GUILD_ID: int = 10 ** 17
+OTHER_GUILD_ID: int = 10 ** 17 + 1
+OWNER_ID: int = 10 ** 17 + 2
+NOW: int = 1_700_000_000
+
+
+def make_lfg(lfg_id: int, *, timestamp: int = NOW, guild_id: int = GUILD_ID, owner_id: int = OWNER_ID) -> LFG:
+    return LFG(lfg_id, f'name {lfg_id}', 'description', 'game', timestamp, 'Asia/Seoul', guild_id, owner_id)
+
+
+class LFGRegistryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = LFGRegistry()
+
+    def test_lfg_are_indexed_by_guild_and_owner(self):
+        first = make_lfg(0)
+        other_guild = make_lfg(1, guild_id=OTHER_GUILD_ID)
+        other_owner = make_lfg(2, owner_id=OWNER_ID + 1)
+        for lfg in (first, other_guild, other_owner):
+            self.registry.add(lfg)
+
+        self.assertIs(self.registry.get(1), other_guild)
+        self.assertEqual(list(self.registry.of_guild(GUILD_ID)), [first, other_owner])
+        self.assertEqual(self.registry.recent_by_owner(GUILD_ID, OWNER_ID), [first])
+        self.assertIs(first.registry, self.registry)
+
+    def test_recent_returns_latest_in_creation_order(self):
+        for lfg_id in range(5):
+            self.registry.add(make_lfg(lfg_id))
+        self.assertEqual([lfg.id for lfg in self.registry.recent(GUILD_ID, limit=3)], [2, 3, 4])
+
+    def test_remove_drops_lfg_from_every_index(self):
+        lfg = make_lfg(0)
+        self.registry.add(lfg)
+        self.assertIs(self.registry.remove(0), lfg)
+
+        self.assertNotIn(0, self.registry)
+        self.assertEqual(list(self.registry.of_guild(GUILD_ID)), [])
+        self.assertEqual(self.registry.recent_by_owner(GUILD_ID, OWNER_ID), [])
+        self.assertIsNone(lfg.registry)
+        self.assertIsNone(self.registry.remove(0))
+
+    def test_next_id_follows_loaded_ids(self):
+        self.registry.load([make_lfg(3), make_lfg(7)])
+        self.assertEqual(self.registry.next_id(), 8)
+        self.registry.reserve_ids(20)
+        self.assertEqual(self.registry.next_id(), 21)
+        self.registry.reserve_ids(5)
+        self.assertEqual(self.registry.next_id(), 22)
+
+
+class LFGRegistryChangeTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = LFGRegistry()
+
+    def test_loaded_lfg_are_not_dirty(self):
+        self.registry.load([make_lfg(0)])
+        self.assertFalse(self.registry.has_changes())
+
+    def test_added_and_touched_lfg_are_taken_once(self):
+        self.registry.load([make_lfg(0)])
+        self.registry.add(make_lfg(1))
+        self.registry.get(0).touch()
+
+        dirty, joined, left, deleted = self.registry.take_changes()
+        self.assertEqual(sorted(lfg.id for lfg in dirty), [0, 1])
+        self.assertEqual((joined, left, deleted), ([], [], []))
+        self.assertFalse(self.registry.has_changes())
+
+    def test_member_changes_keep_latest_state_of_each_member(self):
+        lfg = make_lfg(0)
+        self.registry.load([lfg])
+        lfg.add_participant(1)
+        lfg.add_participant(2)
+        lfg.remove_participant(1)
+
+        self.assertTrue(self.registry.has_changes())
+        self.assertFalse(self.registry.has_lfg_changes())
+        dirty, joined, left, deleted = self.registry.take_changes()
+        self.assertEqual(dirty, [])
+        self.assertEqual([(lfg_id, member_id) for lfg_id, member_id, _, _ in joined], [(0, 2)])
+        self.assertEqual(left, [(0, 1)])
+
+    def test_removed_lfg_is_deleted_without_pending_changes(self):
+        lfg = make_lfg(0)
+        self.registry.add(lfg)
+        lfg.add_participant(1)
+        self.registry.remove(0)
+
+        self.assertTrue(self.registry.has_lfg_changes())
+        self.assertEqual(self.registry.take_changes(), ([], [], [], [0]))
+
+    def test_failed_write_is_restored_without_overwriting_newer_changes(self):
+        lfg = make_lfg(0)
+        self.registry.load([lfg])
+        lfg.add_participant(1)
+        lfg.touch()
+        changes = self.registry.take_changes()
+        # Member left while changes were being written.
+        lfg.remove_participant(1)
+        self.registry.restore_changes(*changes)
+
+        dirty, joined, left, deleted = self.registry.take_changes()
+        self.assertEqual(dirty, [lfg])
+        self.assertEqual(joined, [])
+        self.assertEqual(left, [(0, 1)])
+
+
+class LFGRegistryExpiryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = LFGRegistry()
+
+    def test_pop_expired_returns_lfg_planned_before_time(self):
+        self.registry.load([
+            make_lfg(0, timestamp=NOW + 10),
+            make_lfg(1, timestamp=NOW - 10),
+            make_lfg(2, timestamp=NOW)
+        ])
+        expired, _, _ = self.registry.pop_expired(NOW + 1)
+
+        self.assertEqual([lfg.id for lfg in expired], [1, 2])
+        self.assertEqual([lfg.id for lfg in self.registry], [0])
+        self.assertFalse(self.registry.has_lfg_changes())
+
+    def test_postponed_lfg_expires_on_new_time(self):
+        lfg = make_lfg(0, timestamp=NOW - 10)
+        self.registry.load([lfg])
+        lfg.update(lfg.name, lfg.description, lfg.game, epoch2dt(NOW + 10, lfg.tz))
+
+        self.assertEqual(self.registry.pop_expired(NOW)[0], [])
+        self.assertEqual(self.registry.pop_expired(NOW + 11)[0], [lfg])
+
+    def test_brought_forward_lfg_expires_on_new_time(self):
+        lfg = make_lfg(0, timestamp=NOW + 10)
+        self.registry.load([lfg])
+        lfg.update(lfg.name, lfg.description, lfg.game, epoch2dt(NOW - 10, lfg.tz))
+
+        self.assertEqual(self.registry.pop_expired(NOW)[0], [lfg])
+        # Stale entry of old time is skipped.
+        self.assertEqual(self.registry.pop_expired(NOW + 11)[0], [])
+
+    def test_removed_lfg_does_not_expire(self):
+        self.registry.load([make_lfg(0, timestamp=NOW - 10)])
+        self.registry.remove(0)
+        self.assertEqual(self.registry.pop_expired(NOW)[0], [])
+
+    def test_pending_member_changes_are_popped_with_lfg(self):
+        lfg = make_lfg(0, timestamp=NOW - 10)
+        self.registry.load([lfg])
+        lfg.add_participant(1)
+
+        expired, joined, left = self.registry.pop_expired(NOW)
+        self.assertEqual([(lfg_id, member_id) for lfg_id, member_id, _, _ in joined], [(0, 1)])
+        self.assertFalse(self.registry.has_changes())
+
+        self.registry.restore_expired(expired, joined, left)
+        self.assertIs(self.registry.get(0), lfg)
+        self.assertEqual(self.registry.pop_expired(NOW)[0], [lfg])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+LFG Schema Tests
+----------------
+Databases of every older version must migrate into the latest schema without losing lfg.
+    python -m unittest tests.test_lfg_schema
+@author Lapis0875
+"""
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+import aiosqlite
+
+from bot.constants import ROLE_PARTICIPANT, ROLE_ALTERNATIVE
+from bot.lfg_schema import MIGRATIONS, SCHEMA_VERSION, migrate
+from utils.dt_utils import KST, get_timezone
+
+GUILD_ID: int = 10 ** 17
+OWNER_ID: int = 10 ** 17 + 1
+
+
+def epoch(tzname: str, *args: int) -> int:
+    return int(get_timezone(tzname).localize(datetime(*args)).timestamp())
+
+
+class LFGSchemaTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.conn = await aiosqlite.connect(str(Path(self.directory.name) / 'test.db'))
+
+    async def asyncTearDown(self):
+        await self.conn.close()
+        self.directory.cleanup()
+
+    async def fetch(self, sql: str, params: tuple = ()) -> list[tuple]:
+        async with self.conn.execute(sql, params) as c:
+            return list(await c.fetchall())
+
+    async def migrate_to(self, version: int):
+        """
+        Create database of an older version, as older bot did.
+        """
+        for target in range(1, version + 1):
+            await MIGRATIONS[target - 1](self.conn)
+        await self.conn.execute(f'PRAGMA user_version = {version}')
+        await self.conn.commit()
+
+    async def test_legacy_table_is_migrated(self):
+        # Bot before versioning created lfg table without setting user_version.
+        await MIGRATIONS[0](self.conn)
+        await self.conn.executemany('INSERT INTO lfg VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+            (1, 'Raid', 'description', 'Destiny 2', 'Asia/Seoul:2022-1-2:20-30', GUILD_ID, OWNER_ID, '11,12', '13'),
+            (2, 'Ranked', None, 'Valorant', 'UTC:2022-3-4:5-6', GUILD_ID, OWNER_ID, '', None),
+        ])
+        await self.conn.commit()
+
+        self.assertEqual(await migrate(self.conn), 0)
+        self.assertEqual(await self.fetch('PRAGMA user_version'), [(SCHEMA_VERSION,)])
+        self.assertEqual(await self.fetch('SELECT * FROM lfg ORDER BY id'), [
+            (1, 'Raid', 'description', 'Destiny 2', epoch('Asia/Seoul', 2022, 1, 2, 20, 30), 'Asia/Seoul',
+             GUILD_ID, OWNER_ID, 0, None),
+            (2, 'Ranked', None, 'Valorant', epoch('UTC', 2022, 3, 4, 5, 6), 'UTC', GUILD_ID, OWNER_ID, 0, None),
+        ])
+        self.assertEqual(
+            await self.fetch('SELECT lfg_id, user_id, role FROM lfg_member ORDER BY lfg_id, joined_at'),
+            [(1, 11, ROLE_PARTICIPANT), (1, 12, ROLE_PARTICIPANT), (1, 13, ROLE_ALTERNATIVE)]
+        )
+        self.assertEqual(await self.fetch("SELECT rowid FROM lfg_fts WHERE lfg_fts MATCH 'raid'"), [(1,)])
+        self.assertEqual(await self.fetch('SELECT * FROM lfg_meta'), [])
+
+    async def test_archive_is_migrated(self):
+        await self.migrate_to(5)
+        await self.conn.execute(
+            'INSERT INTO lfg_archive (id, name, description, game, datetime, guild, owner, alerted, max_size, '
+            'archived_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (7, 'Raid', 'description', 'Destiny 2', 'Asia/Seoul:2021-12-31:23-59', GUILD_ID, OWNER_ID, 1, 4, 100)
+        )
+        await self.conn.commit()
+
+        self.assertEqual(await migrate(self.conn), 5)
+        self.assertEqual(await self.fetch('SELECT * FROM lfg_archive'), [
+            (7, 'Raid', 'description', 'Destiny 2', epoch('Asia/Seoul', 2021, 12, 31, 23, 59), 'Asia/Seoul',
+             GUILD_ID, OWNER_ID, 1, 4, 100)
+        ])
+
+    async def test_search_index_follows_lfg_after_rebuild(self):
+        await self.migrate_to(8)
+        await self.conn.execute(
+            'INSERT INTO lfg (id, name, description, game, datetime, guild, owner) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (1, 'Raid', 'description', 'Destiny 2', 'Asia/Seoul:2022-1-2:20-30', GUILD_ID, OWNER_ID)
+        )
+        await self.conn.commit()
+        await migrate(self.conn)
+
+        # Triggers were dropped with old lfg table, and must be created again.
+        await self.conn.execute("UPDATE lfg SET name = 'Dungeon' WHERE id = 1")
+        await self.conn.execute(
+            'INSERT INTO lfg (id, name, description, game, datetime, tz, guild, owner) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (2, 'Raid', 'description', 'Destiny 2', 0, str(KST), GUILD_ID, OWNER_ID)
+        )
+        await self.conn.commit()
+        self.assertEqual(await self.fetch("SELECT rowid FROM lfg_fts WHERE lfg_fts MATCH 'raid'"), [(2,)])
+        self.assertEqual(await self.fetch("SELECT rowid FROM lfg_fts WHERE lfg_fts MATCH 'dungeon'"), [(1,)])
+
+    async def test_latest_database_is_not_migrated_again(self):
+        self.assertEqual(await migrate(self.conn), 0)
+        self.assertEqual(await migrate(self.conn), SCHEMA_VERSION)
+        self.assertEqual(await self.fetch('PRAGMA user_version'), [(SCHEMA_VERSION,)])
+
+    async def test_failed_migration_is_rolled_back(self):
+        await self.migrate_to(7)
+        # Table of next migration already exists, so it fails.
+        await self.conn.execute('CREATE TABLE lfg_meta (key TEXT)')
+        await self.conn.commit()
+        with self.assertRaises(sqlite3.OperationalError):
+            await migrate(self.conn)
+        self.assertEqual(await self.fetch('PRAGMA user_version'), [(7,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+LFG Snapshot Tests
+------------------
+Snapshot must restore lfg as they were, and must never be loaded if it is damaged or older than db.
+    python -m unittest tests.test_lfg_snapshot
+@author Lapis0875
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from bot.lfg import GamepadLFG
+from bot.lfg_snapshot import HEADER, write_snapshot, read_snapshot
+from tests.fakes import FakeBot
+from utils.database import Database
+from utils.dt_utils import get_timezone
+
+GUILD_ID: int = 10 ** 17
+OWNER_ID: int = 10 ** 17 + 1
+TOKEN: bytes = bytes(range(16))
+
+
+class SnapshotFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.directory.name) / 'test.snapshot')
+        self.state = ([(1, 'name')], {'next_id': 2})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def damage(self, offset: int):
+        with open(self.path, 'r+b') as f:
+            f.seek(offset)
+            byte = f.read(1)
+            f.seek(offset)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+    def test_round_trip(self):
+        size = write_snapshot(self.path, TOKEN, self.state)
+        self.assertEqual(size, os.path.getsize(self.path))
+        self.assertEqual(read_snapshot(self.path, TOKEN), self.state)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_damaged_payload_is_rejected(self):
+        write_snapshot(self.path, TOKEN, self.state)
+        self.damage(HEADER.size + 1)
+        with self.assertRaisesRegex(ValueError, 'Checksum'):
+            read_snapshot(self.path, TOKEN)
+
+    def test_truncated_snapshot_is_rejected(self):
+        write_snapshot(self.path, TOKEN, self.state)
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaisesRegex(ValueError, 'Checksum'):
+            read_snapshot(self.path, TOKEN)
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER.size - 1)
+        with self.assertRaisesRegex(ValueError, 'truncated'):
+            read_snapshot(self.path, TOKEN)
+
+    def test_other_token_is_rejected(self):
+        write_snapshot(self.path, TOKEN, self.state)
+        with self.assertRaisesRegex(ValueError, 'last write'):
+            read_snapshot(self.path, bytes(16))
+
+    def test_other_version_is_rejected(self):
+        write_snapshot(self.path, TOKEN, self.state)
+        # Version follows 4 bytes of magic.
+        self.damage(4)
+        with self.assertRaisesRegex(ValueError, 'version'):
+            read_snapshot(self.path, TOKEN)
+
+    def test_other_file_is_rejected(self):
+        Path(self.path).write_bytes(b'\0' * (HEADER.size + 8))
+        with self.assertRaisesRegex(ValueError, 'Not a snapshot'):
+            read_snapshot(self.path, TOKEN)
+
+
+class SnapshotRestartTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(str(Path(self.directory.name) / 'test.db'))
+        await self.db.open()
+        patcher = mock.patch('bot.lfg.SNAPSHOT_PATH', str(Path(self.directory.name) / 'test.snapshot'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def start(self) -> GamepadLFG:
+        cog = GamepadLFG(FakeBot(self.db))
+        await cog.load_lfgs()
+        return cog
+
+    @staticmethod
+    async def stop(cog: GamepadLFG):
+        await cog.save_db()
+        await cog.save_snapshot()
+
+    @staticmethod
+    def state(cog: GamepadLFG) -> list[tuple]:
+        return sorted(lfg.snapshot_row() for lfg in cog.registry)
+
+    async def test_restart_restores_lfg_and_indexes(self):
+        cog = await self.start()
+        dt = datetime.now(get_timezone('Asia/Seoul')) + timedelta(days=1)
+        lfg = cog.create_new_lfg('Raid', 'description', 'Destiny 2', dt, GUILD_ID, OWNER_ID)
+        lfg.add_participant(OWNER_ID)
+        cog.schedule_alert(lfg)
+        cog.create_new_lfg('Ranked', 'description', 'Valorant', dt, GUILD_ID, OWNER_ID)
+        await self.stop(cog)
+
+        with mock.patch.object(GamepadLFG, '_read_lfgs') as read_lfgs:
+            restarted = await self.start()
+        read_lfgs.assert_not_called()
+        self.assertEqual(self.state(restarted), self.state(cog))
+        self.assertEqual(restarted.registry.completion.state(), cog.registry.completion.state())
+        self.assertEqual(restarted.scheduler.entries(), cog.scheduler.entries())
+        self.assertGreater(restarted.registry.next_id(), lfg.id + 1)
+
+    async def test_snapshot_is_not_loaded_twice(self):
+        cog = await self.start()
+        dt = datetime.now(get_timezone('Asia/Seoul')) + timedelta(days=1)
+        cog.create_new_lfg('Raid', 'description', 'Destiny 2', dt, GUILD_ID, OWNER_ID)
+        await self.stop(cog)
+
+        restarted = await self.start()
+        # Changed after loading snapshot, and crashed before writing a new one.
+        restarted.registry.remove(0)
+        await restarted.save_db()
+
+        restarted = await self.start()
+        self.assertEqual(len(restarted.registry), 0)
+
+    async def test_damaged_snapshot_falls_back_to_database(self):
+        cog = await self.start()
+        dt = datetime.now(get_timezone('Asia/Seoul')) + timedelta(days=1)
+        cog.create_new_lfg('Raid', 'description', 'Destiny 2', dt, GUILD_ID, OWNER_ID)
+        await self.stop(cog)
+        with open(str(Path(self.directory.name) / 'test.snapshot'), 'r+b') as f:
+            f.seek(HEADER.size)
+            f.write(b'\0\0\0\0')
+
+        with self.assertLogs('test', 'WARNING'):
+            restarted = await self.start()
+        self.assertEqual(self.state(restarted), self.state(cog))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Log Tests
+---------
+Log file must rotate on time even if bot restarts more often than the interval.
+    python -m unittest tests.test_log
+@author Lapis0875
+"""
+import logging
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from utils.log import RotatingLogFileHandler, TEXT_FORMAT
+
+INTERVAL: float = 60 * 60
+
+
+class RotatingLogFileHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'bot.log'
+        self.handlers: list[RotatingLogFileHandler] = []
+
+    def tearDown(self):
+        for handler in self.handlers:
+            handler.close()
+        self.directory.cleanup()
+
+    def start(self) -> RotatingLogFileHandler:
+        """
+        Open handler, as bot does on each start.
+        """
+        handler = RotatingLogFileHandler(str(self.path), max_bytes=0, interval=INTERVAL, backup_count=5, compress=False)
+        handler.setFormatter(TEXT_FORMAT)
+        self.handlers.append(handler)
+        return handler
+
+    @staticmethod
+    def write(handler: RotatingLogFileHandler, message: str):
+        handler.handle(logging.makeLogRecord({'msg': message, 'levelno': logging.INFO, 'levelname': 'INFO'}))
+
+    def test_period_is_kept_across_restarts(self):
+        handler = self.start()
+        self.write(handler, 'first')
+        rollover_at = handler.rollover_at
+        handler.close()
+
+        handler = self.start()
+        self.assertEqual(handler.rollover_at, rollover_at)
+        self.write(handler, 'second')
+        self.assertEqual(handler.rotated_files(), [])
+
+    def test_rolls_over_after_restart_once_period_passed(self):
+        handler = self.start()
+        self.write(handler, 'first')
+        handler.close()
+        # Period started before restart, and the log file was written just now.
+        handler.period_file.write_text(repr(time.time() - INTERVAL - 1), encoding='utf-8')
+
+        handler = self.start()
+        self.write(handler, 'second')
+        rotated = handler.rotated_files()
+        self.assertEqual(len(rotated), 1)
+        self.assertIn('first', rotated[0].read_text(encoding='utf-8'))
+        self.assertNotIn('first', self.path.read_text(encoding='utf-8'))
+        self.assertGreater(handler.rollover_at, time.time() + INTERVAL - 60)
+
+    def test_marker_is_not_taken_as_rotated_file(self):
+        handler = self.start()
+        self.assertTrue(handler.period_file.exists())
+        self.assertEqual(handler.rotated_files(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Deadline Scheduler Tests
+------------------------
+Deadlines must be called in order, once each, even when they are replaced or cancelled while driver sleeps.
+    python -m unittest tests.test_scheduler
+@author Lapis0875
+"""
+import asyncio
+import time
+import unittest
+
+from utils.scheduler import DeadlineScheduler
+
+
+class DeadlineSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.called: list = []
+        self.lags: list[float] = []
+        self.done = asyncio.Event()
+        self.scheduler = DeadlineScheduler(self.callback, name='test', on_lag=self.lags.append)
+
+    async def asyncTearDown(self):
+        self.scheduler.stop()
+
+    async def callback(self, key):
+        self.called.append(key)
+        if key == 'last':
+            self.done.set()
+
+    async def run_until_last(self, timeout: float = 1.0):
+        self.scheduler.start()
+        await asyncio.wait_for(self.done.wait(), timeout)
+        # Let callbacks started with the last one finish.
+        await asyncio.sleep(0)
+
+    async def test_deadlines_are_called_in_order(self):
+        now = time.time()
+        self.scheduler.schedule('last', now + 0.06)
+        self.scheduler.schedule('second', now + 0.04)
+        self.scheduler.schedule('first', now + 0.02)
+        await self.run_until_last()
+        self.assertEqual(self.called, ['first', 'second', 'last'])
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertEqual(len(self.lags), 3)
+
+    async def test_passed_deadlines_are_called_right_away(self):
+        now = time.time()
+        self.scheduler.schedule('missed', now - 60)
+        self.scheduler.schedule('last', now - 30)
+        await self.run_until_last(timeout=0.1)
+        self.assertEqual(self.called, ['missed', 'last'])
+        self.assertGreaterEqual(self.lags[0], 60)
+
+    async def test_earlier_deadline_wakes_sleeping_driver(self):
+        self.scheduler.schedule('late', time.time() + 60)
+        self.scheduler.start()
+        await asyncio.sleep(0.01)
+        self.scheduler.schedule('last', time.time() + 0.01)
+        await asyncio.wait_for(self.done.wait(), 0.5)
+        self.assertEqual(self.called, ['last'])
+        self.assertIn('late', self.scheduler)
+
+    async def test_rescheduled_and_cancelled_keys_are_called_once_on_new_deadline(self):
+        now = time.time()
+        self.scheduler.schedule('moved', now + 0.01)
+        self.scheduler.schedule('cancelled', now + 0.02)
+        self.scheduler.schedule('last', now + 0.05)
+        self.scheduler.schedule('moved', now + 0.03)
+        self.assertTrue(self.scheduler.cancel('cancelled'))
+        self.assertFalse(self.scheduler.cancel('cancelled'))
+        await self.run_until_last()
+        self.assertEqual(self.called, ['moved', 'last'])
+
+    async def test_restore_keeps_entries(self):
+        now = time.time()
+        self.scheduler.schedule('a', now + 60)
+        self.scheduler.schedule('b', now + 30)
+        self.scheduler.cancel('a')
+
+        restored = DeadlineScheduler(self.callback)
+        restored.restore(self.scheduler.entries())
+        self.assertEqual(restored.entries(), [(now + 30, 'b')])
+        self.assertEqual(restored.deadline_of('b'), now + 30)
+        self.assertIsNone(restored.deadline_of('a'))
+
+    async def test_stop_keeps_deadlines(self):
+        self.scheduler.schedule('last', time.time() + 0.02)
+        self.scheduler.start()
+        self.scheduler.stop()
+        await asyncio.sleep(0.04)
+        self.assertEqual(self.called, [])
+        await self.run_until_last()
+        self.assertEqual(self.called, ['last'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Startup Pipeline Tests
+----------------------
+Extensions add phases when loaded, and may be reloaded before startup finishes.
+    python -m unittest tests.test_startup
+@author Lapis0875
+"""
+import asyncio
+import logging
+import unittest
+
+from utils.startup import StartupPipeline
+
+
+class StartupPipelineTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        logger = logging.getLogger('test.startup')
+        logger.setLevel(logging.CRITICAL)
+        self.pipeline = StartupPipeline(logger)
+        self.calls: list[str] = []
+
+    def phase(self, name: str):
+        async def func():
+            self.calls.append(name)
+        return func
+
+    async def test_adding_again_replaces_phase(self):
+        self.pipeline.add('load', self.phase('old'))
+        self.pipeline.add('load', self.phase('new'))
+        await self.pipeline.run()
+        self.assertEqual(self.calls, ['new'])
+        self.assertTrue(self.pipeline.ready.is_set())
+
+    async def test_phase_replaced_while_waiting_runs_new_function(self):
+        db = asyncio.Event()
+
+        async def open_db():
+            await db.wait()
+
+        self.pipeline.add('db', open_db)
+        self.pipeline.add('load', self.phase('old'), after=('db',))
+        task = self.pipeline.start()
+        await asyncio.sleep(0)
+        self.assertFalse(self.pipeline.phase_started('load'))
+        self.pipeline.add('load', self.phase('new'), after=('db',))
+        db.set()
+        await task
+        self.assertEqual(self.calls, ['new'])
+        self.assertTrue(self.pipeline.phase_started('load'))
+
+    async def test_phase_is_skipped_after_failed_dependency(self):
+        async def fail():
+            raise RuntimeError('failed')
+
+        self.pipeline.add('db', fail)
+        self.pipeline.add('load', self.phase('load'), after=('db',))
+        await self.pipeline.run()
+        self.assertEqual(self.calls, [])
+        self.assertTrue(self.pipeline.phase_started('load'))
+        self.assertFalse(self.pipeline.ready.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+"""
+Backup
+------
+Online backups of sqlite database, using page-level backup API of sqlite.
+Functions are blocking, so run them in a worker thread. (e.g. `asyncio.to_thread`)
+To check or restore a backup while bot is stopped, run:
+    python -m utils.backup create [--directory backups] [--pages N]
+    python -m utils.backup verify <backup>
+    python -m utils.backup restore <backup> [--target gamepad.db]
+@author Lapis0875
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import attr
+
+from bot.constants import DB_PATH, BACKUP_DIR, BACKUP_RETENTION, BACKUP_STEP_PAGES
+
+__all__ = (
+    'BackupInfo',
+    'backup_database',
+    'rotate_backups',
+    'verify_backup',
+    'restore_backup'
+)
+
+SUFFIX: str = '.db.gz'
+CHUNK_SIZE: int = 1024 * 1024
+
+
+@attr.s(init=True, repr=True)
+class BackupInfo:
+    """
+    Result of verifying a backup.
+    """
+    path = attr.ib(type=Path)
+    integrity = attr.ib(type=str)
+    user_version = attr.ib(type=int)
+    row_counts = attr.ib(type=dict, default=attr.Factory(dict))
+
+    @property
+    def ok(self) -> bool:
+        return self.integrity == 'ok'
+
+
+def backup_database(
+        path: str,
+        directory: str,
+        *,
+        prefix: str = 'gamepad',
+        pages: int = -1,
+        now: Optional[datetime] = None
+) -> Path:
+    """
+    Copy database into a timestamped, gzip-compressed file.
+    Database is read through a read-only connection. In WAL mode, writers are not blocked while copying.
+    :param path: path of database to back up.
+    :param directory: directory to store backup.
+    :param prefix: prefix of backup file name.
+    :param pages: pages copied in each step. Positive value copies incrementally, so writers run between steps
+                  (copy restarts if database is changed by another connection). -1 copies every page at once.
+    :param now: time of backup, used in file name. Current UTC time by default.
+    :return: path of created backup.
+    """
+    now = now or datetime.now(timezone.utc)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f'{prefix}-{now:%Y%m%d-%H%M%S}{SUFFIX}'
+    raw = target.with_name(target.name + '.raw')
+    compressed = target.with_name(target.name + '.tmp')
+    try:
+        src = sqlite3.connect(f'{Path(path).resolve().as_uri()}?mode=ro', uri=True)
+        dst = sqlite3.connect(raw)
+        try:
+            src.backup(dst, pages=pages)
+        finally:
+            dst.close()
+            src.close()
+        with open(raw, 'rb') as fin, gzip.open(compressed, 'wb', compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+        # Replace at once, so a partially written file never looks like a backup.
+        os.replace(compressed, target)
+    finally:
+        raw.unlink(missing_ok=True)
+        compressed.unlink(missing_ok=True)
+    return target
+
+
+def rotate_backups(directory: str, *, prefix: str = 'gamepad', keep: int = 48) -> list[Path]:
+    """
+    Delete old backups, keeping latest ones.
+    :param directory: directory of backups.
+    :param prefix: prefix of backup file name.
+    :param keep: count of backups to keep.
+    :return: paths of deleted backups.
+    """
+    # Timestamp in file name sorts in time order.
+    backups = sorted(Path(directory).glob(f'{prefix}-*{SUFFIX}'))
+    expired = backups[:max(len(backups) - keep, 0)]
+    for backup in expired:
+        backup.unlink(missing_ok=True)
+    return expired
+
+
+def _extract(backup: Path, target: Path):
+    with gzip.open(backup, 'rb') as fin, open(target, 'wb') as fout:
+        shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+
+
+def _check(backup: Path, db_path: Path) -> BackupInfo:
+    """
+    Extract backup into db_path, and inspect it. Corrupted backup is reported in integrity, rather than raising.
+    """
+    try:
+        _extract(backup, db_path)
+        return _inspect(backup, db_path)
+    except (OSError, EOFError, sqlite3.DatabaseError) as e:
+        return BackupInfo(backup, f'{type(e).__name__}: {e}', -1)
+
+
+def _inspect(path: Path, db_path: Path) -> BackupInfo:
+    conn = sqlite3.connect(db_path)
+    try:
+        (integrity,) = conn.execute('PRAGMA integrity_check').fetchone()
+        (user_version,) = conn.execute('PRAGMA user_version').fetchone()
+        tables = [name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        row_counts = {name: conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0] for name in tables}
+    finally:
+        conn.close()
+    return BackupInfo(path, integrity, user_version, row_counts)
+
+
+def verify_backup(backup: str) -> BackupInfo:
+    """
+    Extract backup into a temporary file, and check its integrity.
+    :param backup: path of backup.
+    :return: BackupInfo of backup.
+    """
+    backup = Path(backup)
+    fd, temp = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    temp = Path(temp)
+    try:
+        return _check(backup, temp)
+    finally:
+        temp.unlink(missing_ok=True)
+
+
+def restore_backup(backup: str, target: str) -> BackupInfo:
+    """
+    Verify backup, and replace target database with it. Bot must be stopped while restoring.
+    Target is not changed if backup is corrupted.
+    :param backup: path of backup.
+    :param target: path of database to restore.
+    :return: BackupInfo of backup.
+    """
+    backup, target = Path(backup), Path(target)
+    # Extract next to target, so it can be moved in place at once.
+    temp = target.with_name(target.name + '.restore')
+    try:
+        info = _check(backup, temp)
+        if not info.ok:
+            return info
+        # WAL of replaced database must not be applied on restored one.
+        for suffix in ('-wal', '-shm'):
+            target.with_name(target.name + suffix).unlink(missing_ok=True)
+        os.replace(temp, target)
+    finally:
+        temp.unlink(missing_ok=True)
+    return info
+
+
+def _print_info(info: BackupInfo):
+    print(f'{info.path} : integrity {info.integrity}, schema version {info.user_version}')
+    for name, count in info.row_counts.items():
+        print(f'  {name} : {count} rows')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Back up, verify and restore lfg database.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help='Create a backup.')
+    create.add_argument('--database', default=DB_PATH)
+    create.add_argument('--directory', default=BACKUP_DIR)
+    create.add_argument('--pages', type=int, default=BACKUP_STEP_PAGES)
+    create.add_argument('--keep', type=int, default=BACKUP_RETENTION)
+    verify = commands.add_parser('verify', help='Check integrity of a backup.')
+    verify.add_argument('backup')
+    restore = commands.add_parser('restore', help='Verify a backup, and restore database from it.')
+    restore.add_argument('backup')
+    restore.add_argument('--target', default=DB_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        path = backup_database(args.database, args.directory, pages=args.pages)
+        rotate_backups(args.directory, keep=args.keep)
+        print(f'Created {path}.')
+    elif args.command == 'verify':
+        info = verify_backup(args.backup)
+        _print_info(info)
+        raise SystemExit(0 if info.ok else 1)
+    else:
+        info = restore_backup(args.backup, args.target)
+        _print_info(info)
+        if not info.ok:
+            print(f'Backup is corrupted. {args.target} is not changed.')
+            raise SystemExit(1)
+        print(f'Restored {args.target}.')
+
+
+if __name__ == '__main__':
+    main()
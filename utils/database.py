@@ -0,0 +1,143 @@
+"""
+Database
+--------
+Long-lived sqlite connections shared across the bot.
+@author Lapis0875
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+
+import aiosqlite
+
+__all__ = (
+    'Database',
+)
+
+
+class Database:
+    """
+    Owns one writer connection and a small pool of read-only connections on a sqlite database in WAL mode.
+    Connections are opened once and kept until close(), so each query reuses the connection's worker thread and
+    its prepared statement cache. In WAL mode, readers see the last committed state and never wait for the writer.
+    """
+
+    def __init__(self, path: str, *, readers: int = 2, cache_size_kb: int = 16384, cached_statements: int = 256):
+        """
+        :param path: path of sqlite database file.
+        :param readers: count of read-only connections.
+        :param cache_size_kb: page cache size of each connection, in KiB.
+        :param cached_statements: count of prepared statements cached by each connection.
+        """
+        self.path: str = path
+        self.reader_count: int = readers
+        self.cache_size_kb: int = cache_size_kb
+        self.cached_statements: int = cached_statements
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._reader_pool: Optional[asyncio.Queue] = None
+        self._write_lock: asyncio.Lock = asyncio.Lock()
+        self._open_lock: asyncio.Lock = asyncio.Lock()
+        self._functions: list[tuple[str, int, Callable]] = []
+        # Set by close(). Closed database is never opened again, so late calls on shutdown do not start new threads.
+        self._closed: bool = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    def create_function(self, name: str, num_params: int, func: Callable):
+        """
+        Register a deterministic sql function on every connection. Must be called before open().
+        :param name: name of function in sql.
+        :param num_params: count of parameters.
+        :param func: python function called by sqlite.
+        """
+        if self.is_open:
+            raise RuntimeError('Functions must be registered before database is opened.')
+        self._functions.append((name, num_params, func))
+
+    async def _prepare(self, conn: aiosqlite.Connection):
+        await conn.execute(f'PRAGMA cache_size=-{self.cache_size_kb}')
+        await conn.execute('PRAGMA busy_timeout=5000')
+        for name, num_params, func in self._functions:
+            await conn.create_function(name, num_params, func, deterministic=True)
+
+    async def open(self):
+        """
+        Open connections. Does nothing if already opened.
+        :raise RuntimeError: if database is closed.
+        """
+        async with self._open_lock:
+            if self._closed:
+                raise RuntimeError('Database is closed.')
+            if self.is_open:
+                return
+            writer = await aiosqlite.connect(self.path, cached_statements=self.cached_statements)
+            await writer.execute('PRAGMA journal_mode=WAL')
+            await writer.execute('PRAGMA synchronous=NORMAL')
+            await self._prepare(writer)
+            await writer.commit()
+
+            pool = asyncio.Queue()
+            uri = Path(self.path).absolute().as_uri() + '?mode=ro'
+            for _ in range(self.reader_count):
+                reader = await aiosqlite.connect(uri, uri=True, cached_statements=self.cached_statements)
+                await self._prepare(reader)
+                self._readers.append(reader)
+                pool.put_nowait(reader)
+            self._reader_pool = pool
+            self._writer = writer
+
+    async def close(self):
+        """
+        Close every connection. Waits for running write transaction to finish.
+        """
+        async with self._open_lock:
+            self._closed = True
+            if not self.is_open:
+                return
+            async with self._write_lock:
+                for reader in self._readers:
+                    await reader.close()
+                self._readers.clear()
+                self._reader_pool = None
+                await self._writer.close()
+                self._writer = None
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Borrow the writer connection. Commits when block exits, or rolls back if block raises.
+        Transactions are serialized, since sqlite allows only one writer at once.
+        :raise RuntimeError: if database is closed.
+        """
+        await self.open()
+        async with self._write_lock:
+            if self._writer is None:
+                # Closed while waiting for previous transaction.
+                raise RuntimeError('Database is closed.')
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Borrow one of read-only connections.
+        :raise RuntimeError: if database is closed.
+        """
+        await self.open()
+        pool = self._reader_pool
+        if pool is None:
+            raise RuntimeError('Database is closed.')
+        conn: aiosqlite.Connection = await pool.get()
+        try:
+            yield conn
+        finally:
+            pool.put_nowait(conn)
@@ -1,4 +1,7 @@
 import datetime
+from functools import lru_cache
+from typing import Iterable
+
 import pytz
 
 from bot.constants import DAY2SEC
@@ -7,6 +10,15 @@ UTC = pytz.UTC
 KST = pytz.timezone("Asia/Seoul")
 
 
+@lru_cache(maxsize=None)
+def get_timezone(name: str) -> datetime.tzinfo:
+    """
+    Memoized pytz.timezone(). Lfg share a few timezones, so each is looked up once.
+    :param name: name of timezone, such as `Asia/Seoul`.
+    """
+    return pytz.timezone(name)
+
+
 def get_current_dt(tz: datetime.timezone = KST) -> datetime.datetime:
     utc_now = UTC.localize(datetime.datetime.utcnow())
     return utc_now.astimezone(tz)
@@ -31,8 +43,10 @@ def text2dt(text: str, tz: datetime.timezone = KST) -> datetime.datetime:
         d, t = text_split
     else:
         tzname, d, t = text_split
-        tz = pytz.timezone(tzname)
-    return datetime.datetime(*map(int, d.split('-')), *map(int, t.split('-')), 0, 0, tzinfo=tz)
+        tz = get_timezone(tzname)
+    dt = datetime.datetime(*map(int, d.split('-')), *map(int, t.split('-')), 0, 0)
+    # pytz timezones must be attached using localize(), or they use LMT offset of the zone.
+    return tz.localize(dt) if hasattr(tz, 'localize') else dt.replace(tzinfo=tz)
 
 
 def dt2text(dt: datetime.datetime, tzname_default: str = 'Asia/Seoul') -> str:
@@ -44,6 +58,39 @@ def dt2text(dt: datetime.datetime, tzname_default: str = 'Asia/Seoul') -> str:
     return f'{str(dt.tzinfo)}:{dt.year}-{dt.month}-{dt.day}:{dt.hour}-{dt.minute}'
 
 
+def epoch2dt(timestamp: int, tzname: str) -> datetime.datetime:
+    """
+    Datetime of unix timestamp in timezone.
+    :param timestamp: unix timestamp in seconds.
+    :param tzname: name of timezone.
+    """
+    return datetime.datetime.fromtimestamp(timestamp, get_timezone(tzname))
+
+
+def dt2epoch(dt: datetime.datetime) -> tuple[int, str]:
+    """
+    Split aware datetime into values stored in db.
+    :return: tuple of (unix timestamp in seconds, name of timezone)
+    """
+    return int(dt.timestamp()), str(dt.tzinfo)
+
+
+def texts2epochs(texts: Iterable[str]) -> list[tuple[int, str]]:
+    """
+    Convert many legacy dt2text expressions at once. Repeated texts are parsed only once.
+    :param texts: tz:YYYY-MM-DD:HH-MM format datetime expressions.
+    :return: list of (unix timestamp in seconds, name of timezone), in order of texts.
+    """
+    parsed: dict[str, tuple[int, str]] = {}
+    result = []
+    for text in texts:
+        value = parsed.get(text)
+        if value is None:
+            value = parsed[text] = dt2epoch(text2dt(text))
+        result.append(value)
+    return result
+
+
 def readable_time_text(dt: datetime.datetime) -> str:
     return f'{dt.year}년 {dt.month}월 {dt.day}일 {dt.hour}시 {dt.minute}분'
 
@@ -0,0 +1,82 @@
+"""
+Edit Coalescer
+--------------
+Merge bursts of component interactions on a message into a single message edit.
+@author Lapis0875
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from discord import Interaction, HTTPException
+
+__all__ = (
+    'EditCoalescer',
+)
+
+Render = Callable[[], dict[str, Any]]
+
+
+class _PendingEdit:
+    __slots__ = ('interaction', 'render')
+
+    def __init__(self, interaction: Interaction, render: Render):
+        self.interaction: Interaction = interaction
+        self.render: Render = render
+
+
+class EditCoalescer:
+    """
+    Acknowledges each interaction right away by deferring it, and edits the message once per `window` seconds.
+    Changes submitted during the window are merged, since the edit is rendered from the latest state when it is sent.
+    The edit uses token of the latest interaction, which is valid for 15 minutes.
+    """
+
+    def __init__(self, window: float, *, logger: Optional[logging.Logger] = None):
+        """
+        :param window: seconds to collect interactions before editing message.
+        :param logger: logger to report failed edits.
+        """
+        self.window: float = window
+        self.logger: logging.Logger = logger or logging.getLogger('gamepad')
+        self._pending: dict[int, _PendingEdit] = {}
+        # Flush tasks are referenced until they finish, so they are not garbage collected.
+        self._tasks: set[asyncio.Task] = set()
+        self.submitted: int = 0
+        self.edited: int = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, interaction: Interaction, render: Render):
+        """
+        Acknowledge interaction, and request an edit of its message.
+        :param interaction: component interaction on message to edit.
+        :param render: function returning keyword arguments of edit, such as embed. Called when the edit is sent.
+        """
+        if not interaction.response.is_done():
+            await interaction.response.defer()
+        self.submitted += 1
+        message_id = interaction.message.id
+        pending = self._pending.get(message_id)
+        if pending is not None:
+            pending.interaction = interaction
+            pending.render = render
+            return
+        self._pending[message_id] = _PendingEdit(interaction, render)
+        task = asyncio.get_event_loop().create_task(self._flush(message_id), name=f'edit.{message_id}')
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, message_id: int):
+        await asyncio.sleep(self.window)
+        pending = self._pending.pop(message_id)
+        try:
+            await pending.interaction.edit_original_message(**pending.render())
+        except HTTPException as e:
+            self.logger.warning(f'Failed to edit message {message_id} : {e}')
+        except Exception as e:
+            # Such as rendering lfg deleted during the window.
+            self.logger.exception(f'Failed to render edit of message {message_id}.', exc_info=e)
+        else:
+            self.edited += 1
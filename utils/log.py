@@ -1,26 +1,206 @@
+"""
+Log
+---
+Loggers of bot. Records are put into a queue, and written by a listener thread, so logging never blocks event loop.
+Log file is rotated by size and by time, and rotated files are compressed and deleted after retention.
+@author Lapis0875
+"""
+import atexit
+import copy
+import gzip
+import json
 import logging
-from .dt_utils import get_current_dt
+import os
+import queue
+import shutil
+import time
+from datetime import datetime, timezone
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional
 
+from bot.constants import LOG_PATH, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL_SEC, LOG_RETENTION, LOG_JSON
 
-def __get_log_file_name() -> str:
-    return f"logs/{get_current_dt().isoformat(timespec='seconds', sep='=').replace(':', '-')}.txt"
+__all__ = (
+    'JsonLineFormatter',
+    'RotatingLogFileHandler',
+    'get_logger',
+    'stop_logging'
+)
 
+TEXT_FORMAT: logging.Formatter = logging.Formatter(
+    style='{',
+    fmt='[{asctime}] [{levelname}] {name}: {message}'
+)
 
-def get_logger(name: str, level: int = logging.INFO) -> logging.Logger:
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    Formats each record as a single line of json, for log collectors.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            line['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            line['exception'] = record.exc_text
+        return json.dumps(line, ensure_ascii=False)
+
+
+class RotatingLogFileHandler(BaseRotatingHandler):
+    """
+    Appends to a log file, and rotates it when it exceeds max_bytes or when interval passes.
+    Rotated files are named with time of rotation, compressed with gzip, and only latest backup_count are kept.
+    """
+
+    def __init__(self, filename: str, *, max_bytes: int, interval: float, backup_count: int, compress: bool = True):
+        """
+        :param filename: path of log file.
+        :param max_bytes: size to rotate at. 0 disables rotation by size.
+        :param interval: seconds to rotate after.
+        :param backup_count: count of rotated files to keep.
+        :param compress: whether to compress rotated files.
+        """
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        super(RotatingLogFileHandler, self).__init__(filename, mode='a', encoding='utf-8')
+        self.max_bytes: int = max_bytes
+        self.interval: float = interval
+        self.backup_count: int = backup_count
+        self.compress: bool = compress
+        # Start of current rotation period is kept in a hidden file next to log file, so restarts do not extend it.
+        base = Path(self.baseFilename)
+        self.period_file: Path = base.with_name(f'.{base.name}.period')
+        self.rollover_at: float = self._period_start() + interval
+
+    def _period_start(self) -> float:
+        """
+        Time when current rotation period started. A new period starts now if it was never recorded.
+        """
+        try:
+            return float(self.period_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return self._start_period()
+
+    def _start_period(self) -> float:
+        now = time.time()
+        self.period_file.write_text(repr(now), encoding='utf-8')
+        return now
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at:
+            return True
+        if self.max_bytes > 0 and self.stream is not None:
+            # Stream is opened in append mode, so its position is size of file.
+            # Record is not formatted to measure it, so file exceeds max_bytes by at most one record.
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def _rotated_name(self) -> Path:
+        base = Path(self.baseFilename)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        suffix = '.gz' if self.compress else ''
+        target = base.with_name(f'{base.name}.{stamp}{suffix}')
+        count = 1
+        while target.exists():
+            target = base.with_name(f'{base.name}.{stamp}-{count}{suffix}')
+            count += 1
+        return target
+
+    def rotated_files(self) -> list[Path]:
+        """
+        Rotated files, oldest first.
+        """
+        base = Path(self.baseFilename)
+        return sorted(base.parent.glob(f'{base.name}.*'), key=lambda path: path.stat().st_mtime)
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        source = Path(self.baseFilename)
+        if source.exists() and source.stat().st_size > 0:
+            target = self._rotated_name()
+            if self.compress:
+                with open(source, 'rb') as fin, gzip.open(target, 'wb') as fout:
+                    shutil.copyfileobj(fin, fout)
+                source.unlink()
+            else:
+                os.replace(source, target)
+        rotated = self.rotated_files()
+        for path in rotated[:max(len(rotated) - self.backup_count, 0)]:
+            path.unlink(missing_ok=True)
+        self.stream = self._open()
+        self.rollover_at = self._start_period() + self.interval
+
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    Merges arguments into message before queueing, but keeps traceback apart so formatters can place it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = TEXT_FORMAT.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: Optional[QueueListener] = None
+
+
+def _start_listener(json_lines: bool) -> QueueListener:
+    global _listener
+    if _listener is None:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(TEXT_FORMAT)
+        file_handler = RotatingLogFileHandler(
+            LOG_PATH,
+            max_bytes=LOG_MAX_BYTES,
+            interval=LOG_ROTATE_INTERVAL_SEC,
+            backup_count=LOG_RETENTION
+        )
+        file_handler.setFormatter(JsonLineFormatter() if json_lines else TEXT_FORMAT)
+        _listener = QueueListener(_queue, console_handler, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """
+    Write every queued record, and stop listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str, level: int = logging.INFO, *, json_lines: bool = LOG_JSON) -> logging.Logger:
+    """
+    Get logger whose records are written by listener thread.
+    :param name: name of logger.
+    :param level: level of logger.
+    :param json_lines: whether to write log file as json lines. Applied when the first logger is created.
+    """
     logger = logging.getLogger(name)
     logger.setLevel(level)
     if len(logger.handlers) > 0:
         # Ensure logger does not have any duplicated handlers.
         return logger
 
-    console_handler = logging.StreamHandler()
-    file_handler = logging.FileHandler(__get_log_file_name(), mode='wt', encoding='utf-8')
-    fmt = logging.Formatter(
-        style='{',
-        fmt='[{asctime}] [{levelname}] {name}: {message}'
-    )
-    console_handler.setFormatter(fmt)
-    file_handler.setFormatter(fmt)
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    _start_listener(json_lines)
+    logger.addHandler(_RecordQueueHandler(_queue))
+    # Records are written by listener, not by handlers of ancestor loggers.
+    logger.propagate = False
     return logger
@@ -0,0 +1,47 @@
+"""
+LRU Cache
+---------
+Size-bounded mapping which evicts least recently used entries.
+@author Lapis0875
+"""
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+__all__ = (
+    'LRUCache',
+)
+
+V = TypeVar('V')
+
+
+class LRUCache(Generic[V]):
+    """
+    Mapping of at most `maxsize` entries. Reading or writing an entry makes it most recently used.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize: int = maxsize
+        self._data: OrderedDict[Hashable, V] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: V):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
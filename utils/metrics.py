@@ -0,0 +1,265 @@
+"""
+Metrics
+-------
+In-process counters, gauges and latency histograms, exposed over http in Prometheus text format.
+Updating a metric is a dict lookup and an addition, so metrics can be updated on hot paths of event loop.
+@author Lapis0875
+"""
+import math
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+from aiohttp import web
+
+__all__ = (
+    'LATENCY_BUCKETS',
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'MetricsRegistry',
+    'MetricsServer',
+)
+
+# Upper bounds of latency buckets, in seconds.
+LATENCY_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    type: str = ''
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        """
+        :param name: name of metric.
+        :param documentation: help text of metric.
+        :param labels: names of labels. Values of labels are given in order on each update.
+        """
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labels: tuple[str, ...] = tuple(labels)
+
+    def _key(self, values: tuple) -> LabelValues:
+        if len(values) != len(self.labels):
+            raise ValueError(f'{self.name} has labels {self.labels}, but {len(values)} values are given.')
+        return tuple(map(str, values))
+
+    def _label_text(self, values: LabelValues, extra: Optional[tuple[str, str]] = None) -> str:
+        pairs = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, values)]
+        if extra is not None:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """
+        Lines of values in Prometheus text format.
+        """
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}', *self.samples()]
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """
+    Value which only increases, such as count of handled commands.
+    """
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super(Counter, self).__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        key = self._key(label_values)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(self._key(label_values), 0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f'{self.name}{self._label_text(key)} {_format_value(value)}'
+
+
+class Gauge(_Metric):
+    """
+    Value which goes up and down, such as count of lfg. Gauge may read its value from a function on each scrape.
+    """
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super(Gauge, self).__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+        self._functions: dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, *label_values):
+        self._values[self._key(label_values)] = value
+
+    def set_function(self, function: Callable[[], float], *label_values):
+        """
+        Read value from function on each scrape.
+        """
+        self._functions[self._key(label_values)] = function
+
+    def value(self, *label_values) -> float:
+        key = self._key(label_values)
+        function = self._functions.get(key)
+        return function() if function is not None else self._values.get(key, 0)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            if key not in self._functions:
+                yield f'{self.name}{self._label_text(key)} {_format_value(value)}'
+        for key, function in self._functions.items():
+            try:
+                value = function()
+            except Exception:
+                # Value is unavailable, such as before bot is connected.
+                continue
+            yield f'{self.name}{self._label_text(key)} {_format_value(value)}'
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, such as latency of commands.
+    Quantiles (p50, p99) are estimated from buckets by Prometheus.
+    """
+    type = 'histogram'
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labels: Iterable[str] = (),
+            buckets: Iterable[float] = LATENCY_BUCKETS
+    ):
+        super(Histogram, self).__init__(name, documentation, labels)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        # label values -> [count of each bucket (last one is +Inf), sum]
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values):
+        key = self._key(label_values)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        # Each value is counted in its own bucket, and made cumulative on render.
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, *label_values) -> Iterator[None]:
+        """
+        Observe seconds taken by the block. Also works around await in coroutines.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def count(self, *label_values) -> int:
+        entry = self._values.get(self._key(label_values))
+        return sum(entry[0]) if entry is not None else 0
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{self._label_text(key, ("le", _format_value(bound)))} {cumulative}'
+            yield f'{self.name}_sum{self._label_text(key)} {_format_value(total[0])}'
+            yield f'{self.name}_count{self._label_text(key)} {cumulative}'
+
+
+class MetricsRegistry:
+    """
+    Named metrics of bot. Creating a metric with an existing name returns the existing one,
+    so cogs can be reloaded without losing their metrics.
+    """
+
+    def __init__(self, prefix: str = ''):
+        """
+        :param prefix: prefix of every metric name.
+        """
+        self.prefix: str = prefix
+        self._metrics: dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls: type, name: str, *args, **kwargs):
+        name = self.prefix + name
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f'Metric {name} is already registered as {metric.type}.')
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labels)
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labels: Iterable[str] = (),
+            buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labels, buckets)
+
+    def render(self) -> str:
+        """
+        Every metric in Prometheus text exposition format.
+        """
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+class MetricsServer:
+    """
+    Small http server exposing registry at `/metrics`. Bind it to localhost, and let a Prometheus agent scrape it.
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int):
+        self.registry: MetricsRegistry = registry
+        self.host: str = host
+        self.port: int = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registry.render().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, self.host, self.port).start()
+        self._runner = runner
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,87 @@
+"""
+DM Notifier
+-----------
+Send a direct message to many users concurrently.
+@author Lapis0875
+"""
+import asyncio
+from collections import Counter
+from enum import Enum
+from typing import Iterable
+
+import attr
+from discord import Client, Forbidden, HTTPException, Embed, Object
+
+__all__ = (
+    'DeliveryStatus',
+    'DeliveryReport',
+    'DMNotifier'
+)
+
+
+class DeliveryStatus(Enum):
+    SENT = 'sent'
+    FORBIDDEN = 'forbidden'    # User closed DM, or blocked bot.
+    FAILED = 'failed'
+
+
+@attr.s(init=True, repr=True)
+class DeliveryReport:
+    """
+    Result of sending a message to each recipient.
+    """
+    results = attr.ib(type=dict, default=attr.Factory(dict))
+
+    def count(self, status: DeliveryStatus) -> int:
+        return sum(1 for s in self.results.values() if s is status)
+
+    @property
+    def sent(self) -> int:
+        return self.count(DeliveryStatus.SENT)
+
+    @property
+    def forbidden(self) -> int:
+        return self.count(DeliveryStatus.FORBIDDEN)
+
+    @property
+    def failed(self) -> int:
+        return self.count(DeliveryStatus.FAILED)
+
+
+class DMNotifier:
+    """
+    Sends direct messages with bounded concurrency.
+    The semaphore is shared by every send() call, so many notifications starting at once (such as lfg on the hour)
+    are spread under the global rate limit. Per-route rate limits and 429 retries are handled by discord's http client.
+    Failure of one recipient never stops others.
+    """
+
+    def __init__(self, client: Client, concurrency: int = 8):
+        self.client: Client = client
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self.totals: Counter = Counter()
+
+    async def _send_one(self, user_id: int, embed: Embed) -> DeliveryStatus:
+        async with self._semaphore:
+            try:
+                # Opens dm channel using id only, so users need not be cached or fetched.
+                channel = await self.client.create_dm(Object(user_id))
+                await channel.send(embed=embed)
+            except Forbidden:
+                return DeliveryStatus.FORBIDDEN
+            except HTTPException:
+                return DeliveryStatus.FAILED
+        return DeliveryStatus.SENT
+
+    async def send(self, recipients: Iterable[int], embed: Embed) -> DeliveryReport:
+        """
+        Send embed to every recipient.
+        :param recipients: ids of users to send embed. Duplicated recipients receive it once.
+        :param embed: embed to send. Built once and shared by every message.
+        :return: DeliveryReport keyed by id of recipient.
+        """
+        unique = list(dict.fromkeys(recipients))
+        statuses = await asyncio.gather(*(self._send_one(user_id, embed) for user_id in unique))
+        report = DeliveryReport(dict(zip(unique, statuses)))
+        self.totals.update(s.value for s in statuses)
+        return report
@@ -0,0 +1,297 @@
+"""
+Profiling
+---------
+Diagnose a running bot without restarting it : cpu profiles, tracemalloc snapshots, and slow callbacks of event loop.
+Results are written into a directory, and summarized as text to show in discord.
+@author Lapis0875
+"""
+import asyncio
+import cProfile
+import logging
+import pstats
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+import attr
+
+__all__ = (
+    'CpuProfile',
+    'MemoryDiff',
+    'SlowCallbackReport',
+    'Profiler'
+)
+
+
+def _stamp() -> str:
+    return time.strftime('%Y%m%d-%H%M%S')
+
+
+def _size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f'{size:.1f}{unit}'
+        size /= 1024
+    return f'{size:.1f}GiB'
+
+
+# Names of tools, which key owners of running tools.
+_CPU: str = 'cpu'
+_MEMORY: str = 'memory'
+_SLOW: str = 'slow'
+
+
+@attr.s(init=True, repr=True)
+class CpuProfile:
+    """
+    Result of a cpu profile.
+    """
+    path = attr.ib(type=Path)
+    seconds = attr.ib(type=float)
+    calls = attr.ib(type=int)
+    # Lines of functions with most cumulative time.
+    top = attr.ib(type=list)
+
+
+@attr.s(init=True, repr=True)
+class MemoryDiff:
+    """
+    Result of a tracemalloc snapshot, compared with previous one.
+    """
+    path = attr.ib(type=Path)
+    current = attr.ib(type=int)
+    peak = attr.ib(type=int)
+    # Lines of allocations which grew most since previous snapshot. Empty on first snapshot.
+    top = attr.ib(type=list)
+
+
+@attr.s(init=True, repr=True)
+class SlowCallbackReport:
+    """
+    Slow callbacks recorded while detection was enabled.
+    """
+    path = attr.ib(type=Optional[Path])
+    threshold = attr.ib(type=float)
+    count = attr.ib(type=int)
+    # Latest messages of asyncio.
+    latest = attr.ib(type=list)
+
+
+class _SlowCallbackCollector(logging.Handler):
+    """
+    Keeps warnings of asyncio about slow callbacks.
+    """
+
+    def __init__(self, keep: int):
+        super(_SlowCallbackCollector, self).__init__(logging.WARNING)
+        self.count: int = 0
+        self.records: deque[str] = deque(maxlen=keep)
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if message.startswith('Executing '):
+            self.count += 1
+            self.records.append(f'{time.strftime("%H:%M:%S", time.localtime(record.created))} {message}')
+
+
+class Profiler:
+    """
+    Runs one cpu profile at a time, keeps tracemalloc snapshots to compare, and toggles slow callback detection.
+    cProfile only sees the thread which enabled it, which is the thread running event loop.
+    Every tool has overhead while enabled, so stop them after diagnosing.
+    Tools are shared by every caller, so each running tool remembers its owner, which is whom started or used it last.
+    """
+
+    def __init__(self, directory: str, *, top: int = 15, keep: int = 100):
+        """
+        :param directory: directory to write results.
+        :param top: count of lines in summaries.
+        :param keep: count of slow callbacks kept in memory.
+        """
+        self.directory: Path = Path(directory)
+        self.top: int = top
+        self.keep: int = keep
+        self._cpu_stop: Optional[asyncio.Event] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._collector: Optional[_SlowCallbackCollector] = None
+        self._slow_started: float = 0.0
+        # Level of asyncio logger before slow callback detection, restored when it is disabled.
+        self._asyncio_level: int = logging.NOTSET
+        self._owners: dict[str, object] = {}
+
+    def _path(self, name: str, suffix: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f'{name}-{_stamp()}{suffix}'
+
+    # CPU
+    @property
+    def cpu_running(self) -> bool:
+        return self._cpu_stop is not None
+
+    def stop_cpu(self) -> bool:
+        """
+        Stop running cpu profile early.
+        :return: whether a profile was running.
+        """
+        if self._cpu_stop is None:
+            return False
+        self._cpu_stop.set()
+        return True
+
+    async def profile_cpu(self, seconds: float, *, owner: object = None) -> CpuProfile:
+        """
+        Profile event loop for seconds, or until stop_cpu() is called.
+        Stats are written as a pstats file, which can be opened by `python -m pstats` or snakeviz.
+        :param seconds: seconds to profile.
+        :param owner: owner of the profile, whose close() stops it.
+        :raise RuntimeError: if another profile is running.
+        """
+        if self._cpu_stop is not None:
+            raise RuntimeError('CPU profile is already running.')
+        self._cpu_stop = stop = asyncio.Event()
+        self._owners[_CPU] = owner
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await asyncio.wait_for(stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            profile.disable()
+            self._cpu_stop = None
+            self._owners.pop(_CPU, None)
+        elapsed = time.perf_counter() - started
+        path = self._path('cpu', '.pstats')
+        return await asyncio.to_thread(self._summarize_cpu, profile, path, elapsed)
+
+    def _summarize_cpu(self, profile: cProfile.Profile, path: Path, elapsed: float) -> CpuProfile:
+        profile.dump_stats(path)
+        stats = pstats.Stats(profile)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        top = []
+        for func in stats.fcn_list[:self.top]:
+            _, calls, _, cumulative, _ = stats.stats[func]
+            filename, line, name = func
+            location = f'{Path(filename).name}:{line}' if line else filename
+            top.append(f'{cumulative:8.3f}s {calls:>8} {name} ({location})')
+        return CpuProfile(path, elapsed, stats.total_calls, top)
+
+    # Memory
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    async def snapshot_memory(self, frames: int = 1, *, owner: object = None) -> MemoryDiff:
+        """
+        Take tracemalloc snapshot, and compare it with previous one. Tracing starts on first call.
+        :param frames: count of frames stored for each allocation. Used when tracing starts.
+        :param owner: owner of tracing, whose close() stops it.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._snapshot = None
+        self._owners[_MEMORY] = owner
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        previous, self._snapshot = self._snapshot, snapshot
+        path = self._path('memory', '.tracemalloc')
+        return await asyncio.to_thread(self._summarize_memory, snapshot, previous, path, current, peak)
+
+    def _summarize_memory(
+            self,
+            snapshot: tracemalloc.Snapshot,
+            previous: Optional[tracemalloc.Snapshot],
+            path: Path,
+            current: int,
+            peak: int
+    ) -> MemoryDiff:
+        snapshot.dump(str(path))
+        top = []
+        if previous is not None:
+            # Allocations of tracemalloc itself are noise.
+            filters = (tracemalloc.Filter(False, tracemalloc.__file__),)
+            diffs = snapshot.filter_traces(filters).compare_to(previous.filter_traces(filters), 'lineno')
+            for diff in diffs[:self.top]:
+                frame = diff.traceback[0]
+                top.append(
+                    f'{_size(diff.size_diff):>10} {diff.count_diff:>+8} {Path(frame.filename).name}:{frame.lineno}'
+                )
+        return MemoryDiff(path, current, peak, top)
+
+    def stop_memory(self):
+        """
+        Stop tracing allocations, and drop kept snapshot.
+        """
+        tracemalloc.stop()
+        self._snapshot = None
+        self._owners.pop(_MEMORY, None)
+
+    # Slow callbacks
+    @property
+    def detecting_slow_callbacks(self) -> bool:
+        return self._collector is not None
+
+    def enable_slow_callbacks(self, loop: asyncio.AbstractEventLoop, threshold: float, *, owner: object = None):
+        """
+        Turn on debug mode of event loop, which logs callbacks taking longer than threshold seconds.
+        :param loop: event loop of bot.
+        :param threshold: seconds to consider a callback slow.
+        :param owner: owner of detection, whose close() stops it.
+        """
+        loop.slow_callback_duration = threshold
+        self._owners[_SLOW] = owner
+        if self._collector is None:
+            self._collector = _SlowCallbackCollector(self.keep)
+            # Only collector is added, so other handling of asyncio logger is left as is.
+            logger = logging.getLogger('asyncio')
+            self._asyncio_level = logger.level
+            if not logger.isEnabledFor(logging.WARNING):
+                logger.setLevel(logging.WARNING)
+            logger.addHandler(self._collector)
+            self._slow_started = time.time()
+            loop.set_debug(True)
+
+    async def disable_slow_callbacks(self, loop: asyncio.AbstractEventLoop) -> SlowCallbackReport:
+        """
+        Turn off debug mode of event loop, and write slow callbacks recorded since enabled.
+        """
+        collector, self._collector = self._collector, None
+        self._owners.pop(_SLOW, None)
+        loop.set_debug(False)
+        if collector is None:
+            return SlowCallbackReport(None, loop.slow_callback_duration, 0, [])
+        logger = logging.getLogger('asyncio')
+        logger.removeHandler(collector)
+        logger.setLevel(self._asyncio_level)
+        records = list(collector.records)
+        path = None
+        if records:
+            path = self._path('slow-callbacks', '.txt')
+            header = (
+                f'{collector.count} callbacks took longer than {loop.slow_callback_duration}s '
+                f'since {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._slow_started))}.\n'
+            )
+            await asyncio.to_thread(path.write_text, header + '\n'.join(records) + '\n', encoding='utf-8')
+        return SlowCallbackReport(path, loop.slow_callback_duration, collector.count, records[-self.top:])
+
+    def slow_callback_count(self) -> int:
+        return self._collector.count if self._collector is not None else 0
+
+    async def close(self, loop: asyncio.AbstractEventLoop, *, owner: object = None):
+        """
+        Stop every tool, or only tools of owner.
+        :param loop: event loop of bot.
+        :param owner: owner whose tools are stopped. None to stop every tool.
+        """
+        def owns(tool: str) -> bool:
+            return owner is None or (tool in self._owners and self._owners[tool] is owner)
+
+        if owns(_CPU):
+            self.stop_cpu()
+        if tracemalloc.is_tracing() and owns(_MEMORY):
+            self.stop_memory()
+        if self._collector is not None and owns(_SLOW):
+            await self.disable_slow_callbacks(loop)
@@ -0,0 +1,152 @@
+"""
+Deadline Scheduler
+------------------
+Run many delayed jobs using a single task.
+@author Lapis0875
+"""
+import asyncio
+import heapq
+import time
+from itertools import count
+from typing import Callable, Coroutine, Hashable, Iterable, Optional
+
+__all__ = (
+    'DeadlineScheduler',
+)
+
+
+class DeadlineScheduler:
+    """
+    Calls `callback(key)` when deadline of key passes.
+    Deadlines are kept in a min-heap, and a single driver task sleeps until the earliest one.
+    Each key has at most one deadline. Scheduling a key again replaces its deadline.
+    Cancelled entries stay in heap until they reach the top, or until they outnumber live entries.
+    Deadlines already passed (such as ones missed while bot was offline) are run as soon as possible.
+    """
+
+    def __init__(
+            self,
+            callback: Callable[[Hashable], Coroutine],
+            *,
+            name: str = 'scheduler',
+            on_lag: Optional[Callable[[float], None]] = None
+    ):
+        """
+        :param callback: coroutine function called with key of expired deadline.
+        :param name: name of driver task.
+        :param on_lag: function called with seconds between each deadline and its callback, to measure lag.
+        """
+        self.callback = callback
+        self.name: str = name
+        self.on_lag: Optional[Callable[[float], None]] = on_lag
+        # Heap entry : [deadline, sequence, key, alive]
+        self._heap: list[list] = []
+        self._entries: dict[Hashable, list] = {}
+        self._sequence = count()
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._driver: Optional[asyncio.Task] = None
+        self._running: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def deadline_of(self, key: Hashable) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def schedule(self, key: Hashable, deadline: float):
+        """
+        Schedule key to be called at deadline.
+        :param key: key passed into callback.
+        :param deadline: unix timestamp in seconds.
+        """
+        self.cancel(key)
+        entry = [deadline, next(self._sequence), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            # Earliest deadline changed, so driver must re-calculate its sleep.
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Cancel deadline of key.
+        :param key: key to cancel.
+        :return: True if key was scheduled.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[3] = False
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [e for e in self._heap if e[3]]
+            heapq.heapify(self._heap)
+        return True
+
+    def clear(self):
+        for entry in self._heap:
+            entry[3] = False
+        self._heap.clear()
+        self._entries.clear()
+
+    def entries(self) -> list[tuple[float, Hashable]]:
+        """
+        (deadline, key) of every scheduled key, in heap order.
+        """
+        return [(entry[0], entry[2]) for entry in self._heap if entry[3]]
+
+    def restore(self, entries: Iterable[tuple[float, Hashable]]):
+        """
+        Replace every deadline with entries(), heapifying them at once.
+        :param entries: (deadline, key) pairs.
+        """
+        self.clear()
+        for deadline, key in entries:
+            entry = [deadline, next(self._sequence), key, True]
+            self._entries[key] = entry
+            self._heap.append(entry)
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def start(self):
+        """
+        Start driver task in running event loop.
+        """
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.get_event_loop().create_task(self._drive(), name=self.name)
+
+    def stop(self):
+        """
+        Stop driver task. Scheduled deadlines are kept.
+        """
+        if self._driver is not None:
+            self._driver.cancel()
+            self._driver = None
+
+    async def _drive(self):
+        while True:
+            self._wakeup.clear()
+            heap = self._heap
+            while heap and not heap[0][3]:
+                heapq.heappop(heap)
+            if not heap:
+                await self._wakeup.wait()
+                continue
+            delay = heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            deadline, _, key, _ = heapq.heappop(heap)
+            del self._entries[key]
+            if self.on_lag is not None:
+                self.on_lag(time.time() - deadline)
+            # Run callback in its own task, so slow callbacks do not delay other deadlines.
+            task = asyncio.get_event_loop().create_task(self.callback(key), name=f'{self.name}.{key}')
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
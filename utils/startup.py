@@ -0,0 +1,155 @@
+"""
+Startup Pipeline
+----------------
+Run startup phases concurrently, and tell when bot is ready to handle commands.
+@author Lapis0875
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+__all__ = (
+    'StartupPipeline',
+)
+
+
+class StartupPipeline:
+    """
+    Phases are coroutine functions with names. Each phase starts as soon as phases it depends on finish,
+    so independent phases run concurrently. Time of every phase is logged, and kept in `timings`.
+    `ready` is set when every required phase succeeds. If a phase fails, phases depending on it are skipped.
+    Times are measured from creation of pipeline, which should be as early as possible.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        """
+        :param logger: logger to write timings.
+        """
+        self.logger: logging.Logger = logger
+        self.created_at: float = time.perf_counter()
+        # name -> seconds taken.
+        self.timings: dict[str, float] = {}
+        self.ready: asyncio.Event = asyncio.Event()
+        # Seconds from creation until ready, and until first command.
+        self.ready_after: Optional[float] = None
+        self.first_command_after: Optional[float] = None
+        self._phases: dict[str, tuple[Callable[[], Awaitable], tuple[str, ...]]] = {}
+        self._required: set[str] = set()
+        self._finished: dict[str, asyncio.Future] = {}
+        self._started: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.created_at
+
+    def add(self, name: str, func: Callable[[], Awaitable], *, after: Iterable[str] = (), required: bool = True):
+        """
+        Add a phase. New phases must be added before run().
+        Adding a phase again replaces it, as extensions do when reloaded. Replacing a phase which already started has
+        no effect on its run, so check phase_started() first.
+        :param name: unique name of phase.
+        :param func: coroutine function run in phase.
+        :param after: names of phases to finish before this phase.
+        :param required: whether bot is ready only after this phase.
+        """
+        self._phases[name] = (func, tuple(after))
+        if required:
+            self._required.add(name)
+        else:
+            self._required.discard(name)
+
+    def phase_started(self, name: str) -> bool:
+        """
+        Whether phase has started running, or was skipped.
+        """
+        return name in self._started
+
+    def record(self, name: str, seconds: float):
+        """
+        Record time of a step run outside pipeline.
+        """
+        self.timings[name] = seconds
+        self.logger.info(f'Startup : {name} took {seconds * 1000:.1f}ms. ({self.elapsed():.2f}s since start)')
+
+    @asynccontextmanager
+    async def track(self, name: str) -> AsyncIterator[None]:
+        """
+        Record time of the block as a step named name.
+        """
+        started = time.perf_counter()
+        yield
+        self.record(name, time.perf_counter() - started)
+
+    def start(self) -> asyncio.Task:
+        """
+        Run every phase in a background task.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run(), name='startup')
+        return self._task
+
+    def cancel(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for name, (_, after) in self._phases.items():
+            unknown = [dep for dep in after if dep not in self._phases]
+            if unknown:
+                raise ValueError(f'Phase {name} depends on unknown phases {unknown}.')
+            self._finished[name] = loop.create_future()
+        if not self._required:
+            self._set_ready()
+        await asyncio.gather(*(self._run_phase(name) for name in self._phases))
+
+    async def _run_phase(self, name: str):
+        after = self._phases[name][1]
+        finished = self._finished[name]
+        for dep in after:
+            if not await asyncio.shield(self._finished[dep]):
+                self.logger.error(f'Startup : {name} is skipped, since {dep} failed.')
+                self._started.add(name)
+                finished.set_result(False)
+                return
+        # Phase may be replaced while waiting for dependencies.
+        func = self._phases[name][0]
+        self._started.add(name)
+        try:
+            async with self.track(name):
+                await func()
+        except Exception as e:
+            self.logger.exception(f'Startup : {name} failed.', exc_info=e)
+            finished.set_result(False)
+            return
+        finished.set_result(True)
+        if not self.ready.is_set() and all(self._finished[r].done() and self._finished[r].result() for r in self._required):
+            self._set_ready()
+
+    def _set_ready(self):
+        self.ready_after = self.elapsed()
+        self.ready.set()
+        self.logger.info(f'Startup : ready to handle commands in {self.ready_after:.2f}s.')
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """
+        Wait until ready, at most timeout seconds.
+        :return: whether pipeline is ready.
+        """
+        if self.ready.is_set():
+            return True
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def command_received(self):
+        """
+        Record time to first command.
+        """
+        if self.first_command_after is None:
+            self.first_command_after = self.elapsed()
+            self.logger.info(f'Startup : first command received in {self.first_command_after:.2f}s.')